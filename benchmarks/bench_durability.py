@@ -0,0 +1,139 @@
+"""
+    Benchmark of the durability policies of the file handler.
+
+    Logs --records records from 1 to 16 threads into a file through the
+    HomemadeTimedRotatingFileHandler with each durability policy, then
+    prints the records/s, the latency percentiles and the number of fsyncs.
+    The level-triggered policy syncs one record out of --error-every, logged
+    at ERROR, the others are logged at INFO.
+
+    Usage: python benchmarks/bench_durability.py [--records N]
+                                                 [--threads 1 4 16]
+                                                 [--error-every 100]
+                                                 [--output results.json]
+"""
+
+# Imports
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from logging import StreamHandler
+from os.path import (
+    join,
+    abspath
+)
+
+# Environment
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules
+from bench_logger import percentile
+from logger import (
+    HomemadeLogger,
+    HomemadeTimedRotatingFileHandler
+)
+
+POLICIES = ['none', 'interval', 'level-triggered', 'every-record']
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def build_logger(name, durability, directory):
+    """
+    Build a HomemadeLogger writing to a file only with a durability policy.
+
+    :return: tuple - (HomemadeLogger, the file handler)
+    """
+    file_handler = HomemadeTimedRotatingFileHandler(filename=join(directory, name),
+                                                    log_format=LOG_FORMAT,
+                                                    durability=durability)
+    homemade_logger = HomemadeLogger(name=name, log_format=LOG_FORMAT,
+                                     handlers=[file_handler])
+    logger = homemade_logger.get_logger()
+    logger.propagate = False
+    for installed in list(logger.handlers):
+        if type(installed) is StreamHandler:
+            logger.removeHandler(installed)
+    return homemade_logger, file_handler.get_handler()
+
+
+def run_policy(homemade_logger, records, threads, error_every):
+    """
+    Log records messages from threads threads, one out of error_every at ERROR.
+
+    :return: dict - throughput and latency percentiles
+    """
+    latencies = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        timer = time.perf_counter_ns
+        info, error = homemade_logger.info, homemade_logger.error
+        local = []
+        barrier.wait()
+        for index in range(records // threads):
+            log = error if index % error_every == 0 else info
+            start = timer()
+            log('benchmark message')
+            local.append(timer() - start)
+        latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'records_per_second': len(latencies) / elapsed,
+            'p50_us': percentile(latencies, 0.5) / 1000,
+            'p99_us': percentile(latencies, 0.99) / 1000,
+            'p999_us': percentile(latencies, 0.999) / 1000}
+
+
+def run(records, thread_counts, error_every):
+    """
+    Run every policy for every thread count.
+
+    :return: dict - scenario name -> measures
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir='.') as directory:
+        for threads in thread_counts:
+            for durability in POLICIES:
+                scenario = f"{durability}/{threads}t"
+                homemade_logger, handler = build_logger(f"{durability}_{threads}", durability,
+                                                        directory)
+                measures = run_policy(homemade_logger, records, threads, error_every)
+                measures.update(handler.get_writer().get_sync_stats())
+                handler.close()
+                results[scenario] = measures
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=8000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--error-every', type=int, default=100)
+    parser.add_argument('--output', default=None)
+    arguments = parser.parse_args()
+    results = run(arguments.records, arguments.threads, arguments.error_every)
+    for scenario, measures in results.items():
+        print(f"{scenario:<20} {measures['records_per_second']:>12,.0f} records/s  "
+              f"p50 {measures['p50_us']:>8.1f}us  p99 {measures['p99_us']:>8.1f}us  "
+              f"p999 {measures['p999_us']:>8.1f}us  {measures['syncs']:>6} fsyncs")
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'cpus': os.cpu_count(),
+                       'records': arguments.records,
+                       'results': results}, output, indent=2)
@@ -0,0 +1,64 @@
+"""
+    Compare the JSON output with the log_format text output.
+
+    Usage: python benchmarks/bench_json.py [--records N]
+"""
+
+# Imports
+import argparse
+import io
+import sys
+import time
+from logging import (
+    Formatter,
+    LogRecord,
+    StreamHandler,
+    INFO
+)
+from os.path import (
+    join,
+    abspath
+)
+
+# Environment
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules
+from formatters import (
+    CompiledFormatter,
+    JsonFormatter,
+    orjson
+)
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def bench(formatter, records):
+    """
+    Format and write records to an in-memory stream.
+
+    :param formatter: <Formatter> - the formatter under test.
+    :param records: int - number of records.
+    :return: float - records per second
+    """
+    handler = StreamHandler(io.StringIO())
+    handler.setFormatter(formatter)
+    start = time.perf_counter()
+    for index in range(records):
+        handler.handle(LogRecord('bench', INFO, __file__, 1,
+                                 'request %d served in %.3f ms', (index, 1.5), None))
+    return records / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=200000)
+    arguments = parser.parse_args()
+    results = [
+        ('text (logging.Formatter)', bench(Formatter(LOG_FORMAT), arguments.records)),
+        ('text (CompiledFormatter)', bench(CompiledFormatter(LOG_FORMAT), arguments.records)),
+        (f"json ({'orjson' if orjson else 'json'})",
+         bench(JsonFormatter(static_fields={'service': 'bench'}), arguments.records)),
+    ]
+    for name, rate in results:
+        print(f"{name:<28} {rate:>12,.0f} records/s")
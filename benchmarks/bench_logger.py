@@ -0,0 +1,191 @@
+"""
+    Benchmark suite of the logging pipeline.
+
+    Measures records/s and the p50/p99/p999 latency of HomemadeLogger.log
+    for every combination of handlers, format, enabled or disabled level and
+    thread count, then writes the results as JSON. With --baseline, exits
+    with status 1 when a scenario is slower than the baseline by more than
+    --tolerance.
+
+    Usage: python benchmarks/bench_logger.py [--records N] [--threads 1 4 16]
+                                             [--output results.json]
+                                             [--baseline baseline.json]
+"""
+
+# Imports
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from logging import (
+    StreamHandler,
+    INFO,
+    WARNING
+)
+from os.path import (
+    join,
+    abspath
+)
+
+# Environment
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules
+from logger import (
+    HomemadeLogger,
+    HomemadeTimedRotatingFileHandler
+)
+
+HANDLERS = ['stream', 'file', 'stream+file']
+FORMATS = {
+    'default': "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    'short': "%(message)s",
+    'long': "%(asctime)s - %(name)s - %(levelname)s - %(threadName)s - "
+            "%(funcName)s:%(lineno)d - %(message)s",
+}
+LEVELS = {'enabled': INFO, 'disabled': WARNING}
+
+
+def percentile(sorted_values, fraction):
+    """
+    Get a percentile of sorted values.
+
+    :param sorted_values: list - the values, sorted.
+    :param fraction: float - the percentile, in [0, 1].
+    :return: the value
+    """
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def build_logger(name, handlers, log_format, level, directory):
+    """
+    Build a HomemadeLogger writing to /dev/null and/or a file in directory.
+
+    :return: <HomemadeLogger>
+    """
+    file_handlers = []
+    if 'file' in handlers:
+        file_handlers.append(HomemadeTimedRotatingFileHandler(filename=join(directory, name),
+                                                              log_format=log_format))
+    homemade_logger = HomemadeLogger(name=name, level=level, log_format=log_format,
+                                     handlers=file_handlers)
+    logger = homemade_logger.get_logger()
+    logger.propagate = False
+    if 'stream' not in handlers:
+        for handler in list(logger.handlers):
+            if type(handler) is StreamHandler:
+                logger.removeHandler(handler)
+    return homemade_logger
+
+
+def run_scenario(homemade_logger, records, threads):
+    """
+    Log records messages from threads threads and time every call.
+
+    :return: dict - throughput and latency percentiles
+    """
+    latencies = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        timer = time.perf_counter_ns
+        log = homemade_logger.log
+        local = []
+        barrier.wait()
+        for _ in range(records // threads):
+            start = timer()
+            log('benchmark message')
+            local.append(timer() - start)
+        latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {'records_per_second': len(latencies) / elapsed,
+            'p50_us': percentile(latencies, 0.5) / 1000,
+            'p99_us': percentile(latencies, 0.99) / 1000,
+            'p999_us': percentile(latencies, 0.999) / 1000}
+
+
+def run(records, thread_counts):
+    """
+    Run every scenario.
+
+    :return: dict - scenario name -> measures
+    """
+    results = {}
+    stderr = sys.stderr
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        sys.stderr = devnull
+        try:
+            for handlers, format_name, level_name, threads in itertools.product(
+                    HANDLERS, FORMATS, LEVELS, thread_counts):
+                scenario = f"{handlers}/{format_name}/{level_name}/{threads}t"
+                name = scenario.replace('/', '_').replace('+', '_')
+                homemade_logger = build_logger(name, handlers, FORMATS[format_name],
+                                               LEVELS[level_name], directory)
+                results[scenario] = run_scenario(homemade_logger, records, threads)
+                for handler in homemade_logger.get_logger().handlers:
+                    handler.close()
+        finally:
+            sys.stderr = stderr
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    List the scenarios slower than the baseline by more than tolerance.
+
+    :return: list - (scenario, baseline records/s, records/s)
+    """
+    regressions = []
+    for scenario, measures in results.items():
+        reference = baseline.get('results', {}).get(scenario)
+        if reference and measures['records_per_second'] < \
+                reference['records_per_second'] * (1 - tolerance):
+            regressions.append((scenario, reference['records_per_second'],
+                                measures['records_per_second']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=20000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    arguments = parser.parse_args()
+    results = run(arguments.records, arguments.threads)
+    for scenario, measures in results.items():
+        print(f"{scenario:<38} {measures['records_per_second']:>12,.0f} records/s  "
+              f"p50 {measures['p50_us']:>8.1f}us  p99 {measures['p99_us']:>8.1f}us  "
+              f"p999 {measures['p999_us']:>8.1f}us")
+    report = {'python': platform.python_version(),
+              'platform': platform.platform(),
+              'records': arguments.records,
+              'results': results}
+    regressions = []
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), arguments.tolerance)
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if arguments.baseline:
+        for scenario, reference, measured in regressions:
+            print(f"REGRESSION {scenario}: {reference:,.0f} -> {measured:,.0f} records/s")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,104 @@
+"""
+    Benchmark of the per-thread buffers against the locking file handler.
+
+    Logs --records records from 1 to 64 threads into a file, through the
+    HomemadeTimedRotatingFileHandler (one lock taken per record) and
+    through a HomemadeThreadBufferHandler wrapping it, then prints the
+    records/s and latency percentiles of both paths. The time to write the
+    buffered records left when the threads are done is included.
+
+    Usage: python benchmarks/bench_threads.py [--records N]
+                                              [--threads 1 2 4 8 16 32 64]
+                                              [--output results.json]
+"""
+
+# Imports
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from logging import StreamHandler
+from os.path import (
+    join,
+    abspath
+)
+
+# Environment
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules
+from bench_logger import run_scenario
+from logger import (
+    HomemadeLogger,
+    HomemadeThreadBufferHandler,
+    HomemadeTimedRotatingFileHandler
+)
+
+MODES = ['locking', 'thread_buffers']
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(threadName)s - %(message)s"
+
+
+def build_logger(name, mode, directory):
+    """
+    Build a HomemadeLogger writing to a file only, directly or through per-thread buffers.
+
+    :return: tuple - (HomemadeLogger, the handler to close)
+    """
+    file_handler = HomemadeTimedRotatingFileHandler(filename=join(directory, name),
+                                                    log_format=LOG_FORMAT)
+    handler = file_handler
+    if mode == 'thread_buffers':
+        handler = HomemadeThreadBufferHandler(file_handler)
+    homemade_logger = HomemadeLogger(name=name, log_format=LOG_FORMAT, handlers=[handler])
+    logger = homemade_logger.get_logger()
+    logger.propagate = False
+    for installed in list(logger.handlers):
+        if type(installed) is StreamHandler:
+            logger.removeHandler(installed)
+    return homemade_logger, handler.get_handler()
+
+
+def run(records, thread_counts):
+    """
+    Run every mode for every thread count.
+
+    :return: dict - scenario name -> measures
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in thread_counts:
+            for mode in MODES:
+                scenario = f"{mode}/{threads}t"
+                homemade_logger, handler = build_logger(f"{mode}_{threads}", mode, directory)
+                start = time.perf_counter()
+                measures = run_scenario(homemade_logger, records, threads)
+                handler.close()
+                elapsed = time.perf_counter() - start
+                measures['records_per_second_written'] = (records // threads * threads) / elapsed
+                results[scenario] = measures
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=64000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--output', default=None)
+    arguments = parser.parse_args()
+    results = run(arguments.records, arguments.threads)
+    for scenario, measures in results.items():
+        print(f"{scenario:<20} {measures['records_per_second']:>12,.0f} records/s  "
+              f"{measures['records_per_second_written']:>12,.0f} written/s  "
+              f"p50 {measures['p50_us']:>8.1f}us  p99 {measures['p99_us']:>8.1f}us  "
+              f"p999 {measures['p999_us']:>8.1f}us")
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'cpus': os.cpu_count(),
+                       'records': arguments.records,
+                       'results': results}, output, indent=2)
@@ -0,0 +1,117 @@
+"""
+    Asyncio flavour of the homemade logger.
+"""
+
+# Imports
+import asyncio
+from logging import (
+    Filter,
+    DEBUG,
+    INFO,
+    WARNING,
+    ERROR
+)
+# Project modules
+from logger import HomemadeLogger
+
+# Environment
+
+
+class TaskContextFilter(Filter):
+    """ Filter adding the name of the current asyncio task (taskName) to the records. """
+    record_fields = frozenset()
+
+    def filter(self, record):
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        record.taskName = task.get_name() if task is not None else None
+        return True
+
+
+class HomemadeAsyncLogger(HomemadeLogger):
+    """
+        Homemade logger for asyncio applications.
+
+        It always runs in asynchronous mode: the coroutines only queue the
+        records and the file and stream writes happen on the listener
+        thread, off the event loop. By default a full queue drops the oldest
+        lowest-level record instead of blocking the loop. The fields of
+        bind_context follow the task that bound them, and its tasks.
+
+        debug/info/warning/error/exception are fire-and-forget; their
+        awaitable counterparts adebug/ainfo/awarning/aerror/aexception return
+        once the record is written. Await aclose() before the loop stops to
+        write the queued records.
+    """
+    def __init__(self, name="My Own Logger",
+                 level=INFO,
+                 log_format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                 handlers=[],
+                 queue_size=10000,
+                 overflow='drop_oldest',
+                 filters=[],
+                 **kwargs):
+        """
+            Init function.
+        """
+        if not isinstance(filters, list):
+            raise TypeError(f"Filters must be list instead of {type(filters)}.")
+        super().__init__(name=name, level=level, log_format=log_format, handlers=handlers,
+                         asynchronous=True, queue_size=queue_size, overflow=overflow,
+                         filters=[TaskContextFilter()] + filters, **kwargs)
+
+    async def drain(self):
+        """ Wait until the records logged so far are written. """
+        loop = asyncio.get_running_loop()
+        written = loop.create_future()
+
+        def resolve():
+            if not written.done():
+                written.set_result(None)
+
+        if self.listener.drain(lambda: loop.call_soon_threadsafe(resolve)):
+            await written
+
+    async def aclose(self):
+        """ Write the queued records and stop the listener thread without blocking the loop. """
+        await self.drain()
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+    async def alog(self, level, message, *args, **kwargs):
+        """ log a message with level and wait until it is written. """
+        if self.is_enabled(level):
+            self._log(level, message, args, kwargs)
+            await self.drain()
+
+    async def adebug(self, message, *args, **kwargs):
+        """ log a message with DEBUG level and wait until it is written. """
+        if self.is_enabled(DEBUG):
+            self._log(DEBUG, message, args, kwargs)
+            await self.drain()
+
+    async def ainfo(self, message, *args, **kwargs):
+        """ log a message with INFO level and wait until it is written. """
+        if self.is_enabled(INFO):
+            self._log(INFO, message, args, kwargs)
+            await self.drain()
+
+    async def awarning(self, message, *args, **kwargs):
+        """ log a message with WARNING level and wait until it is written. """
+        if self.is_enabled(WARNING):
+            self._log(WARNING, message, args, kwargs)
+            await self.drain()
+
+    async def aerror(self, message, *args, **kwargs):
+        """ log a message with ERROR level and wait until it is written. """
+        if self.is_enabled(ERROR):
+            self._log(ERROR, message, args, kwargs)
+            await self.drain()
+
+    async def aexception(self, message, *args, **kwargs):
+        """ log a message with ERROR level and the current exception, wait until written. """
+        if self.is_enabled(ERROR):
+            kwargs.setdefault('exc_info', True)
+            self._log(ERROR, message, args, kwargs)
+            await self.drain()
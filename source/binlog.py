@@ -0,0 +1,365 @@
+"""
+    Compact binary log files and their decoder.
+
+    A file starts with MAGIC and an INFO entry, then holds entries made of
+    a little-endian uint32 length, a kind byte and a payload:
+        INFO   - JSON object describing the writer (host).
+        STRING - uint32 id then UTF-8 text: interns a logger name, message
+                 template, path, function or thread name for this file.
+        RECORD - created (float64), levelno (uint16), lineno (uint32),
+                 process (int32), number of extra fields (uint8), the string
+                 ids of name, msg, pathname, funcName, threadName and of the
+                 extra field names, then the raw args, the extra field values,
+                 the exception text and the stack as tagged values.
+    The message is never formatted by the writer.
+
+    Usage: python source/binlog.py FILE [FILE ...] [--output text|json]
+                                                  [--format LOG_FORMAT]
+"""
+
+# Imports
+import argparse
+import bz2
+import gzip
+import json
+import lzma
+import os
+import socket
+import struct
+import sys
+from logging import (
+    Formatter,
+    getLevelName,
+    makeLogRecord
+)
+from os.path import (
+    basename,
+    splitext
+)
+# Project modules
+from formatters import (
+    FIELD_PATTERN,
+    RECORD_ATTRIBUTES,
+    build_formatter,
+    dumps
+)
+
+# Environment
+MAGIC = b'HMBLOG\x01\n'
+INFO, STRING, RECORD = 0, 1, 2
+ENTRY = struct.Struct('<IB')
+RECORD_HEAD = struct.Struct('<dHIiB')
+STRING_ID = struct.Struct('<I')
+COUNT = struct.Struct('<I')
+INT = struct.Struct('<q')
+DOUBLE = struct.Struct('<d')
+ID_STRUCTS = {}
+MAX_STRINGS = 65536
+OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def pack_value(value, parts):
+    """
+    Append a tagged value to parts.
+
+    None, bool, int, float, str, bytes, tuple and dict keep their type,
+    other values are stored as their str().
+
+    :param value: the value.
+    :param parts: list - the bytes of the entry being built.
+    """
+    kind = type(value)
+    if value is None:
+        parts.append(b'N')
+    elif kind is bool:
+        parts.append(b'T' if value else b'F')
+    elif kind is int and -2 ** 63 <= value < 2 ** 63:
+        parts.append(b'i' + INT.pack(value))
+    elif kind is float:
+        parts.append(b'f' + DOUBLE.pack(value))
+    elif kind is bytes:
+        parts.append(b'y' + COUNT.pack(len(value)) + value)
+    elif kind is tuple or kind is list:
+        parts.append(b't' + COUNT.pack(len(value)))
+        for item in value:
+            pack_value(item, parts)
+    elif kind is dict:
+        parts.append(b'd' + COUNT.pack(len(value)))
+        for key, item in value.items():
+            pack_value(str(key), parts)
+            pack_value(item, parts)
+    else:
+        data = str(value).encode('utf-8', 'backslashreplace')
+        parts.append((b'I' if kind is int else b's') + COUNT.pack(len(data)) + data)
+
+
+def unpack_value(data, offset):
+    """
+    Read a tagged value.
+
+    :param data: bytes - the entry payload.
+    :param offset: int - the position of the tag.
+    :return: tuple - (value, offset after the value)
+    """
+    tag = data[offset:offset + 1]
+    offset += 1
+    if tag == b'N':
+        return None, offset
+    if tag == b'T' or tag == b'F':
+        return tag == b'T', offset
+    if tag == b'i':
+        return INT.unpack_from(data, offset)[0], offset + INT.size
+    if tag == b'f':
+        return DOUBLE.unpack_from(data, offset)[0], offset + DOUBLE.size
+    count = COUNT.unpack_from(data, offset)[0]
+    offset += COUNT.size
+    if tag == b't':
+        items = []
+        for _ in range(count):
+            item, offset = unpack_value(data, offset)
+            items.append(item)
+        return tuple(items), offset
+    if tag == b'd':
+        items = {}
+        for _ in range(count):
+            key, offset = unpack_value(data, offset)
+            items[key], offset = unpack_value(data, offset)
+        return items, offset
+    raw = data[offset:offset + count]
+    if tag == b'y':
+        return raw, offset + count
+    if tag == b'I':
+        return int(raw), offset + count
+    if tag == b's':
+        return raw.decode('utf-8'), offset + count
+    raise ValueError(f"Unknown value tag {tag!r} at offset {offset - 1 - COUNT.size}.")
+
+
+def id_struct(count):
+    """
+    Get the struct of count string ids.
+
+    :return: <struct.Struct>
+    """
+    ids = ID_STRUCTS.get(count)
+    if ids is None:
+        ids = ID_STRUCTS[count] = struct.Struct(f'<{count}I')
+    return ids
+
+
+class BinaryFormatter(Formatter):
+    """
+        Formatter turning a record into an unencoded binary entry.
+
+        format returns (head, strings, tail): the fixed fields already
+        packed, the strings to intern and the packed values. The writer
+        interns the strings per file with a BinaryEncoder. The fields of
+        log_format that are not record attributes (e.g. bound context
+        fields) are stored with the record.
+    """
+    record_fields = frozenset({'pathname', 'funcName', 'lineno', 'process', 'threadName'})
+
+    def __init__(self, log_format=DEFAULT_FORMAT):
+        """
+            Init function.
+        """
+        super().__init__(log_format)
+        self.extra_fields = tuple(dict.fromkeys(
+            match.group(1) for match in FIELD_PATTERN.finditer(log_format)
+            if match.group(1) not in RECORD_ATTRIBUTES))
+
+    def format(self, record):
+        """
+        Pack the record without formatting its message.
+
+        :return: tuple - (head, strings, tail)
+        """
+        attributes = record.__dict__
+        extras = [field for field in self.extra_fields if field in attributes]
+        head = RECORD_HEAD.pack(record.created, record.levelno, record.lineno or 0,
+                                record.process or 0, len(extras))
+        msg = record.msg if type(record.msg) is str else str(record.msg)
+        strings = (record.name, msg, record.pathname, record.funcName or '',
+                   record.threadName or '', *extras)
+        parts = []
+        pack_value(record.args, parts)
+        for field in extras:
+            pack_value(attributes[field], parts)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        pack_value(record.exc_text, parts)
+        pack_value(record.stack_info, parts)
+        return head, strings, b''.join(parts)
+
+
+class BinaryEncoder:
+    """ Interning state of the binary file being written, used under the writer lock. """
+    def __init__(self):
+        """
+            Init function.
+        """
+        self.ids = {}
+        info = dumps({'host': socket.gethostname()}).encode()
+        self.header = MAGIC + ENTRY.pack(len(info), INFO) + info
+
+    def encode(self, entry, start):
+        """
+        Encode an entry of BinaryFormatter, defining its new strings first.
+
+        :param entry: tuple - (head, strings, tail).
+        :param start: bool - the entry starts a new file, forget the strings.
+        :return: bytes
+        """
+        parts = []
+        if start:
+            parts.append(self.header)
+        if start or len(self.ids) >= MAX_STRINGS:
+            self.ids = {}
+        head, strings, tail = entry
+        ids = []
+        for string in strings:
+            string_id = self.ids.get(string)
+            if string_id is None:
+                string_id = self.ids[string] = len(self.ids)
+                data = STRING_ID.pack(string_id) + string.encode('utf-8', 'backslashreplace')
+                parts.append(ENTRY.pack(len(data), STRING) + data)
+            ids.append(string_id)
+        body = head + id_struct(len(ids)).pack(*ids) + tail
+        parts.append(ENTRY.pack(len(body), RECORD) + body)
+        return b''.join(parts)
+
+
+def read_records(stream):
+    """
+    Read the records of a binary log file, one entry at a time.
+
+    :param stream: binary file object positioned at the start of the file.
+    :return: generator of <LogRecord>
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a homemade binary log file.")
+    strings = {}
+    info = {}
+    while True:
+        header = stream.read(ENTRY.size)
+        if len(header) < ENTRY.size:
+            return
+        length, kind = ENTRY.unpack(header)
+        data = stream.read(length)
+        if len(data) < length:
+            return
+        if kind == STRING:
+            strings[STRING_ID.unpack_from(data)[0]] = data[STRING_ID.size:].decode('utf-8')
+        elif kind == INFO:
+            info = json.loads(data)
+        elif kind == RECORD:
+            yield decode_record(data, strings, info)
+
+
+def decode_record(data, strings, info):
+    """
+    Rebuild a LogRecord from a RECORD payload.
+
+    :return: <LogRecord>
+    """
+    created, levelno, lineno, process, extra_count = RECORD_HEAD.unpack_from(data)
+    ids = id_struct(5 + extra_count)
+    name, msg, pathname, func, thread_name, *fields = [
+        strings[string_id] for string_id in ids.unpack_from(data, RECORD_HEAD.size)]
+    offset = RECORD_HEAD.size + ids.size
+    args, offset = unpack_value(data, offset)
+    attributes = {'name': name, 'msg': msg, 'args': args or None, 'levelno': levelno,
+                  'levelname': getLevelName(levelno), 'pathname': pathname,
+                  'filename': basename(pathname), 'module': splitext(basename(pathname))[0],
+                  'lineno': lineno, 'funcName': func, 'created': created,
+                  'msecs': (created - int(created)) * 1000, 'relativeCreated': 0.0,
+                  'thread': None, 'threadName': thread_name, 'process': process}
+    for field in fields:
+        attributes[field], offset = unpack_value(data, offset)
+    attributes['exc_text'], offset = unpack_value(data, offset)
+    attributes['stack_info'], offset = unpack_value(data, offset)
+    record = makeLogRecord(attributes)
+    record.binlog_info = info
+    return record
+
+
+def get_message(record):
+    """
+    Get the message of a decoded record, even when its args do not match.
+
+    :return: str
+    """
+    try:
+        return record.getMessage()
+    except (TypeError, ValueError):
+        return f"{record.msg} {record.args!r}"
+
+
+class RecordRenderer:
+    """ Render decoded records as the text of a log_format or as JSON lines. """
+    def __init__(self, log_format=DEFAULT_FORMAT, output='text'):
+        """
+            Init function.
+        """
+        if output not in ['text', 'json']:
+            raise ValueError(f"Output must be in ['text', 'json'] instead of {output}.")
+        self.output = output
+        self.formatter = build_formatter(log_format)
+        self.fields = tuple(match.group(1) for match in FIELD_PATTERN.finditer(log_format))
+
+    def render(self, record):
+        """
+        Render a decoded record.
+
+        :return: str
+        """
+        record.msg, record.args = get_message(record), None
+        if self.output == 'text':
+            for field in self.fields:
+                record.__dict__.setdefault(field, '')
+            return self.formatter.format(record)
+        fields = {**record.binlog_info, 'pid': record.process, 'name': record.name,
+                  'time': self.formatter.formatTime(record), 'level': record.levelname,
+                  'message': record.msg}
+        if record.exc_text:
+            fields['exception'] = record.exc_text
+        if record.stack_info:
+            fields['stack'] = record.stack_info
+        return dumps(fields)
+
+
+def open_log(path):
+    """
+    Open a binary log file, compressed or not.
+
+    :return: binary file object
+    """
+    return OPENERS.get(splitext(path)[1], open)(path, 'rb')
+
+
+def decode_files(paths, output_stream, log_format=DEFAULT_FORMAT, output='text'):
+    """
+    Write the records of binary log files as text or JSON lines.
+
+    :param paths: list - the files, in order.
+    :param output_stream: text file object.
+    """
+    renderer = RecordRenderer(log_format, output)
+    for path in paths:
+        with open_log(path) as stream:
+            for record in read_records(stream):
+                output_stream.write(renderer.render(record) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--output', choices=['text', 'json'], default='text')
+    parser.add_argument('--format', default=DEFAULT_FORMAT)
+    arguments = parser.parse_args()
+    try:
+        decode_files(arguments.paths, sys.stdout, arguments.format, arguments.output)
+    except BrokenPipeError:
+        os._exit(0)
@@ -0,0 +1,154 @@
+"""
+    Filters protecting the handlers from log storms.
+"""
+
+# Imports
+import random
+from logging import (
+    Filter,
+    LogRecord,
+    getLogger
+)
+from threading import Lock
+# Project modules
+
+# Environment
+
+
+class CallSite:
+    """ State of one call site of the HomemadeRateLimitFilter. """
+    __slots__ = ('name', 'levelno', 'pathname', 'lineno', 'msg', 'args', 'tokens',
+                 'refilled', 'first_repeat', 'last_repeat', 'repeated', 'limited')
+
+    def __init__(self, record, burst):
+        self.name = record.name
+        self.levelno = record.levelno
+        self.pathname = record.pathname
+        self.lineno = record.lineno
+        self.msg = record.msg
+        self.args = record.args
+        self.tokens = burst
+        self.refilled = record.created
+        self.first_repeat = record.created
+        self.last_repeat = record.created
+        self.repeated = 0
+        self.limited = 0
+
+
+class HomemadeRateLimitFilter(Filter):
+    """
+        Filter sampling, rate limiting and collapsing the records per call site.
+
+        A call site is a (pathname, lineno) pair. Records of the levels in
+        sample_rates are kept with that probability. Each call site then
+        has a token bucket of burst records refilled at rate records per
+        second. A record identical to the previous one of its call site
+        within window seconds is not emitted but counted. There is no timer:
+        the count is emitted as one "message repeated N times in Ts" record
+        by the next record of the call site that is kept, another message or
+        the same one after the window, or by flush(), which
+        HomemadeLogger.shutdown calls. A call site that goes quiet keeps its
+        count until then.
+
+        At most max_sites call sites are tracked, the oldest one is
+        forgotten first, after its pending counts are emitted. Only adding
+        a call site takes a lock, the counters are updated without one and
+        may be slightly off under contention.
+    """
+    record_fields = frozenset({'pathname', 'lineno'})
+
+    def __init__(self, rate=10.0, burst=20, window=10.0, sample_rates=None, max_sites=1024):
+        """
+            Init function.
+        """
+        super().__init__()
+        if not isinstance(rate, (int, float)):
+            raise TypeError(f"Rate must be float instead of {type(rate)}.")
+        if not isinstance(burst, int):
+            raise TypeError(f"Burst must be int instead of {type(burst)}.")
+        if not isinstance(window, (int, float)):
+            raise TypeError(f"Window must be float instead of {type(window)}.")
+        if sample_rates is not None and not isinstance(sample_rates, dict):
+            raise TypeError(f"Sample_rates must be dict instead of {type(sample_rates)}.")
+        if not isinstance(max_sites, int):
+            raise TypeError(f"Max_sites must be int instead of {type(max_sites)}.")
+        if rate <= 0 or burst < 1 or window < 0 or max_sites < 1:
+            raise ValueError("Rate, burst and max_sites must be >0 and window >=0")
+        if any(not 0 <= sample_rate <= 1 for sample_rate in (sample_rates or {}).values()):
+            raise ValueError("Sample rates must be in [0, 1]")
+        self.rate = rate
+        self.burst = burst
+        self.window = window
+        self.sample_rates = dict(sample_rates or {})
+        self.max_sites = max_sites
+        self.sites = {}
+        self.lock = Lock()
+
+    def filter(self, record):
+        """ Tell if the record is emitted. """
+        if record.__dict__.get('homemade_summary'):
+            return True
+        sample_rate = self.sample_rates.get(record.levelno)
+        if sample_rate is not None and random.random() >= sample_rate:
+            return False
+        key = (record.pathname, record.lineno)
+        site = self.sites.get(key)
+        if site is None:
+            site = self._add_site(key, record)
+        now = record.created
+        if site.msg == record.msg and site.args == record.args:
+            if site.repeated and now - site.first_repeat < self.window:
+                site.repeated += 1
+                site.last_repeat = now
+                return False
+        site.tokens = min(self.burst, site.tokens + (now - site.refilled) * self.rate)
+        site.refilled = now
+        if site.tokens < 1:
+            site.limited += 1
+            return False
+        site.tokens -= 1
+        if site.repeated > 1 or site.limited:
+            self._summarize(site)
+        site.msg, site.args, site.levelno = record.msg, record.args, record.levelno
+        site.repeated = 1
+        site.first_repeat = site.last_repeat = now
+        return True
+
+    def flush(self):
+        """ Emit the pending repeat and rate limit counts of every call site. """
+        for site in list(self.sites.values()):
+            if site.repeated > 1 or site.limited:
+                self._summarize(site)
+                site.repeated = 0
+
+    def _add_site(self, key, record):
+        """ Track a new call site, forgetting the oldest one when full. """
+        forgotten = None
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None:
+                if len(self.sites) >= self.max_sites:
+                    forgotten = self.sites.pop(next(iter(self.sites)))
+                site = self.sites[key] = CallSite(record, self.burst)
+        if forgotten is not None and (forgotten.repeated > 1 or forgotten.limited):
+            self._summarize(forgotten)
+        return site
+
+    def _summarize(self, site):
+        """ Emit one record holding the counts of a call site and reset them. """
+        repeated, limited = site.repeated - 1, site.limited
+        site.repeated, site.limited = 1, 0
+        try:
+            message = site.msg % site.args if site.args else str(site.msg)
+        except (TypeError, ValueError):
+            message = str(site.msg)
+        parts = []
+        if repeated > 0:
+            parts.append(f"message repeated {repeated} times in "
+                         f"{site.last_repeat - site.first_repeat:.0f}s")
+        if limited:
+            parts.append(f"{limited} records dropped by the rate limit")
+        summary = LogRecord(site.name, site.levelno, site.pathname, site.lineno,
+                            "%s (%s)", (message, ', '.join(parts)), None)
+        summary.homemade_summary = True
+        getLogger(site.name).handle(summary)
@@ -0,0 +1,341 @@
+"""
+    Formatters used by the homemade logger and handlers.
+"""
+
+# Imports
+import hashlib
+import json
+import os
+import re
+import socket
+import sys
+import time
+from collections import OrderedDict
+from logging import (
+    Filter,
+    Formatter,
+    makeLogRecord
+)
+from operator import itemgetter
+from threading import Lock
+from weakref import WeakSet
+try:
+    import orjson
+except ImportError:
+    orjson = None
+# Project modules
+
+# Environment
+OUTPUTS = ['text', 'json']
+JSON_FORMATTERS = WeakSet()
+FIELD_PATTERN = re.compile(r'%\((\w+)\)([#0+ -]*\d*(?:\.\d+)?[diouxefgcrsa])', re.I)
+COMPILED_FORMATS = {}
+PLAIN_FORMATTER = Formatter()
+# Set on every record: the other attributes come from extra, bind or a filter. taskName is
+# set by the stdlib records of 3.12+ and by the TaskContextFilter before.
+RECORD_ATTRIBUTES = frozenset(makeLogRecord({}).__dict__) | {'message', 'asctime', 'taskName'}
+
+
+def compile_format(log_format):
+    """
+    Compile a %-style format into a template and a getter of its fields.
+
+    The template holds positional conversions only, so rendering a record is
+    template % getter(record.__dict__) instead of a lookup of every field in
+    the mapping. The result is shared by every formatter using log_format.
+
+    :param log_format: str - the %-style format.
+    :return: tuple - (template, getter, fields), None when the format
+        cannot be compiled (unnamed or '*' conversions)
+    """
+    if log_format in COMPILED_FORMATS:
+        return COMPILED_FORMATS[log_format]
+    fields = tuple(match.group(1) for match in FIELD_PATTERN.finditer(log_format))
+    template = FIELD_PATTERN.sub(lambda match: '%' + match.group(2), log_format)
+    compiled = None
+    if fields and '%' not in FIELD_PATTERN.sub('', log_format).replace('%%', ''):
+        getter = itemgetter(*fields)
+        if len(fields) == 1:
+            getter = single_field_getter(fields[0])
+        compiled = (template, getter, fields)
+    COMPILED_FORMATS[log_format] = compiled
+    return compiled
+
+
+def dumps(value):
+    """
+    Serialise a value to compact JSON, with orjson when it is installed.
+
+    :param value: the value to serialise, unknown types are rendered with str.
+    :return: str
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(',', ':'))
+
+
+def build_formatter(log_format, output='text', static_fields=None, deduplicator=None):
+    """
+    Build the formatter matching an output mode.
+
+    :param log_format: str - the %-style format of the text output.
+    :param output: str - 'text' or 'json'.
+    :param static_fields: dict - extra fields added to every JSON line.
+    :param deduplicator: <TracebackDeduplicator> - shortens the repeated tracebacks.
+    :return: <CompiledFormatter>
+    """
+    if output == 'json':
+        return JsonFormatter(static_fields=static_fields, deduplicator=deduplicator)
+    return CompiledFormatter(log_format, deduplicator=deduplicator)
+
+
+def fingerprint_exception(exc_info):
+    """
+    Identify a traceback by its exception types and frame code locations.
+
+    The exception messages are left out, so the same failure with other
+    values gets the same fingerprint, stable across processes.
+
+    :param exc_info: tuple - (type, value, traceback).
+    :return: str - 12 hexadecimal digits
+    """
+    exception, traceback = exc_info[1], exc_info[2]
+    parts = []
+    seen = set()
+    while exception is not None and id(exception) not in seen:
+        seen.add(id(exception))
+        parts.append(f"{type(exception).__module__}.{type(exception).__qualname__}")
+        while traceback is not None:
+            code = traceback.tb_frame.f_code
+            parts.append(f"{code.co_filename}:{code.co_name}:{traceback.tb_lineno}")
+            traceback = traceback.tb_next
+        exception = exception.__cause__ or (None if exception.__suppress_context__
+                                            else exception.__context__)
+        traceback = exception.__traceback__ if exception is not None else None
+    return hashlib.blake2b('\n'.join(parts).encode(), digest_size=6).hexdigest()
+
+
+class TracebackDeduplicator(Filter):
+    """
+        Write a traceback in full once per fingerprint and window seconds.
+
+        The later occurrences within the window are rendered as one line:
+        the exception, the fingerprint as reference and the occurrence
+        count. The full texts of the last max_entries fingerprints are
+        kept, least recently seen evicted first.
+
+        Give it to the formatters, or add it as a logger filter: it then
+        renders exc_text once, before any handler, so every handler (and
+        the queue of the asynchronous mode) writes the same text.
+    """
+    record_fields = frozenset()
+
+    def __init__(self, window=60.0, max_entries=1024):
+        """
+            Init function.
+        """
+        if not isinstance(window, (int, float)):
+            raise TypeError(f"Window must be float instead of {type(window)}.")
+        if not isinstance(max_entries, int):
+            raise TypeError(f"Max_entries must be int instead of {type(max_entries)}.")
+        if window <= 0 or max_entries < 1:
+            raise ValueError("Window and max_entries must be >0")
+        super().__init__()
+        self.window = window
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def filter(self, record):
+        """ Render the exception of the record, never rejects it. """
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.format_exception(record.exc_info,
+                                                    PLAIN_FORMATTER.formatException)
+        return True
+
+    def get_traceback(self, reference):
+        """
+        Get the full text of a traceback from its reference.
+
+        :param reference: str - the fingerprint.
+        :return: str - None when it is no longer cached
+        """
+        entry = self.entries.get(reference)
+        return entry[2] if entry is not None else None
+
+    def format_exception(self, exc_info, format_full):
+        """
+        Render an exception, in full or as a reference to its last full rendering.
+
+        :param exc_info: tuple - (type, value, traceback).
+        :param format_full: callable - renders the full traceback of exc_info.
+        :return: str
+        """
+        reference = fingerprint_exception(exc_info)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(reference)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                self.entries.move_to_end(reference)
+                return (f"{exc_info[0].__name__}: {exc_info[1]} "
+                        f"[traceback {reference}, occurrence {entry[1]}]")
+        text = f"{format_full(exc_info)}\n[traceback {reference}]"
+        with self.lock:
+            self.entries[reference] = [now, 1, text]
+            self.entries.move_to_end(reference)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return text
+
+
+def single_field_getter(field):
+    """
+    Build a getter returning a 1-tuple, as itemgetter does for several fields.
+
+    :param field: str - the field name.
+    :return: callable
+    """
+    def getter(mapping):
+        return (mapping[field],)
+    return getter
+
+
+class CompiledFormatter(Formatter):
+    """
+        Formatter rendering a format compiled once by compile_format.
+
+        The timestamp is rendered once per second and only the milliseconds
+        are added per record. The formatted line is kept on the record, so a
+        second handler using the same format and time converter reuses it. With a
+        TracebackDeduplicator, repeated tracebacks are rendered as a reference.
+    """
+    def __init__(self, fmt=None, datefmt=None, style='%', validate=True, deduplicator=None):
+        """
+            Init function.
+        """
+        if sys.version_info >= (3, 8):
+            super().__init__(fmt, datefmt, style=style, validate=validate)
+        else:
+            super().__init__(fmt, datefmt, style=style)
+        self.deduplicator = deduplicator
+        self.compiled = compile_format(self._fmt) if style == '%' else None
+        self.uses_time = super().usesTime()
+        self.key = (type(self), self._fmt, datefmt)
+        self.cached_time = (None, None, None)
+
+    def format(self, record):
+        """ Format the record, reusing the line rendered by an identical formatter. """
+        key = self.get_line_key()
+        line = record.__dict__.get('_homemade_line')
+        if line is not None and line[0] == key:
+            return line[1]
+        rendered = super().format(record)
+        record._homemade_line = (key, rendered)
+        return rendered
+
+    def get_line_key(self):
+        """
+        Get the key of the lines this formatter renders, kept with them on the records.
+
+        :return: tuple - the format config and the time converter
+        """
+        return self.key, self.converter
+
+    def formatException(self, ei):
+        """ Render an exception, shortened by the deduplicator when it repeats. """
+        if self.deduplicator is None:
+            return super().formatException(ei)
+        return self.deduplicator.format_exception(ei, super().formatException)
+
+    def usesTime(self):
+        """ Tell if the format uses asctime, computed once. """
+        return self.uses_time
+
+    def formatMessage(self, record):
+        """ Render the record with the compiled template. """
+        if self.compiled is None:
+            return super().formatMessage(record)
+        template, getter, _ = self.compiled
+        return template % getter(record.__dict__)
+
+    def formatTime(self, record, datefmt=None):
+        """ Render the record time, the part without milliseconds is cached per second. """
+        if self.converter is not time.localtime:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_datefmt, prefix = self.cached_time
+        if cached_second != second or cached_datefmt != datefmt:
+            prefix = time.strftime(datefmt or self.default_time_format, time.localtime(second))
+            self.cached_time = (second, datefmt, prefix)
+        if datefmt or not self.default_msec_format:
+            return prefix
+        return self.default_msec_format % (prefix, record.msecs)
+
+
+class JsonFormatter(CompiledFormatter):
+    """
+        Formatter rendering each record as one JSON line.
+
+        The static fields (host, pid and static_fields) and the logger name
+        are serialised once and spliced in front of the per-record fields:
+        time, level, message, the extra, bound and context fields and, when
+        present, exception and stack.
+    """
+    record_fields = frozenset()
+
+    def __init__(self, static_fields=None, datefmt=None, deduplicator=None):
+        """
+            Init function.
+        """
+        super().__init__("%(message)s", datefmt, deduplicator=deduplicator)
+        if static_fields is not None and not isinstance(static_fields, dict):
+            raise TypeError(f"Static_fields must be dict instead of {type(static_fields)}.")
+        self.static_fields = dict(static_fields or {})
+        self.key = (type(self), dumps(self.static_fields), datefmt)
+        self.prefixes = {}
+        self.static = ''
+        self.reset_static()
+        JSON_FORMATTERS.add(self)
+
+    def reset_static(self):
+        """ Serialise the static fields again, e.g. after a fork changed the pid. """
+        fields = {'host': socket.gethostname(), 'pid': os.getpid()}
+        fields.update(self.static_fields)
+        self.static = dumps(fields)[1:-1]
+        self.prefixes = {}
+
+    def format(self, record):
+        """ Render the record as a JSON line. """
+        key = self.get_line_key()
+        line = record.__dict__.get('_homemade_line')
+        if line is not None and line[0] == key:
+            return line[1]
+        fields = {'time': self.formatTime(record, self.datefmt),
+                  'level': record.levelname,
+                  'message': record.getMessage()}
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES and key[0] != '_' and key not in fields:
+                fields[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            fields['exception'] = record.exc_text
+        if record.stack_info:
+            fields['stack'] = self.formatStack(record.stack_info)
+        prefix = self.prefixes.get(record.name)
+        if prefix is None:
+            prefix = self.prefixes[record.name] = (
+                '{' + self.static + ',"name":' + dumps(record.name) + ',')
+        rendered = prefix + dumps(fields)[1:]
+        record._homemade_line = (key, rendered)
+        return rendered
+
+
+def reset_json_formatters():
+    """ Refresh the static fields of every JSON formatter in a forked child. """
+    for formatter in list(JSON_FORMATTERS):
+        formatter.reset_static()
+
+
+os.register_at_fork(after_in_child=reset_json_formatters)
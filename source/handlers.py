@@ -0,0 +1,947 @@
+"""
+    Logging handlers built by the homemade handler wrappers.
+"""
+
+# Imports
+import atexit
+import bz2
+import gzip
+import heapq
+import locale
+import lzma
+import os
+import re
+import shutil
+import sys
+import time
+import traceback
+from logging import (
+    Handler,
+    LogRecord,
+    StreamHandler,
+    ERROR
+)
+from logging.handlers import TimedRotatingFileHandler
+from collections import deque
+from queue import Queue
+from operator import itemgetter
+from threading import (
+    Condition,
+    Event,
+    Lock,
+    RLock,
+    Thread,
+    current_thread,
+    local
+)
+from weakref import WeakValueDictionary
+# Project modules
+from binlog import BinaryEncoder
+from formatters import RECORD_ATTRIBUTES
+
+# Environment
+COMPRESSIONS = {
+    'gzip': (gzip.open, '.gz'),
+    'bz2': (bz2.open, '.bz2'),
+    'lzma': (lzma.open, '.xz'),
+}
+# taskName is kept with the buffered records: it names the task that logged, not the flushing one.
+BUFFERED_ATTRIBUTES = RECORD_ATTRIBUTES - {'taskName'}
+DURABILITIES = ['none', 'interval', 'level-triggered', 'every-record']
+# The suffixes TimedRotatingFileHandler gives to the rotated files for each when.
+DEFAULT_SUFFIXES = {'S': '%Y-%m-%d_%H-%M-%S', 'M': '%Y-%m-%d_%H-%M', 'H': '%Y-%m-%d_%H',
+                    'D': '%Y-%m-%d', 'MIDNIGHT': '%Y-%m-%d', 'W': '%Y-%m-%d'}
+STRFTIME_PATTERNS = {
+    'Y': r'\d{4}', 'y': r'\d{2}', 'm': r'\d{2}', 'd': r'\d{2}', 'H': r'\d{2}', 'I': r'\d{2}',
+    'M': r'\d{2}', 'S': r'\d{2}', 'U': r'\d{2}', 'W': r'\d{2}', 'j': r'\d{3}', 'w': r'\d',
+    'u': r'\d', 'a': r'[^\W\d_]+', 'A': r'[^\W\d_]+', 'b': r'[^\W\d_]+',
+    'B': r'[^\W\d_]+', 'p': r'[^\W\d_]+', 'z': r'[+-]\d{4}', '%': '%',
+}
+
+
+class BackgroundWorker:
+    """ Single daemon thread running the jobs submitted to it, in order. """
+    def __init__(self, name='homemade-worker'):
+        """
+            Init function.
+        """
+        self.name = name
+        self.jobs = Queue()
+        self.thread = None
+        self.lock = Lock()
+
+    def submit(self, function, *args):
+        """
+        Run function(*args) on the worker thread, starting it if needed.
+
+        :param function: callable - the job.
+        """
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+        self.jobs.put((function, args))
+
+    def join(self):
+        """ Wait until every submitted job is done. """
+        self.jobs.join()
+
+    def _run(self):
+        """ Worker loop. """
+        while True:
+            function, args = self.jobs.get()
+            try:
+                function(*args)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                self.jobs.task_done()
+
+
+WRITERS = WeakValueDictionary()
+FILE_HANDLERS = WeakValueDictionary()
+SHARED_LOCK = RLock()
+ROTATION_WORKER = BackgroundWorker(name='homemade-rotation')
+atexit.register(ROTATION_WORKER.join)
+
+
+def compress_file(path, compression):
+    """
+    Compress a file next to itself and remove the original.
+
+    The archive is written under a temporary name first so a partial archive
+    is never mistaken for a complete one.
+
+    :param path: str - the file to compress.
+    :param compression: str - a key of COMPRESSIONS.
+    :return: str - the compressed file path
+    """
+    opener, extension = COMPRESSIONS[compression]
+    target = path + extension
+    with open(path, 'rb') as source, opener(target + '.tmp', 'wb') as destination:
+        shutil.copyfileobj(source, destination)
+    os.replace(target + '.tmp', target)
+    os.remove(path)
+    return target
+
+
+class HomemadeRotatingFileHandler(TimedRotatingFileHandler):
+    """
+        TimedRotatingFileHandler able to buffer formatted records and to
+        compress the rotated files.
+
+        In buffered mode the records are kept in memory and written with a
+        single write + flush once buffer_size bytes or buffer_records
+        records are pending, once flush_interval seconds elapsed since the
+        last write, or as soon as a record of flush_level or above arrives.
+
+        The file is rotated when the time interval elapses or, if max_bytes
+        is set, when the next record would make it larger than max_bytes
+        bytes once encoded, whichever comes first. The rollover only renames
+        the file; compressing it ('gzip', 'bz2' or 'lzma') and removing the
+        backups beyond backup_count, max_total_bytes or max_age seconds is
+        done by the shared ROTATION_WORKER thread. The backups are listed
+        once at init and then tracked in memory: only the names this
+        handler produces count, i.e. the file name, the strftime suffix,
+        an optional rollover counter, log_extension and the compression
+        extension.
+
+        When binary is True the file is written in the binlog format: the
+        formatter must be a BinaryFormatter.
+
+        durability sets when the written records are fsynced: 'none' leaves
+        it to the OS, 'interval' syncs every sync_interval seconds in the
+        background, 'level-triggered' makes the records of sync_level or
+        above wait for their sync and 'every-record' makes every record
+        wait. The sync is a group commit done outside of the lock: the
+        first waiting thread fsyncs everything written so far and the
+        threads arriving meanwhile share the next fsync. A record waiting
+        for its sync writes the buffer first in buffered mode.
+    """
+    def __init__(self, filename, when='h', interval=1, buffered=False,
+                 buffer_size=65536, buffer_records=1000, flush_interval=1.0,
+                 flush_level=ERROR, compression=None, max_bytes=0, backup_count=0,
+                 max_total_bytes=0, max_age=0, binary=False, durability='none',
+                 sync_interval=1.0, sync_level=ERROR, suffix=None, log_extension=None,
+                 **kwargs):
+        """
+            Init function.
+
+            suffix replaces the strftime format of the rotated file names and
+            log_extension is appended to them.
+        """
+        super().__init__(filename, when=when, interval=interval, **kwargs)
+        if suffix:
+            self.suffix = suffix
+        self.log_extension = log_extension or ''
+        if log_extension:
+            self.namer = lambda name: name + log_extension
+        self.size_encoding = (locale.getpreferredencoding(False)
+                              if self.encoding in (None, 'locale') else self.encoding)
+        self.durability = durability
+        self.sync_interval = sync_interval
+        self.sync_level = sync_level
+        # Records counted when emitted, written to the OS and fsynced.
+        self.sequence = 0
+        self.written = 0
+        self.synced = 0
+        self.new_file = durability != 'none'
+        self.syncing = False
+        self.sync_condition = Condition(Lock())
+        self.syncs = 0
+        self.sync_seconds = 0.0
+        self.encoder = None
+        self.blank = ''
+        if binary:
+            opened = self.stream is not None
+            if opened:
+                self.stream.close()
+                self.stream = None
+            self.mode, self.encoding, self.errors = 'ab', None, None
+            self.terminator = self.blank = b''
+            self.encoder = BinaryEncoder()
+            if opened:
+                self._open_stream()
+        self.buffered = buffered
+        self.buffer_size = buffer_size
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        self.file_size = (os.path.getsize(self.baseFilename)
+                          if os.path.exists(self.baseFilename) else 0)
+        self.backups_lock = Lock()
+        self.backups = deque()
+        if backup_count or max_total_bytes or max_age:
+            self.backups.extend(self._scan_backups())
+        self.users = 0
+        self.rotations = 0
+        self.rotation_seconds = 0.0
+        self.buffer = []
+        self.buffered_size = 0
+        self.last_flush = time.monotonic()
+        self.flusher_stop = Event()
+        self.flusher = None
+        if buffered and flush_interval > 0:
+            self.flusher = Thread(target=self._flush_periodically,
+                                  name=f"flusher-{self.baseFilename}",
+                                  daemon=True)
+            self.flusher.start()
+        self.syncer = None
+        if durability == 'interval':
+            self.syncer = Thread(target=self._sync_periodically,
+                                 name=f"syncer-{self.baseFilename}",
+                                 daemon=True)
+            self.syncer.start()
+
+    def handle(self, record):
+        """ Emit the record under the lock, then wait for its sync outside of it. """
+        kept = self.filter(record)
+        if kept:
+            self.acquire()
+            try:
+                ticket = self.emit(record)
+            finally:
+                self.release()
+            if ticket:
+                try:
+                    self.sync(ticket)
+                except Exception:
+                    self.handleError(record)
+        return kept
+
+    def emit(self, record):
+        """
+        Format the record and write it, or buffer it in buffered mode.
+
+        :return: int - the ticket of the record, see emit_formatted
+        """
+        try:
+            return self.emit_formatted(record, self.format(record))
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+            return 0
+
+    def emit_formatted(self, record, message):
+        """
+        Write an already formatted record, rotating the file first if needed.
+
+        :param record: <LogRecord> - the record being emitted.
+        :param message: str - the record formatted by the caller, or the
+            entry of a BinaryFormatter in binary mode.
+        :return: int - the ticket to pass to sync once the lock is released
+            for the record to be durable, 0 when it does not wait for a sync
+        """
+        entry = message
+        if self.encoder is not None:
+            message = self.encoder.encode(entry, not self.file_size + self.buffered_size)
+        message += self.terminator
+        if self.shouldRollover(record) or self._is_full(message):
+            self._write_buffer()
+            self.doRollover()
+            if self.encoder is not None:
+                message = self.encoder.encode(entry, True)
+        self.sequence += 1
+        ticket = 0
+        if (self.durability == 'every-record'
+                or self.durability == 'level-triggered' and record.levelno >= self.sync_level):
+            ticket = self.sequence
+        if not self.buffered:
+            self._open_stream()
+            self.stream.write(message)
+            self.file_size += self._size(message)
+            self.flush()
+            return ticket
+        self.buffer.append(message)
+        self.buffered_size += self._size(message)
+        if (ticket or record.levelno >= self.flush_level
+                or self.buffered_size >= self.buffer_size
+                or len(self.buffer) >= self.buffer_records
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+        return ticket
+
+    def sync(self, ticket=None):
+        """
+        Fsync the file until the record of ticket is durable, without the lock held.
+
+        :param ticket: int - from emit_formatted, None for every written record.
+        """
+        with self.sync_condition:
+            if ticket is None:
+                ticket = self.written
+            while self.synced < ticket and self.syncing:
+                self.sync_condition.wait()
+            if self.synced >= ticket:
+                return
+            self.syncing = True
+        synced = self.synced
+        started = time.perf_counter()
+        try:
+            # The descriptor is duplicated so that a rollover can close the file meanwhile.
+            self.acquire()
+            try:
+                synced = self.written
+                new_file, self.new_file = self.new_file, False
+                descriptor = os.dup(self.stream.fileno()) if self.stream else None
+            finally:
+                self.release()
+            if descriptor is not None:
+                try:
+                    os.fsync(descriptor)
+                finally:
+                    os.close(descriptor)
+            if new_file:
+                self._sync_directory()
+        finally:
+            with self.sync_condition:
+                self.synced = max(self.synced, synced)
+                self.syncing = False
+                self.syncs += 1
+                self.sync_seconds += time.perf_counter() - started
+                self.sync_condition.notify_all()
+
+    def get_sync_stats(self):
+        """
+        Get the number of fsyncs, the time spent in them and the records made durable.
+
+        :return: dict - syncs, seconds and records
+        """
+        with self.sync_condition:
+            return {'syncs': self.syncs, 'seconds': self.sync_seconds, 'records': self.synced}
+
+    def doRollover(self):
+        """
+        Swap the current file for a new one.
+
+        The rotated name gets a counter when the period was already rotated
+        for size, so a backup is never overwritten.
+        """
+        started = time.perf_counter()
+        if self.stream:
+            self._sync_stream()
+            self.stream.close()
+            self.stream = None
+        self.written = self.sequence - len(self.buffer)
+        current_time = int(time.time())
+        name = self.baseFilename + "." + time.strftime(self.suffix, self._period_start())
+        destination = self.rotation_filename(name)
+        counter = 1
+        while self._is_taken(destination):
+            destination = self.rotation_filename(f"{name}.{counter}")
+            counter += 1
+        if os.path.exists(self.baseFilename):
+            self.rotate(self.baseFilename, destination)
+            ROTATION_WORKER.submit(self._archive, destination)
+        self.file_size = 0
+        if not self.delay:
+            self.stream = self._open()
+        if current_time >= self.rolloverAt:
+            self.rolloverAt = self._next_rollover(current_time)
+        self.rotations += 1
+        self.rotation_seconds += time.perf_counter() - started
+
+    def get_rotation_stats(self):
+        """
+        Get the number of rotations and the time spent in them.
+
+        Compressing and pruning the backups happen on a background thread
+        and are not included.
+
+        :return: dict - rotations and seconds
+        """
+        return {'rotations': self.rotations, 'seconds': self.rotation_seconds}
+
+    def get_backups(self):
+        """
+        Get the tracked backups, oldest first.
+
+        :return: list - the backup paths
+        """
+        with self.backups_lock:
+            return [path for path, _, _ in self.backups]
+
+    def flush(self):
+        """ Write the pending records and flush the stream. """
+        self.acquire()
+        try:
+            self._write_buffer()
+            super().flush()
+            self.written = self.sequence
+        finally:
+            self.release()
+
+    def close(self):
+        """ Stop the periodic flush, write the pending records and close the file. """
+        self.flusher_stop.set()
+        self.acquire()
+        try:
+            self._write_buffer()
+            if self.stream:
+                self._sync_stream()
+            super().close()
+        finally:
+            self.release()
+
+    def _open_stream(self):
+        """ Open the file if it was delayed or closed by a rollover. """
+        if self.stream is None and (self.mode != 'w' or not self.flusher_stop.is_set()):
+            self.stream = self._open()
+            self.new_file = self.durability != 'none'
+
+    def _sync_stream(self):
+        """ Fsync the file before it is closed, the lock must be held. """
+        written = self.sequence - len(self.buffer)
+        if self.durability == 'none' or self.synced >= written:
+            return
+        started = time.perf_counter()
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+        if self.new_file:
+            self.new_file = False
+            self._sync_directory()
+        with self.sync_condition:
+            self.synced = max(self.synced, written)
+            self.syncs += 1
+            self.sync_seconds += time.perf_counter() - started
+
+    def _sync_directory(self):
+        """ Fsync the directory of the file, making its creation or rename durable. """
+        descriptor = os.open(os.path.dirname(self.baseFilename), os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    def _write_buffer(self):
+        """ Write the pending records with a single call, the lock must be held. """
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        self._open_stream()
+        self.stream.write(self.blank.join(self.buffer))
+        self.file_size += self.buffered_size
+        self.buffer = []
+        self.buffered_size = 0
+
+    def _is_full(self, message):
+        """ Tell if message would make the file larger than max_bytes. """
+        if not self.max_bytes:
+            return False
+        size = self.file_size + self.buffered_size
+        return size > 0 and size + self._size(message) > self.max_bytes
+
+    def _size(self, message):
+        """ Get the size of message once written to the file, in bytes. """
+        if self.encoder is not None or message.isascii():
+            return len(message)
+        return len(message.encode(self.size_encoding, self.errors or 'strict'))
+
+    def _is_taken(self, path):
+        """ Tell if a rotated file, compressed or not, already uses path. """
+        if os.path.exists(path):
+            return True
+        return bool(self.compression) and os.path.exists(path + COMPRESSIONS[self.compression][1])
+
+    def _period_start(self):
+        """ Get the time tuple of the start of the current period. """
+        start = self.rolloverAt - self.interval
+        if self.utc:
+            return time.gmtime(start)
+        time_tuple = time.localtime(start)
+        dst_now = time.localtime()[-1]
+        if dst_now != time_tuple[-1]:
+            time_tuple = time.localtime(start + (3600 if dst_now else -3600))
+        return time_tuple
+
+    def _next_rollover(self, current_time):
+        """ Compute the next rollover time, following the DST changes. """
+        rollover_at = self.computeRollover(current_time)
+        while rollover_at <= current_time:
+            rollover_at += self.interval
+        if (self.when == 'MIDNIGHT' or self.when.startswith('W')) and not self.utc:
+            dst_now = time.localtime(current_time)[-1]
+            if dst_now != time.localtime(rollover_at)[-1]:
+                rollover_at += 3600 if dst_now else -3600
+        return rollover_at
+
+    def _scan_backups(self):
+        """ List the existing backups once, oldest first. """
+        directory, base = os.path.split(self.baseFilename)
+        pattern = self._backup_pattern(base)
+        backups = []
+        for entry in os.scandir(directory):
+            if pattern.match(entry.name) and entry.is_file():
+                stat = entry.stat()
+                backups.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(backups, key=lambda backup: backup[2])
+
+    def _backup_pattern(self, base):
+        """ Compile the pattern of the backup names this handler produces. """
+        return backup_pattern(base, self.suffix, self.log_extension,
+                              [self.compression] if self.compression else [])
+
+    def _archive(self, path):
+        """ Compress a rotated file, track it and apply the retention (worker thread). """
+        if self.compression:
+            path = compress_file(path, self.compression)
+        with self.backups_lock:
+            self.backups.append((path, os.path.getsize(path), time.time()))
+            total = sum(size for _, size, _ in self.backups)
+            while self.backups and (
+                    (self.backup_count and len(self.backups) > self.backup_count)
+                    or (self.max_total_bytes and total > self.max_total_bytes)
+                    or (self.max_age and time.time() - self.backups[0][2] > self.max_age)):
+                oldest, size, _ = self.backups.popleft()
+                total -= size
+                try:
+                    os.remove(oldest)
+                except FileNotFoundError:
+                    pass
+
+    def _flush_periodically(self):
+        """ Background loop writing the records older than flush_interval. """
+        while not self.flusher_stop.wait(self.flush_interval):
+            if self.buffer and time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def _sync_periodically(self):
+        """ Background loop fsyncing the records written since the last sync. """
+        while not self.flusher_stop.wait(self.sync_interval):
+            try:
+                self.sync()
+            except OSError:
+                traceback.print_exc(file=sys.stderr)
+
+
+class SharedFileHandler(Handler):
+    """
+        Handler with its own level and formatter writing through a shared
+        HomemadeRotatingFileHandler.
+
+        The record is formatted outside of the writer lock. The writer is
+        closed when the last handler using it is closed.
+    """
+    def __init__(self, writer):
+        """
+            Init function.
+        """
+        super().__init__()
+        self.writer = writer
+        self.closed = False
+        with SHARED_LOCK:
+            writer.users += 1
+
+    def get_writer(self):
+        """
+        Get the writer shared by the handlers targeting the same file.
+
+        :return: <HomemadeRotatingFileHandler>
+        """
+        return self.writer
+
+    def handle(self, record):
+        """ Emit the record under the lock, then wait for its sync outside of it. """
+        kept = self.filter(record)
+        if kept:
+            self.acquire()
+            try:
+                ticket = self.emit(record)
+            finally:
+                self.release()
+            if ticket:
+                try:
+                    self.writer.sync(ticket)
+                except Exception:
+                    self.handleError(record)
+        return kept
+
+    def emit(self, record):
+        """
+        Format the record and hand it to the writer.
+
+        :return: int - the ticket of the record, see emit_formatted
+        """
+        try:
+            message = self.format(record)
+            self.writer.acquire()
+            try:
+                return self.writer.emit_formatted(record, message)
+            finally:
+                self.writer.release()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+            return 0
+
+    def flush(self):
+        """ Flush the writer. """
+        self.writer.flush()
+
+    def close(self):
+        """ Close the handler, and the writer if no other handler uses it. """
+        with SHARED_LOCK:
+            if self.closed:
+                return
+            self.closed = True
+            self.writer.users -= 1
+            last = self.writer.users == 0
+        if last:
+            self.writer.close()
+        else:
+            self.writer.flush()
+        super().close()
+
+
+def suffix_pattern(suffix):
+    """
+    Get the regular expression matching the names a strftime suffix produces.
+
+    :param suffix: str - the strftime format.
+    :return: str
+    """
+    return ''.join(STRFTIME_PATTERNS.get(directive, '.+?') if directive else re.escape(text)
+                   for directive, text in re.findall(r'%(.)|([^%]+)', suffix))
+
+
+def backup_pattern(base, suffix, log_extension='', compressions=None):
+    """
+    Compile the pattern of the rotated file names of a file.
+
+    The names are the file name, the strftime suffix, an optional rollover
+    counter, log_extension and the compression extension.
+
+    :param base: str - the file name, without its directory.
+    :param suffix: str - the strftime format.
+    :param log_extension: str - appended to the rotated file names.
+    :param compressions: list - the compressions of the files, None for any of COMPRESSIONS.
+    :return: <Pattern>
+    """
+    extensions = [COMPRESSIONS[compression][1]
+                  for compression in (COMPRESSIONS if compressions is None else compressions)]
+    compression = '|'.join(re.escape(extension) for extension in extensions)
+    return re.compile(rf'^{re.escape(base)}\.{suffix_pattern(suffix)}(\.\d+)?'
+                      rf'{re.escape(log_extension)}({compression})?$')
+
+
+def get_writer(filename, log_extension=None, suffix=None, **config):
+    """
+    Get the writer of a file, shared by every handler with the same path.
+
+    A file has a single writer, so a single rotation schedule: asking for
+    it with another config while it is in use raises a ValueError. The file
+    is only opened when the first record is written.
+
+    :param filename: str - the file path.
+    :param log_extension: str - appended to the rotated file names.
+    :param suffix: str - strftime format of the rotated file names.
+    :param config: the other HomemadeRotatingFileHandler arguments.
+    :return: <HomemadeRotatingFileHandler>
+    """
+    path = os.path.abspath(filename)
+    config = {'log_extension': log_extension, 'suffix': suffix, **config}
+    with SHARED_LOCK:
+        writer = WRITERS.get(path)
+        if writer is None or writer.flusher_stop.is_set():
+            writer = WRITERS[path] = HomemadeRotatingFileHandler(filename, delay=True, **config)
+            writer.config = config
+        elif writer.config != config:
+            changes = {name: value for name, value in config.items()
+                       if writer.config.get(name) != value}
+            raise ValueError(f"{path} is already written with another config, "
+                             f"conflicting on {changes}.")
+    return writer
+
+
+def get_file_handler(writer, level, formatter, key):
+    """
+    Get the handler writing through writer with a level and a formatter.
+
+    Handlers with the same writer, level and formatter key are shared.
+
+    :param writer: <HomemadeRotatingFileHandler> - from get_writer.
+    :param level: int - the handler level.
+    :param formatter: <Formatter> - used when the handler is created.
+    :param key: hashable - identifies the formatter config.
+    :return: <SharedFileHandler>
+    """
+    with SHARED_LOCK:
+        handler = FILE_HANDLERS.get((id(writer), level, key))
+        if handler is None or handler.writer is not writer or handler.closed:
+            handler = FILE_HANDLERS[(id(writer), level, key)] = SharedFileHandler(writer)
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
+    return handler
+
+
+class BufferedRecord:
+    """
+        Compact copy of a LogRecord, kept unformatted by the RingBufferHandler.
+
+        The attributes added by extra, bind or the filters are kept in extra.
+    """
+    __slots__ = ('name', 'levelno', 'pathname', 'lineno', 'msg', 'args', 'exc_info',
+                 'exc_text', 'stack_info', 'func', 'created', 'msecs', 'relative', 'thread',
+                 'thread_name', 'process', 'process_name', 'extra')
+
+    def __init__(self, record):
+        self.name = record.name
+        self.levelno = record.levelno
+        self.pathname = record.pathname
+        self.lineno = record.lineno
+        self.msg = record.msg
+        self.args = record.args
+        self.exc_info = record.exc_info
+        self.exc_text = record.exc_text
+        self.stack_info = record.stack_info
+        self.func = record.funcName
+        self.created = record.created
+        self.msecs = record.msecs
+        self.relative = record.relativeCreated
+        self.thread = record.thread
+        self.thread_name = record.threadName
+        self.process = record.process
+        self.process_name = record.processName
+        self.extra = {key: value for key, value in record.__dict__.items()
+                      if key not in BUFFERED_ATTRIBUTES} or None
+
+    def to_record(self):
+        """
+        Build the LogRecord back.
+
+        :return: <LogRecord>
+        """
+        record = LogRecord(self.name, self.levelno, self.pathname, self.lineno,
+                           self.msg, self.args, self.exc_info, self.func, self.stack_info)
+        record.exc_text = self.exc_text
+        record.created = self.created
+        record.msecs = self.msecs
+        record.relativeCreated = self.relative
+        record.thread = self.thread
+        record.threadName = self.thread_name
+        record.process = self.process
+        record.processName = self.process_name
+        if self.extra is not None:
+            record.__dict__.update(self.extra)
+        return record
+
+
+class RingBufferHandler(Handler):
+    """
+        Handler keeping the last capacity records in memory.
+
+        Nothing is written until a record of trigger_level or above comes:
+        the buffered records, then that record, are handed to the targets,
+        each one applying its own level. The records are kept unformatted,
+        so their args must not be mutated after the logging call.
+    """
+    def __init__(self, targets, capacity=1000, trigger_level=ERROR):
+        """
+            Init function.
+        """
+        super().__init__()
+        self.targets = targets
+        self.capacity = capacity
+        self.trigger_level = trigger_level
+        self.buffer = deque(maxlen=capacity)
+
+    def emit(self, record):
+        """ Buffer the record, or flush the buffer to the targets on a trigger. """
+        if record.levelno < self.trigger_level:
+            self.buffer.append(BufferedRecord(record))
+            return
+        buffered = list(self.buffer)
+        self.buffer.clear()
+        for entry in buffered:
+            self._dispatch(entry.to_record())
+        self._dispatch(record)
+
+    def _dispatch(self, record):
+        """ Hand a record to the targets whose level accepts it. """
+        for target in self.targets:
+            if record.levelno >= target.level:
+                target.handle(record)
+
+
+class ThreadBufferHandler(Handler):
+    """
+        Handler where each thread appends its formatted records to its own
+        buffer, without taking a lock, and a single writer thread writes
+        them to the target in time order.
+
+        The writer runs every window seconds and only writes the records
+        older than window seconds, merged by creation time: the records of
+        a thread keep their order and records of different threads are out
+        of order only when one took more than window seconds to reach its
+        buffer. A thread with capacity records pending waits for the writer.
+
+        A target with a shared writer (file handlers) gets the formatted
+        records under the writer lock, a StreamHandler gets one write per
+        batch, other handlers get each record to handle.
+    """
+    def __init__(self, target, window=0.05, capacity=10000):
+        """
+            Init function.
+        """
+        super().__init__(target.level)
+        self.target = target
+        self.window = window
+        self.capacity = capacity
+        self.setFormatter(target.formatter)
+        self.local = local()
+        self.buffers = []
+        self.buffers_lock = Lock()
+        self.write_lock = Lock()
+        self.pending = []
+        self.stopping = Event()
+        self.writer = Thread(target=self._run, name=f"thread-buffers-{id(self):x}", daemon=True)
+        self.writer.start()
+
+    def handle(self, record):
+        """ Filter, format and buffer the record for the writer thread. """
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record):
+        """ Format the record and append it to the buffer of the current thread. """
+        try:
+            message = self.format(record)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+            return
+        buffer = self.local.__dict__.get('buffer')
+        if buffer is None:
+            buffer = self._add_buffer()
+        buffer.append((record.created, record, message))
+        while len(buffer) >= self.capacity and not self.stopping.is_set():
+            time.sleep(self.window / 10)
+
+    def flush(self):
+        """ Write every buffered record. """
+        self._drain(None)
+
+    def close(self):
+        """ Stop the writer thread and write every buffered record. """
+        self.stopping.set()
+        if self.writer.is_alive() and self.writer is not current_thread():
+            self.writer.join()
+        self.flush()
+        super().close()
+
+    def _add_buffer(self):
+        """ Create the buffer of the current thread. """
+        buffer = self.local.buffer = deque()
+        with self.buffers_lock:
+            self.buffers.append((current_thread(), buffer))
+        return buffer
+
+    def _run(self):
+        """ Writer loop. """
+        while not self.stopping.wait(self.window):
+            self._drain(time.time() - self.window)
+
+    def _drain(self, cutoff):
+        """ Merge the buffers and write the records created before cutoff (None for all). """
+        with self.write_lock:
+            with self.buffers_lock:
+                buffers = list(self.buffers)
+                self.buffers = [(thread, buffer) for thread, buffer in buffers
+                                if buffer or thread.is_alive()]
+            taken = []
+            for _, buffer in buffers:
+                items = []
+                for _ in range(len(buffer)):
+                    items.append(buffer.popleft())
+                if items:
+                    taken.append(items)
+            if not taken and not self.pending:
+                return
+            merged = list(heapq.merge(self.pending, *taken, key=itemgetter(0)))
+            count = len(merged)
+            if cutoff is not None:
+                count = next((position for position, item in enumerate(merged)
+                              if item[0] > cutoff), count)
+            self.pending = merged[count:]
+            if count:
+                self._write(merged[:count])
+
+    def _write(self, batch):
+        """ Hand a batch of (created, record, message) to the target. """
+        target = self.target
+        try:
+            if hasattr(target, 'get_writer'):
+                writer = target.get_writer()
+                ticket = 0
+                writer.acquire()
+                try:
+                    for _, record, message in batch:
+                        ticket = writer.emit_formatted(record, message) or ticket
+                finally:
+                    writer.release()
+                if ticket:
+                    writer.sync(ticket)
+            elif isinstance(target, StreamHandler):
+                target.acquire()
+                try:
+                    target.stream.write(''.join(message + target.terminator
+                                                for _, _, message in batch))
+                    target.flush()
+                finally:
+                    target.release()
+            else:
+                for _, record, _ in batch:
+                    if record.levelno >= target.level:
+                        target.handle(record)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
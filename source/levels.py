@@ -0,0 +1,217 @@
+"""
+    Live reconfiguration of the HomemadeLogger levels by logger name prefix.
+"""
+
+# Imports
+import json
+import os
+import signal
+import sys
+import traceback
+from logging import getLevelName
+from threading import (
+    Event,
+    Lock,
+    Thread
+)
+# Project modules
+from logger import (
+    LEVEL_HOOKS,
+    LEVELS,
+    LOGGER_OWNERS,
+    REGISTRY_LOCK,
+    normalize_name
+)
+
+# Environment
+
+
+def parse_level(level):
+    """
+    Get a level from its value or name.
+
+    :param level: int or str - e.g. 10 or 'DEBUG'.
+    :return: int
+    """
+    if isinstance(level, str):
+        level = getLevelName(level.strip().upper())
+    if not isinstance(level, int) or level not in LEVELS:
+        raise ValueError(f"Level must be in [DEBUG, INFO, WARNING, ERROR] instead of {level}.")
+    return level
+
+
+class LevelController:
+    """
+        Set the levels of the running HomemadeLoggers from rules by name prefix.
+
+        A rule 'app.db' applies to the loggers 'app.db' and 'app.db.*'; the
+        longest matching prefix wins, then default. A logger no rule applies
+        to gets back the level it was built with. The rules come from an API
+        call (set_levels), a JSON file read on a signal (reload_on_signal)
+        or when it changes (watch):
+            {"default": "WARNING", "levels": {"app.db": "DEBUG"}}
+        The loggers built later get the rules too.
+    """
+    def __init__(self, levels=None, default=None):
+        """
+            Init function.
+
+            :param levels: dict - logger name prefix -> level (int or name).
+            :param default: int or str - level of the loggers no rule applies to.
+        """
+        self.levels = {}
+        self.default = None
+        self.lock = Lock()
+        self.watching = Event()
+        self.watcher = None
+        self.set_levels(levels or {}, default)
+        LEVEL_HOOKS.append(self.apply)
+
+    def get_levels(self):
+        """
+        Get the rules.
+
+        :return: dict - logger name prefix -> level
+        """
+        return dict(self.levels)
+
+    def get_default(self):
+        """
+        Get the level of the loggers no rule applies to.
+
+        :return: int - None to keep their own level
+        """
+        return self.default
+
+    def get_level(self, name):
+        """
+        Get the level a rule gives to a logger name.
+
+        :param name: str - the logger name.
+        :return: int - None when no rule applies
+        """
+        name = normalize_name(name)
+        levels = self.levels
+        while True:
+            if name in levels:
+                return levels[name]
+            if '.' not in name:
+                return self.default
+            name = name.rsplit('.', 1)[0]
+
+    def set_levels(self, levels, default=None):
+        """
+        Replace the rules and apply them to the running loggers.
+
+        :param levels: dict - logger name prefix -> level (int or name).
+        :param default: int or str - level of the loggers no rule applies to.
+        """
+        if not isinstance(levels, dict):
+            raise TypeError(f"Levels must be dict instead of {type(levels)}.")
+        parsed = {normalize_name(prefix): parse_level(level) for prefix, level in levels.items()}
+        default = None if default is None else parse_level(default)
+        with self.lock:
+            self.levels, self.default = parsed, default
+            with REGISTRY_LOCK:
+                owners = list(LOGGER_OWNERS.values())
+            for homemade_logger in owners:
+                self.apply(homemade_logger)
+
+    def set_level(self, prefix, level):
+        """
+        Add or replace one rule, None removes it.
+
+        :param prefix: str - the logger name prefix.
+        :param level: int or str - the level.
+        """
+        levels = self.get_levels()
+        if level is None:
+            levels.pop(normalize_name(prefix), None)
+        else:
+            levels[prefix] = level
+        self.set_levels(levels, self.default)
+
+    def apply(self, homemade_logger):
+        """ Set the level of a logger from the rules. """
+        level = self.get_level(homemade_logger.get_name())
+        homemade_logger.set_level(homemade_logger.get_configured_level() if level is None
+                                  else level)
+
+    def load(self, path):
+        """
+        Read the rules from a JSON file.
+
+        :param path: str - {"default": level, "levels": {prefix: level}}.
+        """
+        with open(path) as config_file:
+            config = json.load(config_file)
+        self.set_levels(config.get('levels', {}), config.get('default'))
+
+    def reload_on_signal(self, path, signum=signal.SIGHUP):
+        """
+        Read the rules from path when the process gets signum (main thread only).
+
+        :param path: str - the JSON file.
+        :param signum: int - the signal.
+        """
+        def reload(received, frame):
+            # Not in the handler itself: the interrupted code may hold self.lock.
+            Thread(target=self._reload, args=(path,), name='homemade-levels-reload',
+                   daemon=True).start()
+
+        signal.signal(signum, reload)
+
+    def _reload(self, path):
+        """ Read the rules from path, reporting the errors. """
+        try:
+            self.load(path)
+        except (OSError, ValueError):
+            traceback.print_exc(file=sys.stderr)
+
+    def watch(self, path, interval=1.0):
+        """
+        Read the rules from path now and whenever it changes, checked every interval seconds.
+
+        :param path: str - the JSON file.
+        :param interval: float - seconds between two checks.
+        """
+        if not isinstance(interval, (int, float)):
+            raise TypeError(f"Interval must be float instead of {type(interval)}.")
+        if interval <= 0:
+            raise ValueError("Interval must be >0")
+        self.stop()
+        self.watching.clear()
+        self.watcher = Thread(target=self._watch, args=(path, interval),
+                              name='homemade-levels', daemon=True)
+        self.watcher.start()
+
+    def stop(self):
+        """ Stop watching the file. """
+        if self.watcher is not None:
+            self.watching.set()
+            self.watcher.join()
+            self.watcher = None
+
+    def close(self):
+        """ Stop watching and stop applying the rules to the loggers built later. """
+        self.stop()
+        if self.apply in LEVEL_HOOKS:
+            LEVEL_HOOKS.remove(self.apply)
+
+    def _watch(self, path, interval):
+        """ Watch loop. """
+        seen, failed = None, False
+        while True:
+            try:
+                stat = os.stat(path)
+                if (stat.st_mtime_ns, stat.st_size) != seen:
+                    seen = (stat.st_mtime_ns, stat.st_size)
+                    self.load(path)
+                failed = False
+            except (OSError, ValueError):
+                # Reported once until the file can be read again.
+                if not failed:
+                    traceback.print_exc(file=sys.stderr)
+                seen, failed = None, True
+            if self.watching.wait(interval):
+                return
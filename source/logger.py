@@ -7,19 +7,71 @@
 """
 
 # Imports
+import atexit
+import inspect
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
 from logging import (
     getLogger,
-    Formatter,
+    getLogRecordFactory,
+    LogRecord,
+    Filter,
     StreamHandler,
+    NOTSET,
     DEBUG,
     INFO,
     WARNING,
     ERROR
 )
-from logging.handlers import TimedRotatingFileHandler
+from threading import Lock
 # Project modules
+from formatters import (
+    FIELD_PATTERN,
+    OUTPUTS,
+    RECORD_ATTRIBUTES,
+    TracebackDeduplicator,
+    build_formatter
+)
+from binlog import BinaryFormatter
+from network import (
+    PROTOCOLS,
+    ShippingHandler
+)
+from handlers import (
+    COMPRESSIONS,
+    DURABILITIES,
+    RingBufferHandler,
+    ThreadBufferHandler,
+    get_file_handler,
+    get_writer
+)
+from queue_logging import (
+    OVERFLOW_POLICIES,
+    build_queue_pipeline
+)
+from metrics import (
+    MetricsExporter,
+    instrument_handler,
+    pipeline_snapshot
+)
+from records import (
+    RecordBuilder,
+    get_chain_handlers,
+    get_record_fields
+)
 
 # Environment
+FILE_OUTPUTS = OUTPUTS + ['binary']
+LOGGERS = {}
+LOGGER_OWNERS = {}
+STREAM_HANDLERS = {}
+REGISTRY_LOCK = Lock()
+FACTORY_LOCK = Lock()
+LEVELS = [DEBUG, INFO, WARNING, ERROR]
+LEVEL_HOOKS = []
+INTROSPECTIONS = ['auto', 'full']
+CONTEXT_FIELDS = ContextVar('homemade_context_fields', default={})
 
 
 class HomemadeLogger:
@@ -27,9 +79,52 @@ class HomemadeLogger:
     def __init__(self, name="My Own Logger",
                  level=INFO,
                  log_format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                 handlers=[]):
+                 handlers=[],
+                 asynchronous=False,
+                 queue_size=10000,
+                 overflow='block',
+                 output='text',
+                 static_fields=None,
+                 filters=[],
+                 metrics=False,
+                 traceback_window=0,
+                 introspection='auto'):
         """
             Init function.
+
+            output selects 'text' lines rendered with log_format or 'json'
+            lines, which carry static_fields on top of host, pid and name.
+
+            When asynchronous is True, records are put on a bounded queue of
+            queue_size records and written by a background thread. overflow
+            selects what happens when that queue is full: 'block',
+            'drop_newest' or 'drop_oldest' (evicts the lowest level first).
+
+            filters are added to the logger, e.g. a HomemadeRateLimitFilter.
+
+            level is the one of the stderr handler. A handler with a lower
+            level, e.g. a HomemadeRingBufferHandler at DEBUG, lowers the
+            logger gate to its own level; the handlers without a level then
+            get the level, so only the handlers asking for the lower records
+            receive them.
+
+            The fields of bind_context and bind() can be used in log_format
+            and in the handler formats; they are empty when not set.
+
+            metrics times and counts the records of every handler, see
+            get_metrics. Handlers are shared, so are their metrics.
+
+            With traceback_window seconds (0 disables it), a traceback is
+            written in full once per fingerprint (exception types and frame
+            locations) and window; the repeats within the window get a one
+            line reference with an occurrence count, for every handler.
+
+            With introspection='auto', a record only gets the caller, thread
+            and process attributes its formats and filters read, the caller
+            being cached per code location. It falls back to the stdlib
+            records for a handler or filter it cannot describe, for
+            stack_info and for a custom record factory. 'full' always
+            collects everything, e.g. for handlers added to get_logger().
         """
         if not isinstance(name, str):
             raise TypeError(f"Name must be str instead of {type(name)}.")
@@ -39,16 +134,61 @@ class HomemadeLogger:
             raise TypeError(f"Log_format must be str instead of {type(log_format)}.")
         if not isinstance(handlers, list):
             raise TypeError(f"Handlers must be list instead of {type(handlers)}.")
-        if level not in [DEBUG,
-                         INFO,
-                         WARNING,
-                         ERROR]:
+        if not isinstance(asynchronous, bool):
+            raise TypeError(f"Asynchronous must be bool instead of {type(asynchronous)}.")
+        if not isinstance(queue_size, int):
+            raise TypeError(f"Queue_size must be int instead of {type(queue_size)}.")
+        if not isinstance(overflow, str):
+            raise TypeError(f"Overflow must be str instead of {type(overflow)}.")
+        if level not in LEVELS:
             raise ValueError(f"Level must be in [DEBUG, INFO, WARNING, ERROR] instead of {level}.")
-        self.name = (name.strip().lower()
-                     .replace(' ', '_'))
+        if queue_size < 1:
+            raise ValueError("Queue_size must be >=1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow must be in {OVERFLOW_POLICIES} instead of {overflow}.")
+        check_output(output, static_fields)
+        if not isinstance(filters, list):
+            raise TypeError(f"Filters must be list instead of {type(filters)}.")
+        if not isinstance(metrics, bool):
+            raise TypeError(f"Metrics must be bool instead of {type(metrics)}.")
+        if not isinstance(traceback_window, (int, float)):
+            raise TypeError(f"Traceback_window must be float instead of {type(traceback_window)}.")
+        if traceback_window < 0:
+            raise ValueError("Traceback_window must be >=0")
+        if not isinstance(introspection, str):
+            raise TypeError(f"Introspection must be str instead of {type(introspection)}.")
+        if introspection not in INTROSPECTIONS:
+            raise ValueError(f"Introspection must be in {INTROSPECTIONS} "
+                             f"instead of {introspection}.")
+        self.name = normalize_name(name)
         self.level = level
+        self.configured_level = level
+        self.threshold = level
+        self.level_lock = Lock()
         self.format = log_format
         self.handlers = handlers
+        self.asynchronous = asynchronous
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.output = output
+        self.static_fields = static_fields
+        self.filters = filters
+        self.metrics = metrics
+        self.deduplicator = TracebackDeduplicator(traceback_window) if traceback_window else None
+        self.introspection = introspection
+        self.record_state = (None, None, None)
+        self.exporters = []
+        self.pipeline_handlers = []
+        self.unleveled_handlers = []
+        self.queue = None
+        self.queue_handler = None
+        self.listener = None
+        self.logger = None
+        self.installed_handlers = []
+        self.context_filter = ContextFilter(self.get_format_fields())
+        self.internal_filters = [self.context_filter]
+        if self.deduplicator is not None:
+            self.internal_filters.append(self.deduplicator)
         self.create_logger()
 
     def get_name(self):
@@ -67,6 +207,77 @@ class HomemadeLogger:
         """
         return self.level
 
+    def get_configured_level(self):
+        """
+        Get the level given at init, before any set_level.
+
+        :return: int - the logging level
+        """
+        return self.configured_level
+
+    def get_gate_level(self):
+        """
+        Get the level of the stdlib logger and of the cached threshold.
+
+        :return: int - the lowest of the logger level and of the levels set on its handlers
+        """
+        return min([self.level] + [handler.level for handler in self.pipeline_handlers[1:]
+                                   if handler not in self.unleveled_handlers])
+
+    def pin_handler_levels(self):
+        """
+        Give the logger level to the handlers without one while the gate is
+        lower, so they do not get the records only asked for by other handlers.
+        """
+        level = self.level if self.get_gate_level() < self.level else NOTSET
+        for handler in self.unleveled_handlers:
+            handler.setLevel(level)
+
+    def set_level(self, level):
+        """
+        Change the level of the logger and of its stream handler while it runs.
+
+        debug/info/... compare the level with the cached threshold first,
+        the gate level (see get_gate_level). When the level is raised the
+        threshold and the handlers without a level change first, when it is
+        lowered last, after the stream handler of the new level replaced
+        the old one in a single assignment, so every thread sees either
+        the old or the new level.
+
+        :param level: int - DEBUG, INFO, WARNING or ERROR.
+        """
+        if not isinstance(level, int):
+            raise TypeError(f"Level must be int instead of {type(level)}.")
+        if level not in LEVELS:
+            raise ValueError(f"Level must be in [DEBUG, INFO, WARNING, ERROR] instead of {level}.")
+        with self.level_lock:
+            if level == self.level:
+                return
+            raised = level > self.level
+            previous = self.pipeline_handlers[0]
+            self.level = level
+            gate = self.get_gate_level()
+            if raised:
+                self.threshold = max(self.threshold, gate)
+                self.pin_handler_levels()
+            stream_handler = self.get_stream_handler()
+            if self.metrics:
+                instrument_handler(stream_handler)
+            self.pipeline_handlers = [stream_handler] + self.pipeline_handlers[1:]
+            if not raised:
+                self.pin_handler_levels()
+            if self.listener is not None:
+                self.listener.handlers = tuple(stream_handler if handler is previous else handler
+                                               for handler in self.listener.handlers)
+                self.queue_handler.setLevel(min(handler.level
+                                                for handler in self.pipeline_handlers))
+            else:
+                self.logger.handlers = [stream_handler if handler is previous else handler
+                                        for handler in self.logger.handlers]
+                self.installed_handlers = self.pipeline_handlers
+            self.logger.setLevel(gate)
+            self.threshold = gate
+
     def get_format(self):
         """
         Get the logger format.
@@ -83,39 +294,546 @@ class HomemadeLogger:
         """
         return self.handlers
 
+    def is_asynchronous(self):
+        """
+        Tell if the records are written by a background thread.
+
+        :return: bool
+        """
+        return self.asynchronous
+
+    def get_filters(self):
+        """
+        Get the logger filters.
+
+        :return: list
+        """
+        return self.filters
+
+    def get_output(self):
+        """
+        Get the output mode of the records.
+
+        :return: str - 'text' or 'json'
+        """
+        return self.output
+
+    def get_format_fields(self):
+        """
+        Get the fields of the logger and handler formats that are not record attributes.
+
+        :return: tuple - the field names
+        """
+        formats = [self.get_format()] + [handler.get_format() for handler in self.get_handlers()
+                                         if hasattr(handler, 'get_format')]
+        fields = dict.fromkeys(match.group(1) for log_format in formats
+                               if log_format for match in FIELD_PATTERN.finditer(log_format))
+        return tuple(field for field in fields if field not in RECORD_ATTRIBUTES)
+
+    def get_introspection(self):
+        """
+        Get the introspection mode of the records.
+
+        :return: str - 'auto' or 'full'
+        """
+        return self.introspection
+
+    def get_record_fields(self):
+        """
+        Get the caller, thread and process attributes collected for the records.
+
+        :return: frozenset - None when every attribute is collected
+        """
+        builder = self.get_record_builder()
+        return None if builder is None else builder.get_fields()
+
+    def get_record_builder(self):
+        """
+        Get the builder of the records, made again when the handlers or filters they reach change.
+
+        Those are the handlers of the logger and of its ancestors when it
+        propagates, e.g. a handler added to the root logger by a test tool.
+
+        :return: <RecordBuilder> - None when the stdlib builds the records
+        """
+        if self.introspection == 'full':
+            return None
+        handlers = get_chain_handlers(self.logger)
+        filters = self.logger.filters
+        known_handlers, known_filters, builder = self.record_state
+        if handlers == known_handlers and filters == known_filters:
+            return builder
+        readers = handlers
+        if self.queue_handler in handlers:
+            readers = [handler for handler in handlers if handler is not self.queue_handler]
+            readers += self.pipeline_handlers
+        fields = get_record_fields(readers, filters)
+        builder = RecordBuilder(fields) if fields is not None else None
+        self.record_state = (handlers, list(filters), builder)
+        return builder
+
+    def get_queue(self):
+        """
+        Get the queue used in asynchronous mode.
+
+        :return: <HomemadeLogQueue> - the queue, None in synchronous mode
+        """
+        return self.queue
+
+    def get_metrics(self):
+        """
+        Get a snapshot of the logging pipeline metrics.
+
+        Every handler reports its rotations and drops when it has some; with
+        metrics=True, also its handle latency histogram and the records and
+        bytes written per level. In asynchronous mode the queue depth and
+        the dropped records are added.
+
+        :return: dict
+        """
+        return pipeline_snapshot(self.pipeline_handlers, self.queue)
+
+    def export_metrics(self, export, interval=60.0):
+        """
+        Give a metrics snapshot to export every interval seconds, and once on shutdown.
+
+        :param export: callable - called with the get_metrics dict.
+        :param interval: float - seconds between two exports.
+        :return: <MetricsExporter>
+        """
+        exporter = MetricsExporter(self.get_metrics, export, interval)
+        exporter.start()
+        self.exporters.append(exporter)
+        atexit.register(self.shutdown)
+        return exporter
+
     def get_logger(self):
         """
         Get the logger object.
 
         :return: <Logger> - the logger
         """
-        return getLogger(self.get_name())
+        return self.logger
 
     def create_logger(self):
-        """ Create the logger object using the init config. """
+        """
+        Create the logger object using the init config.
+
+        The handlers and filters installed by a previous HomemadeLogger of
+        the same name are replaced rather than added to, so building the
+        same logger again does not duplicate the records.
+        """
         logger = getLogger(self.get_name())
-        logger.setLevel(self.get_level())
-        stream_handler = StreamHandler()
-        stream_handler.setLevel(self.get_level())
-        stream_handler.setFormatter(Formatter(self.get_format()))
-        logger.addHandler(stream_handler)
-        for handler in self.get_handlers():
+        handlers = [self.get_stream_handler()] + [resolve_handler(handler)
+                                                  for handler in self.get_handlers()]
+        if self.metrics:
+            for handler in handlers:
+                instrument_handler(handler)
+        self.pipeline_handlers = handlers
+        self.unleveled_handlers = [handler for handler in handlers[1:]
+                                   if handler.level == NOTSET]
+        self.pin_handler_levels()
+        self.threshold = self.get_gate_level()
+        logger.setLevel(self.threshold)
+        installed = handlers
+        if self.is_asynchronous():
+            self.queue, self.queue_handler, self.listener = build_queue_pipeline(
+                handlers, maxsize=self.queue_size, overflow=self.overflow)
+            # Records no handler would emit are not rendered nor queued.
+            self.queue_handler.setLevel(min(handler.level for handler in handlers))
+
+            installed = [self.queue_handler]
+        with REGISTRY_LOCK:
+            previous = LOGGER_OWNERS.get(self.get_name())
+            LOGGER_OWNERS[self.get_name()] = self
+        if previous is not None and previous is not self:
+            previous.shutdown()
+            for handler in previous.installed_handlers:
+                if handler not in installed:
+                    logger.removeHandler(handler)
+            for log_filter in previous.internal_filters + previous.get_filters():
+                if log_filter not in self.get_filters():
+                    logger.removeFilter(log_filter)
+        for handler in installed:
             logger.addHandler(handler)
+        for log_filter in self.internal_filters + self.get_filters():
+            logger.addFilter(log_filter)
+        self.installed_handlers = installed
+        if self.listener is not None:
+            self.listener.start()
+            atexit.register(self.shutdown)
+        self.logger = logger
+        for hook in list(LEVEL_HOOKS):
+            hook(self)
+
+    def get_stream_handler(self):
+        """
+        Get the stderr handler, shared by the loggers with the same level and format.
+
+        :return: <StreamHandler>
+        """
+        key = (sys.stderr, self.get_level(), self.get_format(), self.get_output(),
+               freeze(self.static_fields))
+        with REGISTRY_LOCK:
+            stream_handler = STREAM_HANDLERS.get(key)
+            if stream_handler is None:
+                stream_handler = STREAM_HANDLERS[key] = StreamHandler()
+                stream_handler.setLevel(self.get_level())
+                stream_handler.setFormatter(build_formatter(self.get_format(),
+                                                            self.get_output(),
+                                                            self.static_fields))
+        return stream_handler
+
+    def shutdown(self):
+        """
+        Write every queued record and stop the background thread.
+
+        Also called at exit for the loggers that have one, until shut down.
+        """
+        atexit.unregister(self.shutdown)
+        for log_filter in self.get_filters():
+            if hasattr(log_filter, 'flush'):
+                log_filter.flush()
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        for exporter in self.exporters:
+            exporter.stop()
+
+    def is_enabled(self, level):
+        """
+        Tell whether a record of level would be handled.
+
+        The cached threshold rejects the records below the level without a
+        call into logging, the others still go through Logger.isEnabledFor so
+        logging.disable() and the level of the stdlib logger apply.
+
+        :param level: int - the record level.
+        :return: bool
+        """
+        return level >= self.threshold and self.logger.isEnabledFor(level)
+
+    def bind(self, **fields):
+        """
+        Get a child logger adding fields to each of its records.
+
+        :return: <BoundLogger>
+        """
+        check_fields(fields)
+        return BoundLogger(self, fields)
 
     def log(self,message):
         """ log a message with INFO level. """
         if not isinstance(message, str):
             raise TypeError(f'Message must be str instead of {type(message)}')
-        self.get_logger().log(INFO, message)
+        if self.is_enabled(INFO):
+            self._log(INFO, message, (), {})
+
+    def _log(self, level, message, args, kwargs):
+        """
+        Log a message already known to be enabled.
+
+        The %-style args are merged into the message by the handlers, so only
+        when a record is actually emitted.
+        """
+        kwargs['stacklevel'] = kwargs.get('stacklevel', 1) + 2
+        builder = self.get_record_builder()
+        if (builder is None or kwargs.get('stack_info')
+                or getLogRecordFactory() is not LogRecord):
+            self.logger._log(level, message, args, **kwargs)
+            return
+        kwargs.pop('stack_info', None)
+        self.logger.handle(builder.build(self.logger.name, level, message, args, **kwargs))
+
+    def debug(self, message, *args, **kwargs):
+        """ log a message with DEBUG level. """
+        if self.is_enabled(DEBUG):
+            self._log(DEBUG, message, args, kwargs)
+
+    def info(self, message, *args, **kwargs):
+        """ log a message with INFO level. """
+        if self.is_enabled(INFO):
+            self._log(INFO, message, args, kwargs)
+
+    def warning(self, message, *args, **kwargs):
+        """ log a message with WARNING level. """
+        if self.is_enabled(WARNING):
+            self._log(WARNING, message, args, kwargs)
+
+    def error(self, message, *args, **kwargs):
+        """ log a message with ERROR level. """
+        if self.is_enabled(ERROR):
+            self._log(ERROR, message, args, kwargs)
+
+    def exception(self, message, *args, **kwargs):
+        """ log a message with ERROR level and the current exception. """
+        if self.is_enabled(ERROR):
+            kwargs.setdefault('exc_info', True)
+            self._log(ERROR, message, args, kwargs)
+
+
+class BoundLogger:
+    """
+        Logger adding fixed fields to the records of a HomemadeLogger.
+
+        The fields are merged once, when bound, and given to the records as
+        their extra dict.
+    """
+    __slots__ = ('homemade_logger', 'fields')
+
+    def __init__(self, homemade_logger, fields):
+        """
+            Init function.
+        """
+        self.homemade_logger = homemade_logger
+        self.fields = fields
+
+    def get_fields(self):
+        """
+        Get the bound fields.
+
+        :return: dict
+        """
+        return self.fields
+
+    def bind(self, **fields):
+        """
+        Get a child logger adding more fields.
+
+        :return: <BoundLogger>
+        """
+        check_fields(fields)
+        return BoundLogger(self.homemade_logger, {**self.fields, **fields})
+
+    def _log(self, level, message, args, kwargs):
+        """ Log a message already known to be enabled, with the bound fields. """
+        extra = kwargs.get('extra')
+        kwargs['stacklevel'] = kwargs.get('stacklevel', 1) + 1
+        kwargs['extra'] = self.fields if extra is None else {**self.fields, **extra}
+        self.homemade_logger._log(level, message, args, kwargs)
+
+    def log(self, message):
+        """ log a message with INFO level. """
+        if not isinstance(message, str):
+            raise TypeError(f'Message must be str instead of {type(message)}')
+        if self.homemade_logger.is_enabled(INFO):
+            self._log(INFO, message, (), {})
+
+    def debug(self, message, *args, **kwargs):
+        """ log a message with DEBUG level. """
+        if self.homemade_logger.is_enabled(DEBUG):
+            self._log(DEBUG, message, args, kwargs)
+
+    def info(self, message, *args, **kwargs):
+        """ log a message with INFO level. """
+        if self.homemade_logger.is_enabled(INFO):
+            self._log(INFO, message, args, kwargs)
+
+    def warning(self, message, *args, **kwargs):
+        """ log a message with WARNING level. """
+        if self.homemade_logger.is_enabled(WARNING):
+            self._log(WARNING, message, args, kwargs)
+
+    def error(self, message, *args, **kwargs):
+        """ log a message with ERROR level. """
+        if self.homemade_logger.is_enabled(ERROR):
+            self._log(ERROR, message, args, kwargs)
+
+    def exception(self, message, *args, **kwargs):
+        """ log a message with ERROR level and the current exception. """
+        if self.homemade_logger.is_enabled(ERROR):
+            kwargs.setdefault('exc_info', True)
+            self._log(ERROR, message, args, kwargs)
+
+
+class ContextFilter(Filter):
+    """
+        Filter adding the bind_context fields to the records.
+
+        A context field never replaces an attribute the record already has,
+        so the extra and bind() fields of a record win over the context.
+        The format fields missing from a record are set to an empty string,
+        so a format may use context fields that are not always bound.
+    """
+    record_fields = frozenset()
+
+    def __init__(self, format_fields=()):
+        """
+            Init function.
+        """
+        super().__init__()
+        self.format_fields = format_fields
+
+    def filter(self, record):
+        """ Add the context fields, never rejects the record. """
+        fields = CONTEXT_FIELDS.get()
+        attributes = record.__dict__
+        if fields:
+            for field, value in fields.items():
+                if field not in attributes:
+                    attributes[field] = value
+        if self.format_fields:
+            for field in self.format_fields:
+                if field not in attributes:
+                    attributes[field] = ''
+        return True
+
+
+def bind_context(**fields):
+    """
+    Add fields to every record logged from the current context.
+
+    The fields are merged into the context once. Threads and asyncio tasks
+    each have their own context, a task inheriting the fields of its creator.
+
+    :return: <Token> - to restore the previous fields with unbind_context
+    """
+    check_fields(fields)
+    return CONTEXT_FIELDS.set({**CONTEXT_FIELDS.get(), **fields})
+
+
+def unbind_context(token):
+    """
+    Restore the context fields as they were before a bind_context call.
+
+    :param token: <Token> - returned by bind_context.
+    """
+    CONTEXT_FIELDS.reset(token)
+
+
+@contextmanager
+def log_context(**fields):
+    """ Context manager binding fields to the records logged in its block. """
+    token = bind_context(**fields)
+    try:
+        yield
+    finally:
+        unbind_context(token)
+
+
+def check_fields(fields):
+    """
+    Reject the fields named as a LogRecord attribute, as logging does for extra.
+
+    :param fields: dict - the fields to bind.
+    """
+    for field in fields:
+        if field in RECORD_ATTRIBUTES:
+            raise KeyError(f"Attempt to overwrite {field!r} in LogRecord")
+
+
+def normalize_name(name):
+    """
+    Normalize a logger name: stripped, lower case, spaces replaced by '_'.
+
+    :param name: str - the logger name.
+    :return: str
+    """
+    return (name.strip().lower()
+            .replace(' ', '_'))
+
+
+def freeze(value):
+    """
+    Make a config value hashable, handlers and filters are compared by identity.
+
+    :param value: the config value.
+    :return: a hashable value
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(id(resolve_handler(item)) for item in value)
+    return value
+
+
+def get_homemade_logger(name="My Own Logger", **config):
+    """
+    Get the HomemadeLogger of a name and config, creating it on the first call.
+
+    The same instance is returned for the same normalized name and config.
+    If another config was used for that name since, the instance installs
+    its handlers again.
+
+    :param name: str - the logger name.
+    :param config: the other HomemadeLogger arguments.
+    :return: <HomemadeLogger>
+    """
+    if not isinstance(name, str):
+        raise TypeError(f"Name must be str instead of {type(name)}.")
+    arguments = inspect.signature(HomemadeLogger).bind(name=normalize_name(name), **config)
+    arguments.apply_defaults()
+    key = tuple((argument, freeze(value)) for argument, value in arguments.arguments.items())
+    with FACTORY_LOCK:
+        homemade_logger = LOGGERS.get(key)
+        if homemade_logger is None:
+            homemade_logger = LOGGERS[key] = HomemadeLogger(name=name, **config)
+        elif LOGGER_OWNERS.get(homemade_logger.get_name()) is not homemade_logger:
+            homemade_logger.create_logger()
+    return homemade_logger
+
+
+def check_output(output, static_fields, outputs=OUTPUTS):
+    """
+    Check the output mode and the static fields of the JSON output.
+
+    :param output: str - 'text' or 'json'.
+    :param static_fields: dict - fields added to every JSON line.
+    :param outputs: list - the output modes allowed.
+    """
+    if not isinstance(output, str):
+        raise TypeError(f"Output must be str instead of {type(output)}.")
+    if static_fields is not None and not isinstance(static_fields, dict):
+        raise TypeError(f"Static_fields must be dict instead of {type(static_fields)}.")
+    if output not in outputs:
+        raise ValueError(f"Output must be in {outputs} instead of {output}.")
+
+
+def resolve_handler(handler):
+    """
+    Get the logging handler behind a homemade handler wrapper.
+
+    :param handler: logging handler or homemade wrapper exposing get_handler.
+    :return: logging handler
+    """
+    if hasattr(handler, 'get_handler'):
+        return handler.get_handler()
+    return handler
 
 
 class HomemadeTimedRotatingFileHandler:
     """ Homemade TimedRotatingFileHandler. """
     def __init__(self, filename='log', when='h', interval=1,
                  log_format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-                 level=INFO, log_extension=None, suffix=None):
+                 level=INFO, log_extension=None, suffix=None,
+                 buffered=False, buffer_size=65536, buffer_records=1000,
+                 flush_interval=1.0, flush_level=ERROR, compression=None,
+                 max_bytes=0, backup_count=0, max_total_bytes=0, max_age=0,
+                 output='text', static_fields=None, durability='none',
+                 sync_interval=1.0, sync_level=ERROR):
         """
             Init function.
+
+            When buffered is True, formatted records are kept in memory and
+            written in one go once buffer_size bytes or buffer_records
+            records are pending, every flush_interval seconds, or right away
+            for a record of flush_level or above.
+
+            compression ('gzip', 'bz2' or 'lzma') compresses the rotated
+            files on a background thread, after the namer and suffix apply.
+
+            max_bytes also rotates the file when it would grow past that
+            size in bytes, once encoded. The rotated files are removed beyond backup_count files,
+            max_total_bytes on disk or max_age seconds (0 means no limit).
+
+            output selects 'text' lines rendered with log_format or 'json'
+            lines, which carry static_fields on top of host, pid and name.
+            'binary' writes the unformatted records in the binlog format;
+            decode them with python source/binlog.py.
+
+            durability sets when the records are fsynced: 'none' (by the
+            OS), 'interval' (every sync_interval seconds), 'level-triggered'
+            (a record of sync_level or above returns once durable) or
+            'every-record'. Concurrent records share one fsync.
         """
         if not isinstance(filename, str):
             raise TypeError(f"Filename must be str instead of {type(filename)}.")
@@ -131,6 +849,44 @@ class HomemadeTimedRotatingFileHandler:
             raise TypeError(f"log_file_name must be str instead of {type(log_extension)}.")
         if suffix and not isinstance(suffix, str):
             raise TypeError(f"Suffix must be str instead of {type(suffix)}.")
+        if not isinstance(buffered, bool):
+            raise TypeError(f"Buffered must be bool instead of {type(buffered)}.")
+        if not isinstance(buffer_size, int):
+            raise TypeError(f"Buffer_size must be int instead of {type(buffer_size)}.")
+        if not isinstance(buffer_records, int):
+            raise TypeError(f"Buffer_records must be int instead of {type(buffer_records)}.")
+        if not isinstance(flush_interval, (int, float)):
+            raise TypeError(f"Flush_interval must be float instead of {type(flush_interval)}.")
+        if not isinstance(flush_level, int):
+            raise TypeError(f"Flush_level must be int instead of {type(flush_level)}.")
+        if buffer_size < 1 or buffer_records < 1:
+            raise ValueError("Buffer_size and buffer_records must be >=1")
+        if compression and not isinstance(compression, str):
+            raise TypeError(f"Compression must be str instead of {type(compression)}.")
+        for option, value in [('Max_bytes', max_bytes),
+                              ('Backup_count', backup_count),
+                              ('Max_total_bytes', max_total_bytes),
+                              ('Max_age', max_age)]:
+            if not isinstance(value, int):
+                raise TypeError(f"{option} must be int instead of {type(value)}.")
+            if value < 0:
+                raise ValueError(f"{option} must be >=0")
+        check_output(output, static_fields, FILE_OUTPUTS)
+        if not isinstance(durability, str):
+            raise TypeError(f"Durability must be str instead of {type(durability)}.")
+        if not isinstance(sync_interval, (int, float)):
+            raise TypeError(f"Sync_interval must be float instead of {type(sync_interval)}.")
+        if not isinstance(sync_level, int):
+            raise TypeError(f"Sync_level must be int instead of {type(sync_level)}.")
+        if durability not in DURABILITIES:
+            raise ValueError(f"Durability must be in {DURABILITIES} instead of {durability}.")
+        if sync_interval <= 0:
+            raise ValueError("Sync_interval must be >0")
+        if flush_interval < 0:
+            raise ValueError("Flush_interval must be >=0")
+        if compression and compression not in COMPRESSIONS:
+            raise ValueError(f"Compression must be in {list(COMPRESSIONS)} "
+                             f"instead of {compression}.")
         if level not in [DEBUG,
                          INFO,
                          WARNING,
@@ -149,7 +905,22 @@ class HomemadeTimedRotatingFileHandler:
         self.level = level
         self.log_extension = log_extension
         self.suffix = suffix
-        self.handler = self.build_handler()
+        self.buffered = buffered
+        self.buffer_size = buffer_size
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+        self.flush_level = flush_level
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        self.output = output
+        self.static_fields = static_fields
+        self.durability = durability
+        self.sync_interval = sync_interval
+        self.sync_level = sync_level
+        self.handler = None
 
     def get_filename(self):
         """
@@ -207,22 +978,376 @@ class HomemadeTimedRotatingFileHandler:
         """
         return self.suffix
 
+    def is_buffered(self):
+        """
+        Tell if the formatted records are buffered before being written.
+
+        :return: bool
+        """
+        return self.buffered
+
+    def get_flush_level(self):
+        """
+        Get the level from which a record is written right away.
+
+        :return: int - the flush level
+        """
+        return self.flush_level
+
+    def get_compression(self):
+        """
+        Get the compression applied to the rotated files.
+
+        :return: str - None when the rotated files are not compressed
+        """
+        return self.compression
+
+    def get_max_bytes(self):
+        """
+        Get the size from which the file is rotated.
+
+        :return: int - 0 when the file is only rotated on time
+        """
+        return self.max_bytes
+
+    def get_retention(self):
+        """
+        Get the retention limits of the rotated files, 0 meaning no limit.
+
+        :return: dict - backup_count, max_total_bytes and max_age
+        """
+        return {'backup_count': self.backup_count,
+                'max_total_bytes': self.max_total_bytes,
+                'max_age': self.max_age}
+
+    def get_output(self):
+        """
+        Get the output mode of the records.
+
+        :return: str - 'text', 'json' or 'binary'
+        """
+        return self.output
+
+    def get_durability(self):
+        """
+        Get the policy of the file fsyncs.
+
+        :return: dict - durability, sync_interval and sync_level
+        """
+        return {'durability': self.durability,
+                'sync_interval': self.sync_interval,
+                'sync_level': self.sync_level}
+
+    def get_handler(self):
+        """
+        Get the handler writing to the file.
+
+        The wrappers with the same filename share one writer: one
+        descriptor, one lock and one rollover schedule. The handler is built
+        on the first call, which raises a ValueError when the file is
+        already written with another rotation config. The file is opened
+        when the first record is written.
+
+        :return: <SharedFileHandler> - get_writer() gives the
+            TimedRotatingFileHandler writing the file
+        """
+        if self.handler is None:
+            self.handler = self.build_handler()
+        return self.handler
+
+    def build_handler(self):
+        writer = get_writer(filename=self.get_filename(),
+                            log_extension=self.get_log_extension(),
+                            suffix=self.get_suffix(),
+                            when=self.get_when(),
+                            interval=self.get_interval(),
+                            buffered=self.is_buffered(),
+                            buffer_size=self.buffer_size,
+                            buffer_records=self.buffer_records,
+                            flush_interval=self.flush_interval,
+                            flush_level=self.get_flush_level(),
+                            compression=self.get_compression(),
+                            max_bytes=self.get_max_bytes(),
+                            binary=self.get_output() == 'binary',
+                            **self.get_retention(),
+                            **self.get_durability())
+        if self.get_output() == 'binary':
+            formatter = BinaryFormatter(self.get_format())
+        else:
+            formatter = build_formatter(self.get_format(), self.get_output(), self.static_fields)
+        return get_file_handler(writer, self.get_level(), formatter,
+                                (self.get_format(), self.get_output(),
+                                 freeze(self.static_fields)))
+
+
+class HomemadeLogstashHandler:
+    """ Homemade handler shipping JSON lines to Logstash over TCP or UDP. """
+    def __init__(self, host='localhost', port=5959, protocol='tcp', level=INFO,
+                 static_fields=None, batch_size=500, flush_interval=1.0,
+                 queue_size=10000, spill_path=None, spill_max_bytes=64 * 1024 * 1024):
+        """
+            Init function.
+
+            The records are sent in batches by a background thread over a
+            persistent connection. When the collector is down, or too slow
+            for the queue of queue_size records to stay under 3/4 full, they
+            are spilled to spill_path, up to spill_max_bytes, and sent later;
+            past that limit, or when the queue is full, they are dropped.
+        """
+        if not isinstance(host, str):
+            raise TypeError(f"Host must be str instead of {type(host)}.")
+        if not isinstance(port, int):
+            raise TypeError(f"Port must be int instead of {type(port)}.")
+        if not isinstance(protocol, str):
+            raise TypeError(f"Protocol must be str instead of {type(protocol)}.")
+        if not isinstance(level, int):
+            raise TypeError(f"Level must be int instead of {type(level)}.")
+        if spill_path and not isinstance(spill_path, str):
+            raise TypeError(f"Spill_path must be str instead of {type(spill_path)}.")
+        for option, value in [('Batch_size', batch_size),
+                              ('Queue_size', queue_size),
+                              ('Spill_max_bytes', spill_max_bytes)]:
+            if not isinstance(value, int):
+                raise TypeError(f"{option} must be int instead of {type(value)}.")
+            if value < 1:
+                raise ValueError(f"{option} must be >=1")
+        if not isinstance(flush_interval, (int, float)):
+            raise TypeError(f"Flush_interval must be float instead of {type(flush_interval)}.")
+        if protocol.lower() not in PROTOCOLS:
+            raise ValueError(f"Protocol must be in {PROTOCOLS} instead of {protocol}.")
+        if level not in [DEBUG,
+                         INFO,
+                         WARNING,
+                         ERROR]:
+            raise ValueError(f"Level must be in [DEBUG, INFO, WARNING, ERROR] instead of {level}.")
+        if not 0 < port < 65536:
+            raise ValueError("Port must be in ]0, 65536[")
+        if flush_interval <= 0:
+            raise ValueError("Flush_interval must be >0")
+        check_output('json', static_fields)
+        self.host = host
+        self.port = port
+        self.protocol = protocol.lower()
+        self.level = level
+        self.static_fields = static_fields
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.handler = self.build_handler()
+
+    def get_host(self):
+        """
+        Get the collector host.
+
+        :return: str
+        """
+        return self.host
+
+    def get_port(self):
+        """
+        Get the collector port.
+
+        :return: int
+        """
+        return self.port
+
+    def get_protocol(self):
+        """
+        Get the transport protocol.
+
+        :return: str - 'tcp' or 'udp'
+        """
+        return self.protocol
+
+    def get_level(self):
+        """
+        Get the handler level.
+
+        :return: int - the handler level
+        """
+        return self.level
+
+    def get_spill_path(self):
+        """
+        Get the file holding the records the collector did not take yet.
+
+        :return: str
+        """
+        return self.spill_path
+
     def get_handler(self):
         """
-        Get the TimedRotatingFileHandler object.
+        Get the ShippingHandler object.
 
         :return: logging handler
         """
         return self.handler
 
     def build_handler(self):
-        handler = TimedRotatingFileHandler(filename=self.get_filename(),
-                                           when=self.get_when(),
-                                           interval=self.get_interval())
+        handler = ShippingHandler(host=self.get_host(),
+                                  port=self.get_port(),
+                                  protocol=self.get_protocol(),
+                                  batch_size=self.batch_size,
+                                  flush_interval=self.flush_interval,
+                                  queue_size=self.queue_size,
+                                  spill_path=self.get_spill_path(),
+                                  spill_max_bytes=self.spill_max_bytes)
         handler.setLevel(self.get_level())
-        handler.setFormatter(Formatter(self.get_format()))
-        if self.get_log_extension():
-            handler.namer = lambda name: name + self.get_log_extension()
-        if self.get_suffix():
-            handler.suffix = self.get_suffix()
+        handler.setFormatter(build_formatter(None, 'json', self.static_fields))
         return handler
+
+
+class HomemadeRingBufferHandler:
+    """ Homemade handler writing the debug context of a record only when it is an error. """
+    def __init__(self, targets=[], capacity=1000, trigger_level=ERROR, level=DEBUG):
+        """
+            Init function.
+
+            The last capacity records of level or above are kept in memory,
+            unformatted. When a record of trigger_level or above comes, they
+            are written to the targets (handlers or homemade handlers), then
+            that record. The HomemadeLogger lets the records of level through
+            even when its own level is higher.
+        """
+        if not isinstance(targets, list):
+            raise TypeError(f"Targets must be list instead of {type(targets)}.")
+        if not isinstance(capacity, int):
+            raise TypeError(f"Capacity must be int instead of {type(capacity)}.")
+        if not isinstance(trigger_level, int):
+            raise TypeError(f"Trigger_level must be int instead of {type(trigger_level)}.")
+        if not isinstance(level, int):
+            raise TypeError(f"Level must be int instead of {type(level)}.")
+        if capacity < 1:
+            raise ValueError("Capacity must be >=1")
+        for checked in [trigger_level, level]:
+            if checked not in [DEBUG,
+                               INFO,
+                               WARNING,
+                               ERROR]:
+                raise ValueError("Level must be in [DEBUG, INFO, WARNING, ERROR] "
+                                 f"instead of {checked}.")
+        self.targets = targets
+        self.capacity = capacity
+        self.trigger_level = trigger_level
+        self.level = level
+        self.handler = self.build_handler()
+
+    def get_targets(self):
+        """
+        Get the handlers receiving the buffered records.
+
+        :return: list
+        """
+        return self.targets
+
+    def get_capacity(self):
+        """
+        Get the number of records kept in memory.
+
+        :return: int
+        """
+        return self.capacity
+
+    def get_trigger_level(self):
+        """
+        Get the level from which the buffered records are written.
+
+        :return: int - the trigger level
+        """
+        return self.trigger_level
+
+    def get_level(self):
+        """
+        Get the handler level.
+
+        :return: int - the handler level
+        """
+        return self.level
+
+    def get_handler(self):
+        """
+        Get the RingBufferHandler object.
+
+        :return: logging handler
+        """
+        return self.handler
+
+    def build_handler(self):
+        handler = RingBufferHandler([resolve_handler(target) for target in self.get_targets()],
+                                    capacity=self.get_capacity(),
+                                    trigger_level=self.get_trigger_level())
+        handler.setLevel(self.get_level())
+        return handler
+
+
+class HomemadeThreadBufferHandler:
+    """ Homemade handler buffering the records per thread, written by a single thread. """
+    def __init__(self, target, window=0.05, capacity=10000):
+        """
+            Init function.
+
+            Each thread formats its records and appends them to its own
+            buffer, so the logging threads do not contend on the target
+            lock. Every window seconds a writer thread writes the records
+            older than window seconds to the target (a handler or homemade
+            handler, e.g. a HomemadeTimedRotatingFileHandler) in time order.
+            The level and formatter are the ones of the target.
+        """
+        if not isinstance(window, (int, float)):
+            raise TypeError(f"Window must be float instead of {type(window)}.")
+        if not isinstance(capacity, int):
+            raise TypeError(f"Capacity must be int instead of {type(capacity)}.")
+        if window <= 0:
+            raise ValueError("Window must be >0")
+        if capacity < 1:
+            raise ValueError("Capacity must be >=1")
+        self.target = target
+        self.window = window
+        self.capacity = capacity
+        self.handler = self.build_handler()
+
+    def get_target(self):
+        """
+        Get the handler the records are written to.
+
+        :return: handler or homemade handler
+        """
+        return self.target
+
+    def get_window(self):
+        """
+        Get the seconds a record waits before being written, the bound of the cross-thread skew.
+
+        :return: float
+        """
+        return self.window
+
+    def get_capacity(self):
+        """
+        Get the number of records a thread may have pending.
+
+        :return: int
+        """
+        return self.capacity
+
+    def get_format(self):
+        """
+        Get the format of the target.
+
+        :return: str - None when the target has no homemade format
+        """
+        return self.target.get_format() if hasattr(self.target, 'get_format') else None
+
+    def get_handler(self):
+        """
+        Get the handler.
+
+        :return: <ThreadBufferHandler>
+        """
+        return self.handler
+
+    def build_handler(self):
+        return ThreadBufferHandler(resolve_handler(self.target), window=self.window,
+                                   capacity=self.capacity)
@@ -0,0 +1,261 @@
+"""
+    Self-instrumentation of the logging pipeline: emit latency, records and
+    bytes per handler and level, rotations, fsyncs, queue depth and drops.
+"""
+
+# Imports
+import sys
+import time
+import traceback
+from threading import (
+    Event,
+    Lock,
+    Thread
+)
+from weakref import WeakKeyDictionary
+# Project modules
+
+# Environment
+HANDLER_METRICS = WeakKeyDictionary()
+INSTRUMENT_LOCK = Lock()
+BUCKETS = 64
+
+
+class LatencyHistogram:
+    """
+        Histogram of durations in nanoseconds with power of two buckets.
+
+        Bucket i counts the durations in [2**(i-1), 2**i) ns, so recording a
+        duration is one bit_length call and a few additions. Percentiles are
+        the upper bound of their bucket.
+    """
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        """
+            Init function.
+        """
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, duration):
+        """ Count a duration in nanoseconds. """
+        self.buckets[min(duration.bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def percentile(self, fraction):
+        """
+        Get an upper bound of a percentile.
+
+        :param fraction: float - the percentile, in [0, 1].
+        :return: float - microseconds
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(1 << bucket, self.max) / 1000
+        return self.max / 1000
+
+    def snapshot(self):
+        """
+        Get the count, mean and percentiles.
+
+        :return: dict - durations in microseconds
+        """
+        return {'count': self.count,
+                'mean_us': self.total / self.count / 1000 if self.count else 0.0,
+                'p50_us': self.percentile(0.5),
+                'p99_us': self.percentile(0.99),
+                'p999_us': self.percentile(0.999),
+                'max_us': self.max / 1000}
+
+
+class HandlerMetrics:
+    """
+        Metrics of one handler: handle latency, records and bytes per level.
+
+        The counters are updated without a lock and may be slightly off
+        when several threads use the handler at once.
+    """
+    __slots__ = ('latency', 'records', 'bytes', '__weakref__')
+
+    def __init__(self):
+        """
+            Init function.
+        """
+        self.latency = LatencyHistogram()
+        self.records = {}
+        self.bytes = {}
+
+    def observe(self, record, duration, formatter):
+        """ Count a record handled in duration nanoseconds. """
+        self.latency.record(duration)
+        level = record.levelname
+        self.records[level] = self.records.get(level, 0) + 1
+        line = record.__dict__.get('_homemade_line')
+        if line is not None and hasattr(formatter, 'get_line_key') and \
+                line[0] == formatter.get_line_key():
+            text = line[1]
+            size = len(text) if text.isascii() else len(text.encode())
+            self.bytes[level] = self.bytes.get(level, 0) + size + 1
+
+    def snapshot(self):
+        """
+        Get the metrics.
+
+        :return: dict
+        """
+        return {'latency': self.latency.snapshot(),
+                'records': dict(self.records),
+                'bytes': dict(self.bytes)}
+
+
+def instrument_handler(handler):
+    """
+    Time and count the records handled by a handler, once per handler.
+
+    The bytes are the UTF-8 length of the lines of the homemade formatters
+    plus the line terminator; they are not counted for other formatters.
+
+    :param handler: logging handler.
+    :return: <HandlerMetrics>
+    """
+    with INSTRUMENT_LOCK:
+        metrics = HANDLER_METRICS.get(handler)
+        if metrics is not None:
+            return metrics
+        metrics = HANDLER_METRICS[handler] = HandlerMetrics()
+    handle = handler.handle
+    timer = time.perf_counter_ns
+
+    def timed_handle(record):
+        start = timer()
+        emitted = handle(record)
+        if emitted:
+            metrics.observe(record, timer() - start, handler.formatter)
+        return emitted
+
+    handler.handle = timed_handle
+    return metrics
+
+
+def describe_handler(handler):
+    """
+    Get the type and the destination of a handler.
+
+    :return: dict
+    """
+    writer = handler.get_writer() if hasattr(handler, 'get_writer') else handler
+    target = getattr(writer, 'baseFilename', None)
+    if target is None and hasattr(handler, 'stream'):
+        target = getattr(handler.stream, 'name', repr(handler.stream))
+    if target is None and hasattr(handler, 'host'):
+        target = f"{handler.host}:{handler.port}"
+    return {'handler': handler.get_name() or type(handler).__name__, 'target': target}
+
+
+def handler_snapshot(handler):
+    """
+    Get the metrics of a handler, with its rotations, fsyncs and drops when it has some.
+
+    :return: dict
+    """
+    snapshot = describe_handler(handler)
+    metrics = HANDLER_METRICS.get(handler)
+    if metrics is not None:
+        snapshot.update(metrics.snapshot())
+    writer = handler.get_writer() if hasattr(handler, 'get_writer') else handler
+    if hasattr(writer, 'get_rotation_stats'):
+        snapshot['rotation'] = writer.get_rotation_stats()
+        if writer.durability != 'none':
+            snapshot['sync'] = writer.get_sync_stats()
+    if hasattr(handler, 'dropped'):
+        snapshot['dropped'] = handler.dropped
+    return snapshot
+
+
+def pipeline_snapshot(handlers, log_queue=None):
+    """
+    Get the metrics of the handlers and the queue of a logger.
+
+    :param handlers: list - logging handlers.
+    :param log_queue: <HomemadeLogQueue> - the queue in asynchronous mode.
+    :return: dict
+    """
+    snapshot = {'time': time.time(),
+                'handlers': [handler_snapshot(handler) for handler in handlers],
+                'queue': None}
+    if log_queue is not None:
+        snapshot['queue'] = {'depth': log_queue.qsize(),
+                             'maxsize': log_queue.maxsize,
+                             'overflow': log_queue.get_overflow(),
+                             'dropped': log_queue.get_dropped()}
+    return snapshot
+
+
+class MetricsExporter:
+    """ Background thread giving a metrics snapshot to a callable every interval seconds. """
+    def __init__(self, snapshot, export, interval=60.0):
+        """
+            Init function.
+
+            :param snapshot: callable - returns the metrics.
+            :param export: callable - called with the metrics.
+            :param interval: float - seconds between two exports.
+        """
+        if not callable(snapshot) or not callable(export):
+            raise TypeError("Snapshot and export must be callable.")
+        if not isinstance(interval, (int, float)):
+            raise TypeError(f"Interval must be float instead of {type(interval)}.")
+        if interval <= 0:
+            raise ValueError("Interval must be >0")
+        self.snapshot = snapshot
+        self.export = export
+        self.interval = interval
+        self.stopping = Event()
+        self.thread = None
+
+    def get_interval(self):
+        """
+        Get the seconds between two exports.
+
+        :return: float
+        """
+        return self.interval
+
+    def start(self):
+        """ Start the export thread. """
+        if self.thread is not None:
+            return
+        self.thread = Thread(target=self._run, name='homemade-metrics', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """ Export a last snapshot and stop the thread. """
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        """ Export loop. """
+        while not self.stopping.wait(self.interval):
+            self._export()
+        self._export()
+
+    def _export(self):
+        """ Export one snapshot, an error does not stop the thread. """
+        try:
+            self.export(self.snapshot())
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
@@ -0,0 +1,182 @@
+"""
+    Collector process writing the records of several worker processes into
+    one rotating file.
+"""
+
+# Imports
+import atexit
+import multiprocessing
+import os
+from logging.handlers import QueueHandler
+# Project modules
+from logger import HomemadeTimedRotatingFileHandler
+
+# Environment
+
+
+class CollectorHandler(QueueHandler):
+    """
+        Handler sending the records to the collector process.
+
+        The record is pickled over the pipe by the logging thread itself, so
+        no feeder thread is left behind by a fork and a child made by
+        multiprocessing or by a plain os.fork() logs as its parent does. At
+        most queue_size records are in flight: past put_timeout seconds
+        waiting for a slot, or once the collector is gone, the records are
+        dropped and counted.
+    """
+    def __init__(self, writer, write_lock, slots, put_timeout):
+        """
+            Init function.
+
+            :param writer: <Connection> - write end of the collector pipe.
+            :param write_lock: <multiprocessing.Lock> - serialises the writes of every process.
+            :param slots: <multiprocessing.BoundedSemaphore> - records in flight.
+            :param put_timeout: float - seconds to wait for a slot.
+        """
+        super().__init__(None)
+        self.writer = writer
+        self.write_lock = write_lock
+        self.slots = slots
+        self.put_timeout = put_timeout
+        self.dropped = 0
+
+    def get_dropped(self):
+        """
+        Get the number of records dropped by this process.
+
+        :return: int
+        """
+        return self.dropped
+
+    def enqueue(self, record):
+        """ Send the record, or drop it when the collector lags behind or is gone. """
+        if not self.slots.acquire(timeout=self.put_timeout):
+            self.dropped += 1
+            return
+        try:
+            with self.write_lock:
+                self.writer.send(record)
+        except OSError:
+            self.slots.release()
+            self.dropped += 1
+        except Exception:
+            self.slots.release()
+            raise
+
+
+class HomemadeLogCollector:
+    """
+        Single writer process owning a HomemadeTimedRotatingFileHandler.
+
+        Start it in the parent process before forking the workers, then give
+        its handler to the loggers of the workers: their records are sent
+        over a pipe and only the collector writes and rotates the file. The
+        handler keeps working in processes forked after the loggers have
+        been configured, by multiprocessing or by a plain os.fork() as
+        pre-fork servers do. The collector is stopped when the parent exits.
+    """
+    def __init__(self, queue_size=10000, put_timeout=1.0, **handler_config):
+        """
+            Init function.
+
+            :param queue_size: int - maximum number of records in flight.
+            :param put_timeout: float - seconds a worker waits for the collector
+                before it drops a record.
+            :param handler_config: HomemadeTimedRotatingFileHandler arguments.
+        """
+        if not isinstance(queue_size, int):
+            raise TypeError(f"Queue_size must be int instead of {type(queue_size)}.")
+        if not isinstance(put_timeout, (int, float)):
+            raise TypeError(f"Put_timeout must be float instead of {type(put_timeout)}.")
+        if queue_size < 1:
+            raise ValueError("Queue_size must be >=1")
+        if put_timeout < 0:
+            raise ValueError("Put_timeout must be >=0")
+        self.queue_size = queue_size
+        self.put_timeout = put_timeout
+        self.handler_config = handler_config
+        self.reader, self.writer = multiprocessing.Pipe(duplex=False)
+        self.slots = multiprocessing.BoundedSemaphore(queue_size)
+        self.handler = CollectorHandler(self.writer, multiprocessing.Lock(), self.slots,
+                                        put_timeout)
+        self.process = None
+        self.owner = None
+
+    def get_handler_config(self):
+        """
+        Get the arguments of the handler built by the collector process.
+
+        :return: dict
+        """
+        return self.handler_config
+
+    def get_handler(self):
+        """
+        Get the handler sending the records to the collector.
+
+        :return: logging handler
+        """
+        return self.handler
+
+    def is_alive(self):
+        """
+        Tell if the collector process runs.
+
+        :return: bool - False in the other processes than the one which started it
+        """
+        return (self.process is not None and self.owner == os.getpid()
+                and self.process.is_alive())
+
+    def start(self):
+        """
+        Start the collector process, stopped when the current process exits.
+
+        The read end of the pipe is then only open in the collector, so the
+        workers notice when it is gone instead of filling the pipe. A
+        stopped collector cannot be started again.
+        """
+        if self.is_alive() or self.reader.closed:
+            return
+        self.process = multiprocessing.Process(target=collect,
+                                               args=(self.reader, self.slots,
+                                                     self.handler_config),
+                                               name='homemade-log-collector',
+                                               daemon=True)
+        self.process.start()
+        self.owner = os.getpid()
+        self.reader.close()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=None):
+        """ Write the records sent so far and stop the collector process. """
+        if not self.is_alive():
+            return
+        atexit.unregister(self.stop)
+        with self.handler.write_lock:
+            self.writer.send(None)
+        self.process.join(timeout)
+
+
+def collect(reader, slots, handler_config):
+    """
+    Collector process loop: build the file handler and write every record.
+
+    :param reader: <Connection> - read end of the pipe the workers send to.
+    :param slots: <multiprocessing.BoundedSemaphore> - released for each record read.
+    :param handler_config: dict - HomemadeTimedRotatingFileHandler arguments.
+    """
+    handler = HomemadeTimedRotatingFileHandler(**handler_config).get_handler()
+    try:
+        while True:
+            try:
+                record = reader.recv()
+            except EOFError:
+                break
+            if record is None:
+                break
+            slots.release()
+            if record.levelno >= handler.level:
+                handler.handle(record)
+    finally:
+        handler.close()
@@ -0,0 +1,262 @@
+"""
+    Handler shipping the records to a Logstash (json_lines codec) or any
+    line based TCP/UDP collector.
+"""
+
+# Imports
+import errno
+import os
+import socket
+import time
+from logging import Handler
+from queue import (
+    Queue,
+    Empty,
+    Full
+)
+from threading import (
+    Event,
+    Thread
+)
+# Project modules
+from formatters import JsonFormatter
+
+# Environment
+PROTOCOLS = ['tcp', 'udp']
+UDP_DATAGRAM_SIZE = 65000
+CONNECTION_ERRNOS = {errno.ENETDOWN, errno.ENETUNREACH, errno.EHOSTDOWN, errno.EHOSTUNREACH}
+
+
+class ShippingHandler(Handler):
+    """
+        Handler sending formatted records to a collector from a background thread.
+
+        emit only formats the record and queues the line, the caller never
+        waits for the network or the disk. The sender thread sends the
+        queued lines in batches of up to batch_size over a persistent
+        connection, reconnecting with an exponential backoff. When the
+        collector is down, or so slow that the queue fills past its
+        high-water mark (3/4 of queue_size), the lines are appended to
+        spill_path and replayed once the collector is reachable and the
+        queue is back under half the mark. The lines are dropped and counted
+        when the spill file would grow past spill_max_bytes, when the queue
+        is full, when a batch fails for another reason than an unreachable
+        collector, and when a UDP line is larger than a datagram.
+    """
+    def __init__(self, host='localhost', port=5959, protocol='tcp', batch_size=500,
+                 flush_interval=1.0, queue_size=10000, spill_path=None,
+                 spill_max_bytes=64 * 1024 * 1024, timeout=5.0, backoff_max=30.0):
+        """
+            Init function.
+        """
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self.timeout = timeout
+        self.backoff_max = backoff_max
+        self.records = Queue(maxsize=queue_size)
+        self.high_water = max(1, queue_size * 3 // 4)
+        self.sock = None
+        self.retry_delay = 0.0
+        self.next_attempt = 0.0
+        self.dropped = 0
+        self.spill_size = (os.path.getsize(spill_path)
+                           if spill_path and os.path.exists(spill_path) else 0)
+        self.stopping = Event()
+        self.setFormatter(JsonFormatter())
+        self.sender = Thread(target=self._run, name=f"shipper-{host}:{port}", daemon=True)
+        self.sender.start()
+
+    def emit(self, record):
+        """ Format the record and queue it for the sender thread. """
+        try:
+            line = self.format(record) + '\n'
+            try:
+                self.records.put_nowait(line)
+            except Full:
+                self.dropped += 1
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        """ Send the queued records, spilling them if the collector is down, then stop. """
+        self.stopping.set()
+        self.sender.join(timeout=self.timeout + self.flush_interval)
+        self._disconnect()
+        super().close()
+
+    def _run(self):
+        """ Sender loop. """
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._ship(batch)
+                if self.spill_path and self.records.qsize() >= self.high_water:
+                    self._spill(self._take_queued())
+            elif self.stopping.is_set():
+                return
+            if (self.spill_size and self.records.qsize() < self.high_water // 2
+                    and self._connect()):
+                self._replay()
+
+    def _next_batch(self):
+        """ Wait for a line, then take the lines already queued up to batch_size. """
+        try:
+            batch = [self.records.get(timeout=self.flush_interval)]
+        except Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.records.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _take_queued(self):
+        """ Take every queued line. """
+        lines = []
+        while True:
+            try:
+                lines.append(self.records.get_nowait())
+            except Empty:
+                return lines
+
+    def _ship(self, lines):
+        """ Send lines to the collector, spill the unsent ones when it is unreachable. """
+        if not self._connect():
+            self._spill(lines)
+            return
+        unsent, error = self._send(lines)
+        if error is not None:
+            self._disconnect()
+            if is_connection_error(error):
+                self._spill(unsent)
+            else:
+                self.dropped += len(unsent)
+
+    def _send(self, lines):
+        """
+        Send lines over the connection, oldest first.
+
+        A TCP send failing part way stops at the line being sent: it is sent
+        again whole, on the next connection, and the lines before it are not.
+
+        :return: tuple - (the lines not sent, the OSError that stopped the send or None)
+        """
+        if self.protocol == 'udp':
+            return self._send_datagrams(lines)
+        encoded = [line.encode() for line in lines]
+        payload = memoryview(b''.join(encoded))
+        sent = 0
+        try:
+            while sent < len(payload):
+                sent += self.sock.send(payload[sent:])
+        except OSError as error:
+            for index, line in enumerate(encoded):
+                sent -= len(line)
+                if sent < 0:
+                    return lines[index:], error
+            return [], error
+        return [], None
+
+    def _send_datagrams(self, lines):
+        """
+        Send lines in datagrams of at most UDP_DATAGRAM_SIZE bytes, drop larger lines.
+
+        :return: tuple - (the lines not sent, the OSError that stopped the send or None)
+        """
+        fitting = []
+        for line in lines:
+            encoded = line.encode()
+            if len(encoded) > UDP_DATAGRAM_SIZE:
+                self.dropped += 1
+            else:
+                fitting.append((line, encoded))
+        first = 0
+        datagram = b''
+        try:
+            for index, (_, encoded) in enumerate(fitting):
+                if datagram and len(datagram) + len(encoded) > UDP_DATAGRAM_SIZE:
+                    self.sock.send(datagram)
+                    first = index
+                    datagram = b''
+                datagram += encoded
+            if datagram:
+                self.sock.send(datagram)
+        except OSError as error:
+            return [line for line, _ in fitting[first:]], error
+        return [], None
+
+    def _connect(self):
+        """ Open the connection unless the backoff delay is still running. """
+        if self.sock is not None:
+            return True
+        if time.monotonic() < self.next_attempt:
+            return False
+        try:
+            if self.protocol == 'tcp':
+                self.sock = socket.create_connection((self.host, self.port),
+                                                     timeout=self.timeout)
+            else:
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.sock.connect((self.host, self.port))
+            self.retry_delay = 0.0
+            return True
+        except OSError:
+            self.retry_delay = min(self.backoff_max, max(0.1, self.retry_delay * 2))
+            self.next_attempt = time.monotonic() + self.retry_delay
+            return False
+
+    def _disconnect(self):
+        """ Close the connection. """
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _spill(self, lines):
+        """ Append lines to the spill file, drop them once it is full (sender thread). """
+        data = ''.join(lines).encode()
+        if not self.spill_path or self.spill_size + len(data) > self.spill_max_bytes:
+            self.dropped += len(lines)
+            return
+        with open(self.spill_path, 'ab') as spill_file:
+            spill_file.write(data)
+        self.spill_size += len(data)
+
+    def _replay(self):
+        """
+        Send the spilled lines again, oldest first (sender thread).
+
+        The replay stops when the connection is lost or the queue reaches its
+        high-water mark again, the lines left are spilled back.
+        """
+        with open(self.spill_path, 'rb') as spill_file:
+            lines = [line.decode() for line in spill_file]
+        os.remove(self.spill_path)
+        self.spill_size = 0
+        for start in range(0, len(lines), self.batch_size):
+            if self.sock is None or self.records.qsize() >= self.high_water:
+                self._spill(lines[start:])
+                return
+            self._ship(lines[start:start + self.batch_size])
+
+
+def is_connection_error(error):
+    """
+    Tell if a send failed because the collector cannot be reached.
+
+    :param error: <OSError>
+    :return: bool
+    """
+    return (isinstance(error, (ConnectionError, TimeoutError, socket.timeout))
+            or error.errno in CONNECTION_ERRNOS)
@@ -0,0 +1,194 @@
+"""
+    Bounded in-memory queue and background listener used by the
+    asynchronous mode of HomemadeLogger.
+"""
+
+# Imports
+import os
+from logging.handlers import (
+    QueueHandler,
+    QueueListener
+)
+from queue import (
+    Queue,
+    Full
+)
+from threading import (
+    Condition,
+    Lock
+)
+from weakref import WeakSet
+# Project modules
+
+# Environment
+OVERFLOW_POLICIES = ['block', 'drop_newest', 'drop_oldest']
+RUNNING_LISTENERS = WeakSet()
+
+
+class HomemadeLogQueue(Queue):
+    """ Bounded queue of log records with a configurable overflow policy. """
+    def __init__(self, maxsize=10000, overflow='block'):
+        """
+            Init function.
+
+            :param maxsize: int - maximum number of queued records.
+            :param overflow: str - what to do when the queue is full:
+                'block' waits for a free slot, 'drop_newest' discards the
+                incoming record and 'drop_oldest' evicts the oldest record
+                of the lowest level present in the queue.
+        """
+        if not isinstance(maxsize, int) or isinstance(maxsize, bool):
+            raise TypeError(f"Maxsize must be int instead of {type(maxsize)}.")
+        if not isinstance(overflow, str):
+            raise TypeError(f"Overflow must be str instead of {type(overflow)}.")
+        if maxsize < 1:
+            raise ValueError("Maxsize must be >=1")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Overflow must be in {OVERFLOW_POLICIES} instead of {overflow}.")
+        super().__init__(maxsize=maxsize)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def get_overflow(self):
+        """
+        Get the overflow policy.
+
+        :return: str
+        """
+        return self.overflow
+
+    def get_dropped(self):
+        """
+        Get the number of records dropped because the queue was full.
+
+        :return: int
+        """
+        return self.dropped
+
+    def put_nowait(self, item):
+        """ Enqueue a record following the overflow policy (used by QueueHandler). """
+        if self.overflow == 'block':
+            self.put(item, block=True)
+        elif self.overflow == 'drop_newest':
+            try:
+                self.put(item, block=False)
+            except Full:
+                self.dropped += 1
+        else:
+            self._put_drop_oldest(item)
+
+    def put_sentinel(self, item):
+        """ Enqueue an item regardless of the size limit (listener sentinel). """
+        with self.not_full:
+            self._force_put(item)
+
+    def reset_after_fork(self):
+        """ Renew the locks and forget the records the parent process will write. """
+        self.mutex = Lock()
+        self.not_empty = Condition(self.mutex)
+        self.not_full = Condition(self.mutex)
+        self.all_tasks_done = Condition(self.mutex)
+        self.queue.clear()
+        self.unfinished_tasks = 0
+
+    def _put_drop_oldest(self, item):
+        """ Enqueue a record, evicting the oldest lowest-level record if full. """
+        with self.not_full:
+            if self._qsize() >= self.maxsize:
+                level = getattr(item, 'levelno', 0)
+                index, lowest = None, None
+                for position, queued in enumerate(self.queue):
+                    queued_level = getattr(queued, 'levelno', None)
+                    if queued_level is None:
+                        continue
+                    if lowest is None or queued_level < lowest:
+                        index, lowest = position, queued_level
+                self.dropped += 1
+                if index is None or level < lowest:
+                    return
+                del self.queue[index]
+                self.unfinished_tasks -= 1
+            self._force_put(item)
+
+    def _force_put(self, item):
+        """ Append an item, the caller must hold the queue mutex. """
+        self._put(item)
+        self.unfinished_tasks += 1
+        self.not_empty.notify()
+
+
+class DrainMarker:
+    """ Queue item calling back once every item queued before it is handled. """
+    __slots__ = ('callback',)
+
+    def __init__(self, callback):
+        self.callback = callback
+
+
+class HomemadeQueueListener(QueueListener):
+    """
+        QueueListener whose stop sentinel is never dropped by the overflow
+        policy and which is restarted in a forked child process.
+    """
+    def start(self):
+        """ Start the listener thread. """
+        super().start()
+        RUNNING_LISTENERS.add(self)
+
+    def stop(self):
+        """ Write the queued records and stop the listener thread. """
+        RUNNING_LISTENERS.discard(self)
+        super().stop()
+
+    def handle(self, record):
+        """ Handle a record, or call the callback of a DrainMarker. """
+        if type(record) is DrainMarker:
+            record.callback()
+            return
+        super().handle(record)
+
+    def drain(self, callback):
+        """
+        Call callback from the listener thread once the records queued so far are handled.
+
+        :param callback: callable - called without argument.
+        :return: bool - False when the listener is stopped and callback is not called
+        """
+        if self._thread is None:
+            return False
+        self.queue.put_sentinel(DrainMarker(callback))
+        return True
+
+    def enqueue_sentinel(self):
+        """ Put the stop sentinel on the queue, bypassing the size limit. """
+        self.queue.put_sentinel(self._sentinel)
+
+    def restart_after_fork(self):
+        """ Start a new listener thread, the parent's one does not exist in the child. """
+        self.queue.reset_after_fork()
+        self._thread = None
+        super().start()
+
+
+def restart_listeners():
+    """ Restart the running listeners in a forked child process. """
+    for listener in list(RUNNING_LISTENERS):
+        listener.restart_after_fork()
+
+
+os.register_at_fork(after_in_child=restart_listeners)
+
+
+def build_queue_pipeline(handlers, maxsize=10000, overflow='block'):
+    """
+    Build the queue, the handler feeding it and the listener draining it.
+
+    :param handlers: list - handlers fed by the background listener.
+    :param maxsize: int - maximum number of queued records.
+    :param overflow: str - overflow policy, see HomemadeLogQueue.
+    :return: tuple - (HomemadeLogQueue, QueueHandler, HomemadeQueueListener)
+    """
+    log_queue = HomemadeLogQueue(maxsize=maxsize, overflow=overflow)
+    queue_handler = QueueHandler(log_queue)
+    listener = HomemadeQueueListener(log_queue, *handlers, respect_handler_level=True)
+    return log_queue, queue_handler, listener
@@ -0,0 +1,386 @@
+"""
+    Time-range and level search over the files of a rotating file handler.
+
+    Each file gets a sparse index in a hidden sidecar file next to it
+    (.<file name>.idx): the time of a record every index_step bytes and
+    the time range of the file. A search skips the files outside the time
+    range, seeks to the last indexed record before the start and streams
+    the records from there, through a memory map for the plain files.
+    The index of the file being written is extended, not rebuilt.
+"""
+
+# Imports
+import json
+import mmap
+import os
+import re
+import time
+from bisect import bisect_left
+from datetime import datetime
+from logging import getLevelName
+# Project modules
+from binlog import (
+    ENTRY,
+    INFO,
+    MAGIC,
+    RECORD,
+    STRING,
+    STRING_ID,
+    RecordRenderer,
+    decode_record
+)
+from formatters import FIELD_PATTERN
+from handlers import (
+    COMPRESSIONS,
+    DEFAULT_SUFFIXES,
+    backup_pattern
+)
+
+# Environment
+OPENERS = {extension: opener for opener, extension in COMPRESSIONS.values()}
+ASCTIME = r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}'
+# Records may be written slightly out of time order by concurrent threads.
+SLACK = 1.0
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def index_path(path):
+    """
+    Get the path of the sidecar index of a log file.
+
+    :return: str
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.idx")
+
+
+def to_timestamp(value):
+    """
+    Get the epoch time of a query bound.
+
+    :param value: float, datetime or None.
+    :return: float or None
+    """
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+class TextParser:
+    """ Parser of the records written with a %-style log_format, one or more lines each. """
+    def __init__(self, log_format):
+        """
+            Init function.
+        """
+        fields = [match.group(1) for match in FIELD_PATTERN.finditer(log_format)]
+        if 'asctime' not in fields:
+            raise ValueError("Log_format must contain %(asctime)s to search the files.")
+        parts = []
+        position = 0
+        for match in FIELD_PATTERN.finditer(log_format):
+            parts.append(re.escape(log_format[position:match.start()].replace('%%', '%')))
+            field = match.group(1)
+            if field == 'asctime':
+                parts.append(f'(?P<asctime>{ASCTIME})')
+            elif field in ('levelname', 'name') and f'(?P<{field}>' not in ''.join(parts):
+                parts.append(f'(?P<{field}>.+?)')
+            else:
+                parts.append('.*?')
+            position = match.end()
+        parts.append(re.escape(log_format[position:].replace('%%', '%')))
+        self.pattern = re.compile(''.join(parts) + '$', re.S)
+        self.has_name = 'name' in fields
+        self.cached_second = (None, None)
+
+    def parse_time(self, asctime):
+        """
+        Get the epoch time of an asctime, the part without milliseconds is cached.
+
+        :return: float
+        """
+        second, epoch = self.cached_second
+        if asctime[:19] != second:
+            epoch = time.mktime(time.strptime(asctime[:19], '%Y-%m-%d %H:%M:%S'))
+            self.cached_second = (asctime[:19], epoch)
+        return epoch + int(asctime[20:23]) / 1000
+
+    def parse(self, line):
+        """
+        Parse the first line of a record.
+
+        :return: tuple - (created, levelno, name), None for a continuation line
+        """
+        match = self.pattern.match(line)
+        if match is None:
+            return None
+        fields = match.groupdict()
+        levelno = getLevelName(fields.get('levelname', 'NOTSET'))
+        return (self.parse_time(fields['asctime']),
+                levelno if isinstance(levelno, int) else 0,
+                fields.get('name'))
+
+    def entries(self, stream, offset):
+        """
+        Read the records from offset.
+
+        :param stream: binary file object, memory map or decompressing reader.
+        :param offset: int - the start of a record.
+        :return: generator of (created, levelno, name, offset, text)
+        """
+        stream.seek(offset)
+        current = None
+        position = offset
+        while True:
+            line = stream.readline()
+            if not line.endswith(b'\n'):
+                break
+            start, position = position, position + len(line)
+            text = line[:-1].decode('utf-8', 'replace')
+            parsed = self.parse(text)
+            if parsed is None:
+                if current is not None:
+                    current[4].append(text)
+                continue
+            if current is not None:
+                yield (*current[:4], '\n'.join(current[4]))
+            current = [*parsed, start, [text]]
+        if current is not None:
+            yield (*current[:4], '\n'.join(current[4]))
+
+
+class JsonParser(TextParser):
+    """ Parser of the JSON lines of JsonFormatter. """
+    def __init__(self):
+        """
+            Init function.
+        """
+        self.has_name = True
+        self.cached_second = (None, None)
+
+    def parse(self, line):
+        """
+        Parse a JSON line.
+
+        :return: tuple - (created, levelno, name), None if it is not a record
+        """
+        try:
+            fields = json.loads(line)
+            levelno = getLevelName(fields['level'])
+            return (self.parse_time(fields['time']),
+                    levelno if isinstance(levelno, int) else 0,
+                    fields.get('name'))
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class BinaryParser:
+    """ Parser of the binlog files, rendered with log_format. """
+    def __init__(self, log_format):
+        """
+            Init function.
+        """
+        self.renderer = RecordRenderer(log_format)
+        self.has_name = True
+
+    def entries(self, stream, offset):
+        """
+        Read the records from offset; the strings defined before it are read, not the records.
+
+        :return: generator of (created, levelno, name, offset, text)
+        """
+        stream.seek(0)
+        if stream.read(len(MAGIC)) != MAGIC:
+            return
+        position = len(MAGIC)
+        strings, info = {}, {}
+        while True:
+            header = stream.read(ENTRY.size)
+            if len(header) < ENTRY.size:
+                return
+            length, kind = ENTRY.unpack(header)
+            start, position = position, position + ENTRY.size + length
+            if kind == RECORD and start < offset:
+                stream.seek(position)
+                continue
+            data = stream.read(length)
+            if len(data) < length:
+                return
+            if kind == STRING:
+                strings[STRING_ID.unpack_from(data)[0]] = data[STRING_ID.size:].decode('utf-8')
+            elif kind == INFO:
+                info = json.loads(data)
+            elif kind == RECORD:
+                record = decode_record(data, strings, info)
+                yield (record.created, record.levelno, record.name, start,
+                       self.renderer.render(record))
+
+
+class HomemadeLogReader:
+    """
+        Search the files of a HomemadeTimedRotatingFileHandler by time, level and logger name.
+
+        The rotated files are the base file name followed by the strftime
+        suffix, an optional counter, log_extension and a compression
+        extension. Records are returned as text: as written for the 'text'
+        and 'json' outputs, rendered with log_format for 'binary'.
+    """
+    def __init__(self, filename='log', when='h', log_extension=None, suffix=None,
+                 log_format=DEFAULT_FORMAT, output='text', index_step=256 * 1024):
+        """
+            Init function.
+        """
+        if not isinstance(filename, str):
+            raise TypeError(f"Filename must be str instead of {type(filename)}.")
+        if not isinstance(index_step, int):
+            raise TypeError(f"Index_step must be int instead of {type(index_step)}.")
+        if index_step < 1:
+            raise ValueError("Index_step must be >=1")
+        if output not in ['text', 'json', 'binary']:
+            raise ValueError(f"Output must be in ['text', 'json', 'binary'] instead of {output}.")
+        self.filename = os.path.abspath(filename)
+        self.log_extension = log_extension
+        self.suffix = suffix or DEFAULT_SUFFIXES['W' if when.upper().startswith('W')
+                                                 else when.upper()]
+        self.output = output
+        self.index_step = index_step
+        if output == 'binary':
+            self.parser = BinaryParser(log_format)
+        elif output == 'json':
+            self.parser = JsonParser()
+        else:
+            self.parser = TextParser(log_format)
+        self.pattern = backup_pattern(os.path.basename(self.filename), self.suffix,
+                                      log_extension or '')
+
+    def get_files(self):
+        """
+        Get the rotated files, oldest first, then the current file.
+
+        The indexes of the files that no longer exist are removed.
+
+        :return: list - the paths
+        """
+        directory, base = os.path.split(self.filename)
+        rotated, indexes = [], []
+        for entry in os.scandir(directory):
+            if self.pattern.match(entry.name) and entry.is_file():
+                rotated.append((entry.stat().st_mtime, entry.path))
+            elif entry.name.startswith(f".{base}.") and entry.name.endswith('.idx'):
+                indexes.append(entry.path)
+        files = [path for _, path in sorted(rotated)]
+        if os.path.exists(self.filename):
+            files.append(self.filename)
+        for path in set(indexes) - {index_path(path) for path in files}:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return files
+
+    def open(self, path):
+        """
+        Open a log file for reading: a memory map, or a decompressing reader.
+
+        :return: file object, None for an empty file
+        """
+        opener = OPENERS.get(os.path.splitext(path)[1])
+        if opener is not None:
+            return opener(path, 'rb')
+        with open(path, 'rb') as log_file:
+            if os.fstat(log_file.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get_index(self, path):
+        """
+        Get the index of a file, building or extending it when the file changed.
+
+        :return: dict - first and last times, entries [[time, offset], ...]
+        """
+        stat = os.stat(path)
+        sidecar = index_path(path)
+        try:
+            with open(sidecar) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = None
+        if index is not None and index['inode'] == stat.st_ino \
+                and index['size'] == stat.st_size and index['step'] == self.index_step:
+            return index
+        if index is None or index['inode'] != stat.st_ino or index['size'] > stat.st_size \
+                or index['step'] != self.index_step:
+            index = {'inode': stat.st_ino, 'size': 0, 'step': self.index_step, 'resume': 0,
+                     'mark': 0, 'first': None, 'last': None, 'entries': []}
+        stream = self.open(path)
+        if stream is not None:
+            with stream:
+                for created, _, _, offset, _ in self.parser.entries(stream, index['resume']):
+                    if offset >= index['mark']:
+                        index['entries'].append([created, offset])
+                        index['mark'] = offset + self.index_step
+                    index['first'] = created if index['first'] is None \
+                        else min(index['first'], created)
+                    index['last'] = created if index['last'] is None \
+                        else max(index['last'], created)
+                    index['resume'] = offset
+        index['size'] = stat.st_size
+        try:
+            with open(sidecar + '.tmp', 'w') as index_file:
+                json.dump(index, index_file)
+            os.replace(sidecar + '.tmp', sidecar)
+        except OSError:
+            pass
+        return index
+
+    def search(self, start=None, end=None, level=None, name=None):
+        """
+        Get the records logged between start and end, of level or above, by a logger.
+
+        :param start: float or datetime - included, None for no lower bound.
+        :param end: float or datetime - included, None for no upper bound.
+        :param level: int - the minimum level, None for every level.
+        :param name: str - the logger name, its children included.
+        :return: generator of str - the records, oldest file first
+        """
+        start, end = to_timestamp(start), to_timestamp(end)
+        if name is not None and not self.parser.has_name:
+            raise ValueError("Log_format must contain %(name)s to search by logger name.")
+        for path in self.get_files():
+            index = self.get_index(path)
+            if not index['entries'] or (start is not None and index['last'] < start) \
+                    or (end is not None and index['first'] > end):
+                continue
+            offset = 0
+            if start is not None:
+                times = [created for created, _ in index['entries']]
+                position = max(0, bisect_left(times, start - SLACK) - 1)
+                offset = index['entries'][position][1]
+            stream = self.open(path)
+            if stream is None:
+                continue
+            with stream:
+                for created, levelno, logger, _, text in self.parser.entries(stream, offset):
+                    if end is not None and created > end + SLACK:
+                        break
+                    if (start is not None and created < start) \
+                            or (end is not None and created > end) \
+                            or (level is not None and levelno < level):
+                        continue
+                    if name is not None and logger != name \
+                            and not (logger or '').startswith(name + '.'):
+                        continue
+                    yield text
+
+
+def get_log_reader(handler, **config):
+    """
+    Get the reader of the files of a HomemadeTimedRotatingFileHandler.
+
+    :param handler: <HomemadeTimedRotatingFileHandler>
+    :param config: other HomemadeLogReader arguments, e.g. index_step.
+    :return: <HomemadeLogReader>
+    """
+    return HomemadeLogReader(filename=handler.get_filename(), when=handler.get_when(),
+                             log_extension=handler.get_log_extension(),
+                             suffix=handler.get_suffix(), log_format=handler.get_format(),
+                             output=handler.get_output(), **config)
@@ -0,0 +1,245 @@
+"""
+    Record construction skipping the introspection no handler reads.
+
+    A stdlib record always walks the stack to find its caller and looks up
+    the thread and process. A RecordBuilder only collects the caller, thread
+    and process attributes that the formatters and filters of a logger read,
+    and caches the caller attributes per code location.
+
+    Filters and formatters tell the introspected attributes they read with
+    a record_fields frozenset; the homemade ones and the %-style formats
+    are known, anything else needs every attribute.
+"""
+
+# Imports
+import os
+import sys
+import time
+from collections.abc import Mapping
+from logging import (
+    Formatter,
+    LogRecord,
+    PercentStyle,
+    StreamHandler,
+    getLevelName,
+    makeLogRecord
+)
+from threading import (
+    current_thread,
+    get_ident
+)
+# Project modules
+from formatters import (
+    FIELD_PATTERN,
+    CompiledFormatter
+)
+from handlers import (
+    HomemadeRotatingFileHandler,
+    RingBufferHandler,
+    SharedFileHandler,
+    ThreadBufferHandler
+)
+from network import ShippingHandler
+
+# Environment
+CALLER_FIELDS = frozenset({'pathname', 'filename', 'module', 'funcName', 'lineno'})
+THREAD_FIELDS = frozenset({'thread', 'threadName'})
+PROCESS_FIELDS = frozenset({'process', 'processName'})
+INTROSPECTED_FIELDS = CALLER_FIELDS | THREAD_FIELDS | PROCESS_FIELDS
+TEMPLATE = makeLogRecord({})
+RECORD_DEFAULTS = dict.fromkeys(TEMPLATE.__dict__)
+# Set on every record; taskName is left out as only the stdlib records of 3.12+ set it.
+BASE_FIELDS = ((frozenset(RECORD_DEFAULTS) | {'message', 'asctime'})
+               - INTROSPECTED_FIELDS - {'taskName'})
+FORMATTING_HANDLERS = (StreamHandler, SharedFileHandler, HomemadeRotatingFileHandler,
+                       ShippingHandler)
+FORMATTERS = (Formatter, CompiledFormatter)
+UNKNOWN_CALLER = ("(unknown file)", "(unknown file)", "(unknown file)",
+                  "(unknown function)", 0)
+CALLERS = {}
+MAX_CALLERS = 4096
+START_TIME = TEMPLATE.created - TEMPLATE.relativeCreated / 1000
+
+
+def get_format_fields(log_format):
+    """
+    Get the introspected attributes used by a %-style format.
+
+    :param log_format: str - the format.
+    :return: frozenset - None when the format uses an attribute no builder sets
+    """
+    fields = set()
+    for match in FIELD_PATTERN.finditer(log_format):
+        field = match.group(1)
+        if field in INTROSPECTED_FIELDS:
+            fields.add(field)
+        elif field not in BASE_FIELDS and field in RECORD_DEFAULTS:
+            return None
+    return frozenset(fields)
+
+
+def get_formatter_fields(formatter):
+    """
+    Get the introspected attributes read by a formatter.
+
+    :param formatter: <Formatter> - None for the default formatter.
+    :return: frozenset - None when they cannot be known
+    """
+    if formatter is None:
+        return frozenset()
+    fields = getattr(formatter, 'record_fields', None)
+    if fields is not None:
+        return fields
+    if type(formatter) in FORMATTERS and type(formatter._style) is PercentStyle:
+        return get_format_fields(formatter._fmt)
+    return None
+
+
+def get_handler_fields(handler):
+    """
+    Get the introspected attributes read by a handler, its filters and formatter.
+
+    Only the handlers known to read the records through their formatter
+    are described, and the buffering handlers through their targets.
+
+    :param handler: logging handler.
+    :return: frozenset - None when they cannot be known
+    """
+    readers = [get_formatter_fields(handler.formatter)]
+    readers += [getattr(log_filter, 'record_fields', None) for log_filter in handler.filters]
+    if isinstance(handler, ThreadBufferHandler):
+        readers.append(get_handler_fields(handler.target))
+    elif isinstance(handler, RingBufferHandler):
+        readers += [get_handler_fields(target) for target in handler.targets]
+    elif type(handler) not in FORMATTING_HANDLERS:
+        return None
+    if None in readers:
+        return None
+    return frozenset().union(*readers)
+
+
+def get_record_fields(handlers, filters):
+    """
+    Get the introspected attributes read by the handlers and filters of a logger.
+
+    :param handlers: list - the logging handlers.
+    :param filters: list - the logger filters.
+    :return: frozenset - None when they cannot be known
+    """
+    readers = [get_handler_fields(handler) for handler in handlers]
+    readers += [getattr(log_filter, 'record_fields', None) for log_filter in filters]
+    if None in readers:
+        return None
+    return frozenset().union(*readers)
+
+
+def get_chain_handlers(logger):
+    """
+    Get the handlers a record of logger reaches, its own then its ancestors'.
+
+    :param logger: <Logger>
+    :return: list
+    """
+    handlers = []
+    while logger is not None:
+        handlers += logger.handlers
+        if not logger.propagate:
+            break
+        logger = logger.parent
+    return handlers
+
+
+def get_caller(frame):
+    """
+    Get the caller attributes of a frame, cached per code location.
+
+    :return: tuple - (pathname, filename, module, funcName, lineno)
+    """
+    key = (frame.f_code, frame.f_lineno)
+    caller = CALLERS.get(key)
+    if caller is None:
+        pathname = frame.f_code.co_filename
+        filename = os.path.basename(pathname)
+        caller = (pathname, filename, os.path.splitext(filename)[0],
+                  frame.f_code.co_name, frame.f_lineno)
+        if len(CALLERS) >= MAX_CALLERS:
+            CALLERS.clear()
+        CALLERS[key] = caller
+    return caller
+
+
+class RecordBuilder:
+    """
+        Build LogRecords collecting only the introspected attributes in fields.
+
+        The attributes left out are set as the stdlib does when it cannot or
+        is told not to collect them: unknown caller, None thread and process.
+    """
+    def __init__(self, fields):
+        """
+            Init function.
+
+            :param fields: frozenset - the introspected attributes to collect.
+        """
+        self.fields = fields
+        self.caller = bool(fields & CALLER_FIELDS)
+        self.thread = bool(fields & THREAD_FIELDS)
+        self.process = bool(fields & PROCESS_FIELDS)
+
+    def get_fields(self):
+        """
+        Get the introspected attributes collected.
+
+        :return: frozenset
+        """
+        return self.fields
+
+    def build(self, name, level, msg, args, exc_info=None, extra=None, stacklevel=1):
+        """
+        Build a record as Logger._log does.
+
+        :param name: str - the logger name.
+        :param stacklevel: int - as for Logger._log: 1 for the caller of build.
+        :return: <LogRecord>
+        """
+        if exc_info:
+            if isinstance(exc_info, BaseException):
+                exc_info = (type(exc_info), exc_info, exc_info.__traceback__)
+            elif not isinstance(exc_info, tuple):
+                exc_info = sys.exc_info()
+        if args and len(args) == 1 and isinstance(args[0], Mapping) and args[0]:
+            args = args[0]
+        caller = UNKNOWN_CALLER
+        if self.caller:
+            try:
+                caller = get_caller(sys._getframe(stacklevel))
+            except ValueError:
+                pass
+        created = time.time()
+        attributes = {**RECORD_DEFAULTS,
+                      'name': name, 'msg': msg, 'args': args,
+                      'levelname': getLevelName(level), 'levelno': level,
+                      'pathname': caller[0], 'filename': caller[1], 'module': caller[2],
+                      'funcName': caller[3], 'lineno': caller[4], 'exc_info': exc_info,
+                      'created': created, 'msecs': int((created - int(created)) * 1000) + 0.0,
+                      'relativeCreated': (created - START_TIME) * 1000}
+        if self.thread:
+            attributes['thread'] = get_ident()
+            attributes['threadName'] = current_thread().name
+        if self.process:
+            attributes['process'] = os.getpid()
+            attributes['processName'] = 'MainProcess'
+            multiprocessing = sys.modules.get('multiprocessing')
+            if multiprocessing is not None:
+                try:
+                    attributes['processName'] = multiprocessing.current_process().name
+                except Exception:
+                    pass
+        if extra is not None:
+            for key in extra:
+                if key in ['message', 'asctime'] or key in attributes:
+                    raise KeyError(f"Attempt to overwrite {key!r} in LogRecord")
+            attributes.update(extra)
+        record = LogRecord.__new__(LogRecord)
+        record.__dict__ = attributes
+        return record
@@ -0,0 +1,57 @@
+"""
+    Helpers shared by the tests.
+"""
+
+# Imports.
+import time
+from os.path import (
+    join,
+    abspath
+)
+from logging import (
+    Handler,
+    LogRecord,
+    INFO
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from logger import HomemadeLogger
+
+
+class CollectingHandler(Handler):
+    """ Handler keeping the records it receives. """
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def build_logger(name, **config):
+    """ Build a logger collecting its records. """
+    collector = CollectingHandler()
+    homemade_logger = HomemadeLogger(name=name, handlers=[collector], **config)
+    homemade_logger.get_logger().propagate = False
+    return homemade_logger, collector
+
+
+def wait_for(condition, timeout=5.0):
+    """ Wait until condition() is true. """
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def build_record(message, args=(), level=INFO, name='test', pathname=__file__, lineno=1,
+                 func=None, exc_info=None, created=None):
+    """ Build a log record, logged at created when given. """
+    record = LogRecord(name, level, pathname, lineno, message, args, exc_info, func)
+    if created is not None:
+        record.created = created
+    return record
@@ -0,0 +1,112 @@
+"""
+    Test the asyncio logger.
+"""
+
+# Imports.
+import asyncio
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from logging import (
+    disable,
+    CRITICAL,
+    NOTSET,
+    DEBUG
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from asyncio_logger import HomemadeAsyncLogger
+from logger import bind_context
+from conftest import CollectingHandler
+
+
+class TestHomemadeAsyncLogger:
+    """
+        Test the class HomemadeAsyncLogger.
+    """
+
+    def build_logger(self, name, **config):
+        """ Build an asyncio logger collecting its records. """
+        collector = CollectingHandler()
+        homemade_logger = HomemadeAsyncLogger(name=name, handlers=[collector], **config)
+        homemade_logger.get_logger().propagate = False
+        return homemade_logger, collector
+
+    def test_init(self):
+        """ Test the HomemadeAsyncLogger.__init__ function. """
+        with pytest.raises(TypeError):
+            HomemadeAsyncLogger(filters={})
+        homemade_logger, _ = self.build_logger('Async init logger')
+        assert homemade_logger.is_asynchronous()
+        assert homemade_logger.get_queue().get_overflow() == 'drop_oldest'
+        homemade_logger.shutdown()
+
+    def test_awaitable(self):
+        """ Test the awaitable methods return once the record is written. """
+        homemade_logger, collector = self.build_logger('Async awaitable logger', level=DEBUG)
+
+        async def main():
+            await homemade_logger.adebug('step %d', 1)
+            assert [record.getMessage() for record in collector.records] == ['step 1']
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                await homemade_logger.aexception('failed')
+            assert 'ValueError: boom' in collector.records[-1].getMessage()
+            assert collector.records[-1].funcName == 'main'
+            await homemade_logger.aclose()
+
+        asyncio.run(main())
+
+    def test_fire_and_forget(self):
+        """ Test the records logged without waiting are written by aclose. """
+        homemade_logger, collector = self.build_logger('Async forget logger')
+
+        async def main():
+            for index in range(100):
+                homemade_logger.info('record %d', index)
+            await homemade_logger.aclose()
+            await homemade_logger.drain()
+
+        asyncio.run(main())
+        assert len(collector.records) == 100
+
+    def test_disable(self):
+        """ Test logging.disable silences the awaitable methods. """
+        homemade_logger, collector = self.build_logger('Async disabled logger')
+
+        async def main():
+            disable(CRITICAL)
+            try:
+                await homemade_logger.aerror('disabled')
+                await homemade_logger.alog(CRITICAL, 'disabled')
+            finally:
+                disable(NOTSET)
+            await homemade_logger.aerror('shown')
+            await homemade_logger.aclose()
+
+        asyncio.run(main())
+        assert [record.getMessage() for record in collector.records] == ['shown']
+
+    def test_task_context(self):
+        """ Test the task name and context are added to the records. """
+        homemade_logger, collector = self.build_logger('Async context logger')
+
+        async def handle(request_id):
+            bind_context(request_id=request_id)
+            await homemade_logger.ainfo('handled')
+
+        async def main():
+            await asyncio.gather(asyncio.create_task(handle(1), name='first'),
+                                 asyncio.create_task(handle(2), name='second'))
+            await homemade_logger.aclose()
+
+        asyncio.run(main())
+        assert sorted((record.taskName, record.request_id) for record in collector.records) == \
+            [('first', 1), ('second', 2)]
@@ -0,0 +1,128 @@
+"""
+    Test the binary log format and its decoder.
+"""
+
+# Imports.
+import io
+import json
+import subprocess
+import sys
+from functools import partial
+from os.path import (
+    join,
+    abspath
+)
+from logging import (
+    DEBUG
+)
+
+# Environment
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from binlog import (
+    BinaryEncoder,
+    BinaryFormatter,
+    RecordRenderer,
+    pack_value,
+    read_records,
+    unpack_value
+)
+from handlers import (
+    HomemadeRotatingFileHandler,
+    ROTATION_WORKER
+)
+from logger import (
+    HomemadeLogger,
+    HomemadeTimedRotatingFileHandler
+)
+from conftest import build_record
+
+build_binary_record = partial(build_record, level=DEBUG, name='binary',
+                              pathname='/app/main.py', lineno=12, func='run')
+
+
+class TestValues:
+    """
+        Test the functions pack_value and unpack_value.
+    """
+
+    def test_round_trip(self):
+        """ Test the values keep their type. """
+        values = (None, True, 3, 2 ** 70, 1.5, 'é', b'\x00', ('a', 1), {'key': [1, 2]}, object)
+        parts = []
+        pack_value(values, parts)
+        decoded, offset = unpack_value(b''.join(parts), 0)
+        assert offset == len(b''.join(parts))
+        assert decoded[:8] == values[:8]
+        assert decoded[8] == {'key': (1, 2)}
+        assert decoded[9] == str(object)
+
+
+class TestBinaryEncoder:
+    """
+        Test the class BinaryEncoder.
+    """
+
+    def test_interning(self):
+        """ Test the strings are defined once per file. """
+        formatter = BinaryFormatter()
+        encoder = BinaryEncoder()
+        first = encoder.encode(formatter.format(build_binary_record('step %d', (1,))), True)
+        second = encoder.encode(formatter.format(build_binary_record('step %d', (2,))), False)
+        assert b'step %d' in first and b'step %d' not in second
+        assert len(second) < len(first)
+        records = list(read_records(io.BytesIO(first + second)))
+        renderer = RecordRenderer('%(levelname)s %(funcName)s:%(lineno)d %(message)s')
+        assert [renderer.render(record) for record in records] == \
+            ['DEBUG run:12 step 1', 'DEBUG run:12 step 2']
+
+
+class TestBinaryFile:
+    """
+        Test the binary output of the file handlers.
+    """
+
+    def test_rotation(self, tmp_path):
+        """ Test every rotated file can be decoded on its own. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, max_bytes=200, binary=True)
+        handler.setFormatter(BinaryFormatter())
+        for index in range(10):
+            handler.handle(build_binary_record('record %d', (index,)))
+        handler.close()
+        ROTATION_WORKER.join()
+        paths = handler.get_backups()
+        messages = []
+        for file_path in paths + [path]:
+            with open(file_path, 'rb') as stream:
+                messages.extend(record.getMessage() for record in read_records(stream))
+        assert len(paths) > 1
+        assert sorted(messages) == sorted(f'record {index}' for index in range(10))
+
+    def test_decoder_cli(self, tmp_path):
+        """ Test the decoder renders text and JSON lines. """
+        path = str(tmp_path / 'binary.log')
+        file_handler = HomemadeTimedRotatingFileHandler(
+            filename=path, output='binary', level=DEBUG,
+            log_format="%(levelname)s %(request_id)s %(message)s")
+        homemade_logger = HomemadeLogger(name='Binary logger', level=DEBUG,
+                                         handlers=[file_handler])
+        homemade_logger.get_logger().propagate = False
+        homemade_logger.bind(request_id='r1').debug('user %s', 'bob')
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            homemade_logger.exception('failed')
+        file_handler.get_handler().flush()
+        decoder = join(abspath('.'), 'source', 'binlog.py')
+        text = subprocess.run([sys.executable, decoder, path, '--format',
+                               '%(levelname)s %(request_id)s %(message)s'],
+                              capture_output=True, text=True, check=True).stdout
+        assert text.startswith('DEBUG r1 user bob\nERROR  failed\nTraceback')
+        lines = subprocess.run([sys.executable, decoder, path, '--output', 'json'],
+                               capture_output=True, text=True, check=True).stdout.splitlines()
+        fields = json.loads(lines[1])
+        assert fields['level'] == 'ERROR' and fields['name'] == 'binary_logger'
+        assert 'ValueError: boom' in fields['exception']
+        assert file_handler.get_output() == 'binary'
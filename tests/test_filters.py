@@ -0,0 +1,105 @@
+"""
+    Test the filters protecting the handlers from log storms.
+"""
+
+# Imports.
+from functools import partial
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from logging import (
+    DEBUG,
+    INFO
+)
+from unittest import TestCase
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from filters import HomemadeRateLimitFilter
+from logger import HomemadeLogger
+from conftest import build_record
+
+build_storm_record = partial(build_record, name='storm', created=0.0)
+
+
+class TestHomemadeRateLimitFilter(TestCase):
+    """
+        Test the class HomemadeRateLimitFilter.
+    """
+
+    def test_init(self):
+        """ Test the HomemadeRateLimitFilter.__init__ function. """
+        with pytest.raises(TypeError):
+            HomemadeRateLimitFilter(rate='10')
+        with pytest.raises(TypeError):
+            HomemadeRateLimitFilter(sample_rates=[0.5])
+        with pytest.raises(ValueError):
+            HomemadeRateLimitFilter(burst=0)
+        with pytest.raises(ValueError):
+            HomemadeRateLimitFilter(sample_rates={DEBUG: 2})
+
+    def test_collapse(self):
+        """ Test identical records are collapsed into a count. """
+        log_filter = HomemadeRateLimitFilter(window=10)
+        with self.assertLogs('storm', level=INFO) as captured:
+            assert log_filter.filter(build_storm_record('boom', created=0.0))
+            for index in range(1, 100):
+                assert not log_filter.filter(build_storm_record('boom', created=index * 0.05))
+            assert log_filter.filter(build_storm_record('other', created=6.0))
+        assert len(captured.records) == 1
+        assert captured.records[0].getMessage() == 'boom (message repeated 99 times in 5s)'
+
+    def test_window(self):
+        """ Test an identical record after the window is emitted. """
+        log_filter = HomemadeRateLimitFilter(window=1)
+        assert log_filter.filter(build_storm_record('boom', created=0.0))
+        assert log_filter.filter(build_storm_record('boom', created=2.0))
+
+    def test_rate_limit(self):
+        """ Test each call site has its own token bucket. """
+        log_filter = HomemadeRateLimitFilter(rate=1, burst=2)
+        kept = [log_filter.filter(build_storm_record(f'message {index}', created=0.0))
+                for index in range(5)]
+        assert kept == [True, True, False, False, False]
+        assert log_filter.filter(build_storm_record('elsewhere', lineno=2, created=0.0))
+        with self.assertLogs('storm', level=INFO) as captured:
+            log_filter.flush()
+        assert captured.records[0].getMessage().endswith('(3 records dropped by the rate limit)')
+
+    def test_sampling(self):
+        """ Test the sampled levels. """
+        log_filter = HomemadeRateLimitFilter(sample_rates={DEBUG: 0})
+        assert not log_filter.filter(build_storm_record('debug', level=DEBUG))
+        assert log_filter.filter(build_storm_record('info'))
+
+    def test_max_sites(self):
+        """ Test the number of tracked call sites is bounded. """
+        log_filter = HomemadeRateLimitFilter(max_sites=10)
+        for lineno in range(100):
+            log_filter.filter(build_storm_record('message', lineno=lineno))
+        assert len(log_filter.sites) == 10
+        log_filter = HomemadeRateLimitFilter(max_sites=1)
+        for created in [0.0, 1.0, 2.0]:
+            log_filter.filter(build_storm_record('boom', created=created))
+        with self.assertLogs('storm', level=INFO) as captured:
+            assert log_filter.filter(build_storm_record('elsewhere', lineno=2, created=3.0))
+        assert captured.records[0].getMessage() == 'boom (message repeated 2 times in 2s)'
+
+    def test_logger(self):
+        """ Test the filter attached to a HomemadeLogger. """
+        with pytest.raises(TypeError):
+            HomemadeLogger(filters={})
+        log_filter = HomemadeRateLimitFilter()
+        homemade_logger = HomemadeLogger(name='Storm logger', filters=[log_filter])
+        assert homemade_logger.get_filters() == [log_filter]
+        with self.assertLogs(homemade_logger.get_logger(), level=INFO) as captured:
+            for _ in range(50):
+                homemade_logger.info('dependency down')
+            homemade_logger.shutdown()
+        assert len(captured.records) == 2
+        assert 'message repeated 49 times' in captured.records[1].getMessage()
@@ -0,0 +1,192 @@
+"""
+    Test the formatters of the logger.
+"""
+
+# Imports.
+import json
+import os
+import sys
+import time
+from functools import partial
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from logging import (
+    Formatter,
+    LogRecord
+)
+
+# Environment
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from formatters import (
+    CompiledFormatter,
+    JsonFormatter,
+    TracebackDeduplicator,
+    build_formatter,
+    compile_format,
+    fingerprint_exception
+)
+from conftest import build_record
+
+build_hello_record = partial(build_record, 'Hello %s', ('world',), lineno=42,
+                             func='function')
+
+
+class TestCompiledFormatter:
+    """
+        Test the class CompiledFormatter.
+    """
+
+    @pytest.mark.parametrize('log_format', [
+        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        "%(message)s",
+        "[%(levelname)-8s] %(lineno)d %(funcName)s 100%% %(message)r",
+        "%(created)f %(msecs)03d",
+    ])
+    def test_same_as_formatter(self, log_format):
+        """ Test the compiled formatter renders like the stdlib formatter. """
+        record = build_hello_record()
+        assert CompiledFormatter(log_format).format(record) == \
+            Formatter(log_format).format(build_record_like(record))
+
+    def test_datefmt(self):
+        """ Test the cached timestamp with a custom date format. """
+        record = build_hello_record()
+        log_format = "%(asctime)s %(message)s"
+        assert CompiledFormatter(log_format, datefmt='%H:%M').format(record) == \
+            Formatter(log_format, datefmt='%H:%M').format(build_record_like(record))
+
+    def test_exception(self):
+        """ Test the exception text is appended. """
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = build_hello_record(exc_info=sys.exc_info())
+        rendered = CompiledFormatter("%(message)s").format(record)
+        assert rendered.startswith('Hello world\nTraceback')
+        assert rendered.endswith('ValueError: boom')
+
+    def test_shared_line(self):
+        """ Test a second formatter with the same format reuses the rendered line. """
+        record = build_hello_record()
+        first = CompiledFormatter("%(name)s %(message)s").format(record)
+        record.name = 'changed'
+        assert CompiledFormatter("%(name)s %(message)s").format(record) is first
+        assert CompiledFormatter("%(name)s: %(message)s").format(record) == 'changed: Hello world'
+
+    def test_converter(self):
+        """ Test a formatter with another time converter does not reuse the line. """
+        record = build_hello_record()
+        CompiledFormatter("%(asctime)s %(message)s").format(record)
+        epoch = CompiledFormatter("%(asctime)s %(message)s")
+        epoch.converter = lambda seconds: time.gmtime(0)
+        assert epoch.format(record) == f'1970-01-01 00:00:00,{int(record.msecs):03d} Hello world'
+
+    def test_compile_format(self):
+        """ Test the formats that cannot be compiled. """
+        assert compile_format("%(message)s")[2] == ('message',)
+        assert compile_format("%s %(message)s") is None
+        assert compile_format("%(message)*s") is None
+
+
+def build_record_like(record):
+    """ Copy a record without the rendered line cached on it. """
+    copy = LogRecord(record.name, record.levelno, record.pathname, record.lineno,
+                     record.msg, record.args, record.exc_info, record.funcName)
+    copy.created = record.created
+    copy.msecs = record.msecs
+    return copy
+
+
+class TestJsonFormatter:
+    """
+        Test the class JsonFormatter.
+    """
+
+    def test_format(self):
+        """ Test the JSON line holds the static and per-record fields. """
+        with pytest.raises(TypeError):
+            JsonFormatter(static_fields=['service'])
+        formatter = JsonFormatter(static_fields={'service': 'api'})
+        line = json.loads(formatter.format(build_hello_record()))
+        assert line['service'] == 'api'
+        assert line['name'] == 'test'
+        assert line['level'] == 'INFO'
+        assert line['message'] == 'Hello world'
+        assert line['pid'] == os.getpid()
+        assert 'time' in line and 'host' in line
+
+    def test_exception(self):
+        """ Test the exception text is a field of the line. """
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = build_hello_record(exc_info=sys.exc_info())
+        line = json.loads(JsonFormatter().format(record))
+        assert line['exception'].endswith('ValueError: boom')
+
+    def test_extra_fields(self):
+        """ Test the extra fields are fields of the line, the record ones are not replaced. """
+        record = build_hello_record()
+        record.request_id = 'abc'
+        record.level = 'custom'
+        record._homemade_private = 'hidden'
+        record.taskName = 'Task-1'
+        line = json.loads(JsonFormatter().format(record))
+        assert line['request_id'] == 'abc'
+        assert line['level'] == 'INFO'
+        assert '_homemade_private' not in line and 'lineno' not in line
+        assert 'taskName' not in line
+
+    def test_build_formatter(self):
+        """ Test the formatter is chosen from the output mode. """
+        assert isinstance(build_formatter("%(message)s", 'json'), JsonFormatter)
+        assert not isinstance(build_formatter("%(message)s"), JsonFormatter)
+
+
+def fail(value):
+    """ Raise a ValueError from a fixed location and return its exc_info. """
+    try:
+        raise ValueError(value)
+    except ValueError:
+        return sys.exc_info()
+
+
+class TestTracebackDeduplicator:
+    """
+        Test the class TracebackDeduplicator.
+    """
+
+    def test_fingerprint(self):
+        """ Test the fingerprint ignores the message, not the location. """
+        assert fingerprint_exception(fail('a')) == fingerprint_exception(fail('b'))
+        try:
+            raise ValueError('a')
+        except ValueError:
+            other = sys.exc_info()
+        assert fingerprint_exception(other) != fingerprint_exception(fail('a'))
+
+    def test_format_exception(self):
+        """ Test the repeats within the window are rendered as a reference. """
+        with pytest.raises(ValueError):
+            TracebackDeduplicator(window=0)
+        deduplicator = TracebackDeduplicator(window=60, max_entries=1)
+        formatter = build_formatter("%(message)s", deduplicator=deduplicator)
+        reference = fingerprint_exception(fail('a'))
+        full = formatter.format(build_hello_record(exc_info=fail('a')))
+        assert 'Traceback (most recent call last)' in full
+        assert full.endswith(f'[traceback {reference}]')
+        assert formatter.format(build_hello_record(exc_info=fail('b'))) == \
+            f'Hello world\nValueError: b [traceback {reference}, occurrence 2]'
+        assert deduplicator.get_traceback(reference) == full.split('\n', 1)[1]
+        deduplicator.entries[reference][0] -= 60
+        assert 'Traceback' in formatter.format(build_hello_record(exc_info=fail('c')))
+        try:
+            raise KeyError('d')
+        except KeyError:
+            deduplicator.filter(build_hello_record(exc_info=sys.exc_info()))
+        assert deduplicator.get_traceback(reference) is None
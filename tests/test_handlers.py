@@ -0,0 +1,294 @@
+"""
+    Test the handlers built by the homemade handler wrappers.
+"""
+
+# Imports.
+import gzip
+import io
+import os
+import time
+from os import listdir
+from os.path import (
+    join,
+    abspath,
+    basename,
+    exists
+)
+from threading import Thread
+import pytest
+from logging import (
+    Formatter,
+    StreamHandler,
+    INFO,
+    ERROR
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from handlers import (
+    BufferedRecord,
+    HomemadeRotatingFileHandler,
+    RingBufferHandler,
+    ROTATION_WORKER,
+    ThreadBufferHandler,
+    get_file_handler,
+    get_writer
+)
+from conftest import build_record
+
+
+def read(path):
+    """ Read a whole file. """
+    with open(path) as log_file:
+        return log_file.read()
+
+
+class TestHomemadeRotatingFileHandler:
+    """
+        Test the class HomemadeRotatingFileHandler.
+    """
+
+    def test_unbuffered(self, tmp_path):
+        """ Test the records are written right away by default. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path)
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('a'))
+        assert read(path) == 'a\n'
+        handler.close()
+
+    def test_buffered(self, tmp_path):
+        """ Test the records are written once a threshold is reached. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, buffered=True, buffer_records=3,
+                                              flush_interval=60)
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('a'))
+        handler.handle(build_record('b'))
+        assert read(path) == ''
+        handler.handle(build_record('c'))
+        assert read(path) == 'a\nb\nc\n'
+        handler.handle(build_record('d'))
+        handler.handle(build_record('e', level=ERROR))
+        assert read(path) == 'a\nb\nc\nd\ne\n'
+        handler.handle(build_record('f'))
+        handler.close()
+        assert read(path).endswith('f\n')
+
+    def test_buffered_interval(self, tmp_path):
+        """ Test the background flush writes idle records. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, buffered=True, flush_interval=0.05)
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('a'))
+        handler.flusher_stop.wait(0.3)
+        assert read(path) == 'a\n'
+        handler.close()
+
+    def test_compression(self, tmp_path):
+        """ Test the rotated file is compressed by the rotation worker. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, compression='gzip')
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('a'))
+        handler.doRollover()
+        ROTATION_WORKER.join()
+        archives = [name for name in listdir(tmp_path) if name.endswith('.gz')]
+        assert len(archives) == 1
+        with gzip.open(join(tmp_path, archives[0]), 'rt') as archive:
+            assert archive.read() == 'a\n'
+        assert sorted(listdir(tmp_path)) == sorted(['log', archives[0]])
+        handler.close()
+
+    def test_size_rotation(self, tmp_path):
+        """ Test the file is rotated on size without overwriting the backups. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, max_bytes=4)
+        handler.setFormatter(Formatter('%(message)s'))
+        for message in ['a', 'b', 'c', 'd', 'e']:
+            handler.handle(build_record(message))
+        ROTATION_WORKER.join()
+        assert read(path) == 'e\n'
+        backups = handler.get_backups()
+        assert [read(backup) for backup in backups] == ['a\nb\n', 'c\nd\n']
+        handler.close()
+
+    def test_size_in_bytes(self, tmp_path):
+        """ Test max_bytes counts the encoded bytes of the records. """
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, max_bytes=4, encoding='utf-8')
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('\u00e9'))
+        handler.handle(build_record('\u00e9'))
+        ROTATION_WORKER.join()
+        assert handler.rotations == 1
+        with open(path, encoding='utf-8') as log_file:
+            assert log_file.read() == '\u00e9\n'
+        handler.close()
+
+    def test_retention(self, tmp_path):
+        """ Test the backups beyond backup_count are removed. """
+        path = str(tmp_path / 'log')
+        (tmp_path / 'log.2020-01-01_00.bz2').write_text('old\n')
+        (tmp_path / 'log.audit').write_text('audit\n')
+        handler = HomemadeRotatingFileHandler(path, max_bytes=2, backup_count=2,
+                                              compression='bz2')
+        assert handler.get_backups() == [str(tmp_path / 'log.2020-01-01_00.bz2')]
+        handler.setFormatter(Formatter('%(message)s'))
+        for message in ['a', 'b', 'c', 'd']:
+            handler.handle(build_record(message))
+        ROTATION_WORKER.join()
+        backups = handler.get_backups()
+        assert len(backups) == 2
+        assert all(backup.endswith('.bz2') for backup in backups)
+        assert sorted(listdir(tmp_path)) == sorted(['log', 'log.audit'] + [basename(backup)
+                                                                           for backup in backups])
+        handler.close()
+
+    def test_durability(self, tmp_path, monkeypatch):
+        """ Test the records wait for the fsync their policy asks for. """
+        synced = []
+        monkeypatch.setattr(os, 'fsync', synced.append)
+        path = str(tmp_path / 'log')
+        handler = HomemadeRotatingFileHandler(path, durability='level-triggered',
+                                              sync_level=ERROR)
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('a'))
+        assert handler.get_sync_stats()['syncs'] == 0
+        handler.handle(build_record('b', level=ERROR))
+        # The file and its directory, created since the last sync.
+        assert len(synced) == 2
+        assert handler.get_sync_stats()['records'] == 2
+        handler.close()
+        handler = HomemadeRotatingFileHandler(path, durability='interval', sync_interval=0.05)
+        handler.setFormatter(Formatter('%(message)s'))
+        handler.handle(build_record('c'))
+        handler.flusher_stop.wait(0.3)
+        assert handler.get_sync_stats()['records'] == 1
+        handler.close()
+        assert read(path) == 'a\nb\nc\n'
+
+    def test_group_commit(self, tmp_path, monkeypatch):
+        """ Test the concurrent records share the fsyncs. """
+        fsync = os.fsync
+        monkeypatch.setattr(os, 'fsync', lambda descriptor: time.sleep(0.01) or fsync(descriptor))
+        path = str(tmp_path / 'log')
+        writer = get_writer(path, durability='every-record')
+        handler = get_file_handler(writer, INFO, Formatter('%(message)s'), 'durable')
+
+        def write(thread):
+            for index in range(10):
+                handler.handle(build_record(f"{thread}-{index}"))
+
+        threads = [Thread(target=write, args=(thread,)) for thread in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = writer.get_sync_stats()
+        assert stats['records'] == 80
+        assert stats['syncs'] < 80
+        handler.close()
+        assert len(read(path).splitlines()) == 80
+
+
+class TestSharedFileHandler:
+    """
+        Test the class SharedFileHandler.
+    """
+
+    def test_shared_writer(self, tmp_path):
+        """ Test the handlers with their own level and format write through one file. """
+        path = str(tmp_path / 'log')
+        writer = get_writer(path)
+        assert get_writer(path) is writer
+        assert get_writer(join(str(tmp_path), '.', 'log')) is writer
+        with pytest.raises(ValueError):
+            get_writer(path, when='D')
+        assert not exists(path)
+        info = get_file_handler(writer, INFO, Formatter('info %(message)s'), 'info')
+        error = get_file_handler(writer, ERROR, Formatter('error %(message)s'), 'error')
+        assert get_file_handler(writer, INFO, Formatter('info %(message)s'), 'info') is info
+        for handler in [info, error]:
+            handler.handle(build_record('a'))
+            handler.handle(build_record('b', level=ERROR))
+        assert read(path) == 'info a\ninfo b\nerror a\nerror b\n'
+        info.close()
+        info.close()
+        assert info.closed
+        assert writer.stream is not None
+        error.close()
+        assert writer.stream is None
+        assert get_file_handler(writer, ERROR, Formatter('%(message)s'), 'error') is not error
+        assert get_writer(path) is not writer
+
+
+class TestRingBufferHandler:
+    """
+        Test the class RingBufferHandler.
+    """
+
+    def test_trigger(self, tmp_path):
+        """ Test the buffered records are written before the triggering record. """
+        path = str(tmp_path / 'log')
+        target = HomemadeRotatingFileHandler(path)
+        target.setFormatter(Formatter('%(levelname)s %(message)s'))
+        handler = RingBufferHandler([target], capacity=2)
+        for message in ['a', 'b', 'c']:
+            handler.handle(build_record(message))
+        assert read(path) == ''
+        assert all(isinstance(entry, BufferedRecord) for entry in handler.buffer)
+        handler.handle(build_record('boom', level=ERROR))
+        assert read(path) == 'INFO b\nINFO c\nERROR boom\n'
+        handler.handle(build_record('d'))
+        assert read(path) == 'INFO b\nINFO c\nERROR boom\n'
+        target.close()
+
+
+class TestThreadBufferHandler:
+    """
+        Test the class ThreadBufferHandler.
+    """
+
+    def test_merge(self, tmp_path):
+        """ Test the records of several threads are written in time order. """
+        path = str(tmp_path / 'log')
+        writer = HomemadeRotatingFileHandler(path)
+        writer.setFormatter(Formatter('%(message)s'))
+        handler = ThreadBufferHandler(writer, window=0.01)
+        created = [[], []]
+
+        def log(index):
+            for number in range(200):
+                record = build_record(f'{index} {number}')
+                created[index].append(record.created)
+                handler.handle(record)
+
+        threads = [Thread(target=log, args=(index,)) for index in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        handler.close()
+        lines = read(path).splitlines()
+        assert len(lines) == 400
+        for index in range(2):
+            numbers = [int(line.split()[1]) for line in lines if line.startswith(f'{index} ')]
+            assert numbers == list(range(200))
+        writer.close()
+
+    def test_stream_target(self):
+        """ Test a StreamHandler target gets the batch, flush writes the recent records. """
+        stream = io.StringIO()
+        target = StreamHandler(stream)
+        target.setFormatter(Formatter('%(levelname)s %(message)s'))
+        handler = ThreadBufferHandler(target, window=60)
+        handler.handle(build_record('a'))
+        handler.handle(build_record('b'))
+        assert stream.getvalue() == ''
+        handler.flush()
+        assert stream.getvalue() == 'INFO a\nINFO b\n'
+        handler.close()
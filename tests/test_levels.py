@@ -0,0 +1,129 @@
+"""
+    Test the live reconfiguration of the levels.
+"""
+
+# Imports.
+import json
+import os
+import signal
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from logging import (
+    disable,
+    CRITICAL,
+    NOTSET,
+    DEBUG,
+    INFO,
+    WARNING,
+    ERROR
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from levels import (
+    LevelController,
+    parse_level
+)
+from conftest import (
+    build_logger,
+    wait_for
+)
+
+
+class TestHomemadeLoggerSetLevel:
+    """
+        Test the function HomemadeLogger.set_level.
+    """
+
+    def test_set_level(self):
+        """ Test the threshold and the stream handler follow the level. """
+        homemade_logger, collector = build_logger('Set level logger', level=WARNING)
+        with pytest.raises(ValueError):
+            homemade_logger.set_level(5)
+        homemade_logger.debug('hidden')
+        stream_handler = homemade_logger.get_logger().handlers[0]
+        homemade_logger.set_level(DEBUG)
+        homemade_logger.debug('shown')
+        assert homemade_logger.threshold == DEBUG
+        assert homemade_logger.get_configured_level() == WARNING
+        assert stream_handler not in homemade_logger.get_logger().handlers
+        assert homemade_logger.get_logger().handlers[0].level == DEBUG
+        assert [record.getMessage() for record in collector.records] == ['shown']
+
+    def test_set_level_asynchronous(self):
+        """ Test the level of an asynchronous logger. """
+        homemade_logger, collector = build_logger('Set level async logger', level=WARNING,
+                                                  asynchronous=True)
+        homemade_logger.set_level(DEBUG)
+        homemade_logger.debug('shown')
+        homemade_logger.shutdown()
+        assert homemade_logger.get_queue() is not None
+        assert [record.getMessage() for record in collector.records] == ['shown']
+        assert homemade_logger.listener.handlers[0].level == DEBUG
+
+    def test_stdlib_gates(self):
+        """ Test logging.disable and the level of the stdlib logger still apply. """
+        homemade_logger, collector = build_logger('Stdlib gated logger', level=DEBUG)
+        bound = homemade_logger.bind(request_id='r1')
+        disable(CRITICAL)
+        try:
+            homemade_logger.error('disabled')
+            bound.error('disabled')
+        finally:
+            disable(NOTSET)
+        homemade_logger.get_logger().setLevel(ERROR)
+        homemade_logger.warning('below the stdlib level')
+        bound.warning('below the stdlib level')
+        homemade_logger.error('shown')
+        assert [record.getMessage() for record in collector.records] == ['shown']
+
+
+class TestLevelController:
+    """
+        Test the class LevelController.
+    """
+
+    def test_rules(self):
+        """ Test the longest prefix wins and removed rules restore the level. """
+        assert parse_level('debug') == DEBUG
+        with pytest.raises(ValueError):
+            parse_level('LOUD')
+        service, _ = build_logger('svc', level=WARNING)
+        database, _ = build_logger('svc.db', level=WARNING)
+        controller = LevelController({'svc': INFO, 'svc.db': 'DEBUG'})
+        try:
+            assert controller.get_level('svc.db.pool') == DEBUG
+            assert controller.get_level('other') is None
+            assert (service.get_level(), database.get_level()) == (INFO, DEBUG)
+            later, _ = build_logger('svc.api')
+            assert later.get_level() == INFO
+            controller.set_level('svc', None)
+            assert service.get_level() == WARNING
+        finally:
+            controller.close()
+
+    def test_file(self, tmp_path):
+        """ Test the rules of a watched file and of a signal. """
+        path = str(tmp_path / 'levels.json')
+        homemade_logger, _ = build_logger('watched', level=WARNING)
+        controller = LevelController()
+        try:
+            with open(path, 'w') as config_file:
+                json.dump({'levels': {'watched': 'DEBUG'}}, config_file)
+            controller.watch(path, interval=0.01)
+            assert wait_for(lambda: homemade_logger.get_level() == DEBUG)
+            controller.stop()
+            with open(path, 'w') as config_file:
+                json.dump({'default': 'ERROR'}, config_file)
+            controller.reload_on_signal(path, signal.SIGUSR1)
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert wait_for(lambda: homemade_logger.get_level() == ERROR)
+        finally:
+            signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+            controller.close()
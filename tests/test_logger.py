@@ -7,6 +7,11 @@
 """
 
 # Imports.
+import gc
+import io
+import json
+import weakref
+from contextlib import redirect_stderr
 from os import (
     remove,
     mkdir,
@@ -25,15 +30,32 @@ import sys
 sys.path.append(join(abspath('.'), 'source'))
 
 # Project modules.
-from logging import Logger
+from logging import (
+    Formatter,
+    Logger,
+    Handler,
+    StreamHandler,
+    disable,
+    makeLogRecord,
+    CRITICAL,
+    NOTSET
+)
+from logging.handlers import TimedRotatingFileHandler
 from logger import (
+    bind_context,
+    log_context,
+    unbind_context,
+    get_homemade_logger,
     HomemadeLogger,
+    HomemadeRingBufferHandler,
+    HomemadeThreadBufferHandler,
     HomemadeTimedRotatingFileHandler,
-    TimedRotatingFileHandler,
     INFO,
     DEBUG,
+    WARNING,
     ERROR,
 )
+from conftest import CollectingHandler
 
 
 class TestHomemadeLogger(TestCase):
@@ -162,6 +184,308 @@ class TestHomemadeLogger(TestCase):
         assert captured.records[1].getMessage() == self.test_message_1
         assert captured.records[1].levelname == 'ERROR'
 
+    def test_level_methods(self):
+        """ Test the HomemadeLogger debug/info/warning/error/exception functions. """
+        homemade_logger = HomemadeLogger(name='Level methods', level=INFO)
+        assert homemade_logger.get_logger() is homemade_logger.get_logger()
+        rendered = []
+
+        class Lazy:
+            def __str__(self):
+                rendered.append(True)
+                return 'lazy'
+
+        with self.assertLogs(homemade_logger.get_logger(), level=INFO) as captured:
+            homemade_logger.debug('%s', Lazy())
+            homemade_logger.info('%s %d', self.test_message, 1)
+            homemade_logger.warning(self.test_message_1)
+            homemade_logger.error(self.test_message_1)
+            try:
+                raise ValueError(self.test_message)
+            except ValueError:
+                homemade_logger.exception(self.test_message)
+        assert not rendered
+        assert [record.levelname for record in captured.records] == ['INFO', 'WARNING',
+                                                                     'ERROR', 'ERROR']
+        assert captured.records[0].getMessage() == f'{self.test_message} 1'
+        assert captured.records[0].funcName == 'test_level_methods'
+        assert captured.records[3].exc_info[0] is ValueError
+
+    def test_output(self):
+        """ Test the HomemadeLogger output option. """
+        with pytest.raises(TypeError):
+            HomemadeLogger(output=1)
+        with pytest.raises(ValueError):
+            HomemadeLogger(output='xml')
+        homemade_logger = HomemadeLogger(name='Json logger', output='json',
+                                         static_fields={'service': 'api'})
+        assert homemade_logger.get_output() == 'json'
+        homemade_logger = HomemadeLogger(name='Json bound logger', output='json')
+        logger = homemade_logger.get_logger()
+        logger.propagate = False
+        stream = io.StringIO()
+        logger.handlers[0].setStream(stream)
+        homemade_logger.bind(request_id='abc').info('hello')
+        line = json.loads(stream.getvalue())
+        assert (line['request_id'], line['message']) == ('abc', 'hello')
+
+    def test_no_duplicated_handlers(self):
+        """ Test building a logger again replaces its handlers. """
+        collector = CollectingHandler()
+        for _ in range(3):
+            homemade_logger = HomemadeLogger(name='Rebuilt logger', handlers=[collector])
+        logger = homemade_logger.get_logger()
+        assert len(logger.handlers) == 2
+        homemade_logger.info(self.test_message)
+        assert len(collector.records) == 1
+        HomemadeLogger(name='Rebuilt logger')
+        assert collector not in logger.handlers
+        assert len(logger.handlers) == 1
+
+    def test_shared_stream_handler(self):
+        """ Test the loggers with the same config share their stream handler. """
+        first = HomemadeLogger(name='First shared').get_logger()
+        second = HomemadeLogger(name='Second shared').get_logger()
+        assert first.handlers[0] is second.handlers[0]
+        third = HomemadeLogger(name='Third shared', level=DEBUG).get_logger()
+        assert third.handlers[0] is not first.handlers[0]
+
+    def test_get_homemade_logger(self):
+        """ Test the get_homemade_logger function. """
+        with pytest.raises(TypeError):
+            get_homemade_logger(name=1)
+        collector = CollectingHandler()
+        homemade_logger = get_homemade_logger('Registered logger', handlers=[collector])
+        assert get_homemade_logger(' registered LOGGER ', level=INFO,
+                                   handlers=[collector]) is homemade_logger
+        other = get_homemade_logger('Registered logger', level=DEBUG)
+        assert other is not homemade_logger
+        assert collector not in homemade_logger.get_logger().handlers
+        assert get_homemade_logger('Registered logger', handlers=[collector]) is homemade_logger
+        assert collector in homemade_logger.get_logger().handlers
+
+    def test_ring_buffer(self):
+        """ Test the debug context is written when an error is logged. """
+        with pytest.raises(TypeError):
+            HomemadeRingBufferHandler(targets={})
+        with pytest.raises(ValueError):
+            HomemadeRingBufferHandler(capacity=0)
+        collector = CollectingHandler()
+        ring_buffer = HomemadeRingBufferHandler(targets=[collector], capacity=10)
+        assert ring_buffer.get_trigger_level() == ERROR
+        homemade_logger = HomemadeLogger(name='Ring buffer logger', level=DEBUG,
+                                         handlers=[ring_buffer])
+        homemade_logger.get_logger().propagate = False
+        homemade_logger.debug('step %d', 1)
+        homemade_logger.debug('step %d', 2)
+        assert not collector.records
+        homemade_logger.error(self.test_message)
+        assert [record.getMessage() for record in collector.records] == \
+            ['step 1', 'step 2', self.test_message]
+
+    def test_ring_buffer_gate(self):
+        """ Test the debug records are buffered by a logger of a higher level. """
+        collector = CollectingHandler()
+        other = CollectingHandler()
+        ring_buffer = HomemadeRingBufferHandler(targets=[collector], capacity=10)
+        stream = io.StringIO()
+        with redirect_stderr(stream):
+            homemade_logger = HomemadeLogger(name='Ring buffer gate logger', level=INFO,
+                                             handlers=[ring_buffer, other])
+        homemade_logger.get_logger().propagate = False
+        assert homemade_logger.get_gate_level() == DEBUG
+        assert homemade_logger.is_enabled(DEBUG)
+        homemade_logger.debug('step %d', 1)
+        assert not collector.records and not other.records
+        assert stream.getvalue() == ''
+        with redirect_stderr(stream):
+            homemade_logger.set_level(WARNING)
+        assert homemade_logger.get_logger().level == DEBUG
+        homemade_logger.debug('step %d', 2)
+        homemade_logger.info('step %d', 3)
+        assert not other.records
+        assert stream.getvalue() == ''
+        homemade_logger.error(self.test_message)
+        assert [record.getMessage() for record in collector.records] == \
+            ['step 1', 'step 2', 'step 3', self.test_message]
+        assert [record.getMessage() for record in other.records] == [self.test_message]
+        assert self.test_message in stream.getvalue()
+        homemade_logger.set_level(DEBUG)
+        assert other.level == NOTSET
+
+    def test_ring_buffer_fields(self):
+        """ Test the bound and extra fields of the buffered records are written. """
+        stream = io.StringIO()
+        target = StreamHandler(stream)
+        target.setFormatter(Formatter("%(request_id)s %(tenant)s %(message)s"))
+        ring_buffer = HomemadeRingBufferHandler(targets=[target])
+        homemade_logger = HomemadeLogger(name='Ring buffer fields logger', level=DEBUG,
+                                         handlers=[ring_buffer])
+        homemade_logger.get_logger().propagate = False
+        bound = homemade_logger.bind(request_id='r1')
+        bound.debug('step', extra={'tenant': 'acme'})
+        bound.error(self.test_message, extra={'tenant': 'acme'})
+        assert stream.getvalue() == f'r1 acme step\nr1 acme {self.test_message}\n'
+
+    def test_bind(self):
+        """ Test the HomemadeLogger.bind function. """
+        collector = CollectingHandler()
+        collector.setFormatter(Formatter("%(request_id)s %(tenant)s %(message)s"))
+        homemade_logger = HomemadeLogger(name='Bound logger', handlers=[collector])
+        homemade_logger.get_logger().propagate = False
+        bound = homemade_logger.bind(request_id='r1')
+        child = bound.bind(tenant='acme')
+        assert bound.get_fields() == {'request_id': 'r1'}
+        child.info(self.test_message)
+        bound.info('%s', self.test_message, extra={'tenant': 'other'})
+        record = collector.records[0]
+        assert (record.request_id, record.tenant) == ('r1', 'acme')
+        assert record.funcName == 'test_bind'
+        assert collector.format(collector.records[1]) == f'r1 other {self.test_message}'
+
+    def test_context(self):
+        """ Test the bind_context and log_context functions. """
+        collector = CollectingHandler()
+        homemade_logger = HomemadeLogger(name='Context logger', handlers=[collector],
+                                         log_format="%(request_id)s - %(message)s")
+        homemade_logger.get_logger().propagate = False
+        assert homemade_logger.get_format_fields() == ('request_id',)
+        token = bind_context(request_id='r1')
+        with log_context(tenant='acme'):
+            homemade_logger.info(self.test_message)
+        homemade_logger.info(self.test_message)
+        unbind_context(token)
+        homemade_logger.info(self.test_message)
+        assert [(record.request_id, getattr(record, 'tenant', None))
+                for record in collector.records] == [('r1', 'acme'), ('r1', None), ('', None)]
+
+    def test_context_precedence(self):
+        """ Test the extra fields win over the bound ones, which win over the context. """
+        collector = CollectingHandler()
+        homemade_logger = HomemadeLogger(name='Context precedence logger', handlers=[collector])
+        homemade_logger.get_logger().propagate = False
+        for reserved in ('levelname', 'message', 'msg'):
+            with pytest.raises(KeyError):
+                bind_context(**{reserved: 'r1'})
+            with pytest.raises(KeyError):
+                homemade_logger.bind(**{reserved: 'r1'})
+        with pytest.raises(KeyError):
+            with log_context(name='r1'):
+                pass
+        with pytest.raises(KeyError):
+            homemade_logger.bind(request_id='r1').bind(lineno=1)
+        bound = homemade_logger.bind(request_id='bound', tenant='bound')
+        with log_context(request_id='context', tenant='context', user='context'):
+            bound.info(self.test_message, extra={'tenant': 'extra'})
+        record = collector.records[0]
+        assert (record.request_id, record.tenant, record.user) == ('bound', 'extra', 'context')
+        assert record.levelname == 'INFO'
+
+    def test_thread_buffers(self):
+        """ Test the HomemadeThreadBufferHandler wrapper. """
+        with pytest.raises(TypeError):
+            HomemadeThreadBufferHandler(CollectingHandler(), window='1')
+        with pytest.raises(ValueError):
+            HomemadeThreadBufferHandler(CollectingHandler(), capacity=0)
+        collector = CollectingHandler()
+        thread_buffers = HomemadeThreadBufferHandler(collector, window=60)
+        assert thread_buffers.get_format() is None
+        homemade_logger = HomemadeLogger(name='Thread buffers logger', handlers=[thread_buffers])
+        homemade_logger.get_logger().propagate = False
+        homemade_logger.info(self.test_message)
+        assert not collector.records
+        thread_buffers.get_handler().close()
+        assert [record.getMessage() for record in collector.records] == [self.test_message]
+
+    def test_traceback_window(self):
+        """ Test the repeated tracebacks are written once per window. """
+        with pytest.raises(ValueError):
+            HomemadeLogger(traceback_window=-1)
+        collector = CollectingHandler()
+        homemade_logger = HomemadeLogger(name='Traceback logger', handlers=[collector],
+                                         traceback_window=60)
+        homemade_logger.get_logger().propagate = False
+        for attempt in range(3):
+            try:
+                raise ValueError(attempt)
+            except ValueError:
+                homemade_logger.exception(self.test_message)
+        texts = [record.exc_text for record in collector.records]
+        assert texts[0].startswith('Traceback (most recent call last)')
+        assert texts[2].startswith('ValueError: 2 [traceback ')
+        assert texts[2].endswith('occurrence 3]')
+
+    def test_introspection(self):
+        """ Test the records only get the caller, thread and process attributes read. """
+        with pytest.raises(TypeError):
+            HomemadeLogger(introspection=True)
+        with pytest.raises(ValueError):
+            HomemadeLogger(introspection='none')
+        homemade_logger = HomemadeLogger(name='Introspection logger',
+                                         log_format="%(funcName)s:%(lineno)d %(message)s")
+        logger = homemade_logger.get_logger()
+        logger.propagate = False
+        assert homemade_logger.get_record_fields() == frozenset({'funcName', 'lineno'})
+        collector = CollectingHandler()
+        collector.setFormatter(Formatter("%(message)s"))
+        logger.addHandler(collector)
+        # A handler it cannot describe gets every attribute.
+        assert homemade_logger.get_record_fields() is None
+        homemade_logger.info(self.test_message)
+        logger.removeHandler(collector)
+        assert homemade_logger.get_record_fields() == frozenset({'funcName', 'lineno'})
+        assert collector.records[0].process is not None
+        with self.assertLogs(logger, level=INFO) as captured:
+            homemade_logger.info(self.test_message)
+        assert captured.records[0].funcName == 'test_introspection'
+        stream = StreamHandler(io.StringIO())
+        stream.setFormatter(Formatter("%(funcName)s"))
+        logger.addHandler(stream)
+        homemade_logger.info(self.test_message)
+        homemade_logger.bind(user='me').warning(self.test_message)
+        logger.removeHandler(stream)
+        assert stream.stream.getvalue() == "test_introspection\n" * 2
+        assert HomemadeLogger(introspection='full').get_record_fields() is None
+
+    def test_log_disabled(self):
+        """ Test logging.disable silences HomemadeLogger.log as Logger.log does. """
+        collector = CollectingHandler()
+        homemade_logger = HomemadeLogger(name='Disabled logger', handlers=[collector])
+        homemade_logger.get_logger().propagate = False
+        disable(CRITICAL)
+        try:
+            homemade_logger.log(self.test_message)
+        finally:
+            disable(NOTSET)
+        homemade_logger.log(self.test_message_1)
+        assert [record.getMessage() for record in collector.records] == [self.test_message_1]
+
+    def test_asynchronous(self):
+        """ Test the HomemadeLogger asynchronous mode. """
+        with pytest.raises(TypeError):
+            HomemadeLogger(asynchronous='yes')
+        with pytest.raises(ValueError):
+            HomemadeLogger(asynchronous=True, overflow='explode')
+        with pytest.raises(ValueError):
+            HomemadeLogger(asynchronous=True, queue_size=0)
+        collector = CollectingHandler()
+        homemade_logger = HomemadeLogger(name='Asynchronous logger',
+                                         asynchronous=True,
+                                         handlers=[collector])
+        assert homemade_logger.is_asynchronous()
+        assert homemade_logger.get_queue() is not None
+        for _ in range(100):
+            homemade_logger.log(self.test_message)
+        homemade_logger.shutdown()
+        assert len(collector.records) == 100
+        assert collector.records[0].getMessage() == self.test_message
+        homemade_logger.shutdown()
+        # A logger shut down, here by its replacement, is not kept alive for the exit.
+        replaced = weakref.ref(homemade_logger)
+        homemade_logger = HomemadeLogger(name='Asynchronous logger', handlers=[collector])
+        gc.collect()
+        assert replaced() is None
+
 
 class TestHomemadeTimedRotatingFileHandler:
     """
@@ -311,9 +635,28 @@ class TestHomemadeTimedRotatingFileHandler:
     def test_get_handler(self):
         """ Test the HomemadeTimedRotatingFileHandler.get_handler function. """
         handler = HomemadeTimedRotatingFileHandler()
-        assert isinstance(handler.get_handler(),
+        assert isinstance(handler.get_handler(), Handler)
+        assert isinstance(handler.get_handler().get_writer(),
                           type(TimedRotatingFileHandler(filename='log')))
 
+    def test_shared_writer(self):
+        """ Test the handlers targeting the same file share one writer. """
+        handler = HomemadeTimedRotatingFileHandler(filename=self.test_filename_1)
+        same = HomemadeTimedRotatingFileHandler(filename=self.test_filename_1)
+        other_level = HomemadeTimedRotatingFileHandler(filename=self.test_filename_1,
+                                                       level=ERROR)
+        assert same.get_handler() is handler.get_handler()
+        assert other_level.get_handler() is not handler.get_handler()
+        assert other_level.get_handler().get_writer() is handler.get_handler().get_writer()
+        other_rotation = HomemadeTimedRotatingFileHandler(filename=self.test_filename_1,
+                                                          when='D')
+        with pytest.raises(ValueError):
+            other_rotation.get_handler()
+        other_path = HomemadeTimedRotatingFileHandler(filename=abspath(self.test_filename_1),
+                                                      when='D')
+        with pytest.raises(ValueError):
+            other_path.get_handler()
+
     def test_init(self):
         """ Test the HomemadeTimedRotatingFileHandler.__init__ function. """
         with pytest.raises(TypeError):
@@ -345,12 +688,42 @@ class TestHomemadeTimedRotatingFileHandler:
 
     def test_file(self):
         """ Test the HomemadeTimedRotatingFileHandler.handler function. """
-        HomemadeTimedRotatingFileHandler(filename='log',
-                                         when='S',
-                                         interval=5)
-        assert exists('log')
+        handler = HomemadeTimedRotatingFileHandler(filename=self.test_filename,
+                                                   when='S',
+                                                   interval=5)
+        assert not exists(self.test_filename)
+        handler.get_handler().handle(makeLogRecord({'msg': 'test', 'levelno': ERROR,
+                                                    'levelname': 'ERROR'}))
+        assert exists(self.test_filename)
         HomemadeTimedRotatingFileHandler(filename='log',
                                          when='S',
                                          interval=5,
                                          log_extension='extension')
 
+    def test_buffered(self):
+        """ Test the HomemadeTimedRotatingFileHandler buffered option. """
+        with pytest.raises(TypeError):
+            HomemadeTimedRotatingFileHandler(buffered='yes')
+        with pytest.raises(ValueError):
+            HomemadeTimedRotatingFileHandler(buffer_records=0)
+        handler = HomemadeTimedRotatingFileHandler(buffered=True, flush_level=ERROR)
+        assert handler.is_buffered()
+        assert handler.get_flush_level() == ERROR
+        assert handler.get_handler().get_writer().buffered
+        handler.get_handler().close()
+
+    def test_durability(self):
+        """ Test the HomemadeTimedRotatingFileHandler durability option. """
+        with pytest.raises(TypeError):
+            HomemadeTimedRotatingFileHandler(durability=1)
+        with pytest.raises(ValueError):
+            HomemadeTimedRotatingFileHandler(durability='always')
+        with pytest.raises(ValueError):
+            HomemadeTimedRotatingFileHandler(durability='interval', sync_interval=0)
+        handler = HomemadeTimedRotatingFileHandler(durability='level-triggered',
+                                                   sync_level=WARNING)
+        assert handler.get_durability() == {'durability': 'level-triggered',
+                                            'sync_interval': 1.0,
+                                            'sync_level': WARNING}
+        assert handler.get_handler().get_writer().durability == 'level-triggered'
+        handler.get_handler().close()
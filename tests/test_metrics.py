@@ -0,0 +1,132 @@
+"""
+    Test the metrics of the logging pipeline.
+"""
+
+# Imports.
+import io
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from threading import Event
+from logging import (
+    StreamHandler,
+    makeLogRecord,
+    INFO,
+    ERROR
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from formatters import build_formatter
+from logger import (
+    HomemadeLogger,
+    HomemadeTimedRotatingFileHandler
+)
+from metrics import (
+    LatencyHistogram,
+    MetricsExporter,
+    instrument_handler
+)
+from conftest import CollectingHandler
+
+
+class TestLatencyHistogram:
+    """
+        Test the class LatencyHistogram.
+    """
+
+    def test_percentile(self):
+        """ Test the LatencyHistogram.percentile function. """
+        histogram = LatencyHistogram()
+        assert histogram.percentile(0.5) == 0.0
+        for duration in [1000] * 99 + [1000000]:
+            histogram.record(duration)
+        snapshot = histogram.snapshot()
+        assert snapshot['count'] == 100
+        assert 1 <= snapshot['p50_us'] <= 2.048
+        assert snapshot['p999_us'] == snapshot['max_us'] == 1000
+
+
+class TestInstrumentHandler:
+    """
+        Test the function instrument_handler.
+    """
+
+    def test_instrument_handler(self):
+        """ Test the records and bytes are counted per level, once per handler. """
+        handler = CollectingHandler()
+        handler.setFormatter(build_formatter('%(message)s'))
+        metrics = instrument_handler(handler)
+        assert instrument_handler(handler) is metrics
+        for level, message in [(INFO, 'abc'), (INFO, 'de'), (ERROR, 'f')]:
+            record = makeLogRecord({'levelno': level, 'levelname': 'INFO' if level == INFO
+                                    else 'ERROR', 'msg': message})
+            handler.handle(record)
+        handler.addFilter(lambda record: False)
+        handler.handle(makeLogRecord({'levelno': INFO, 'levelname': 'INFO', 'msg': 'x'}))
+        snapshot = metrics.snapshot()
+        assert snapshot['records'] == {'INFO': 2, 'ERROR': 1}
+        assert snapshot['latency']['count'] == 3
+
+    def test_bytes(self):
+        """ Test the bytes are counted encoded, with the line terminator. """
+        handler = StreamHandler(io.StringIO())
+        handler.setFormatter(build_formatter('%(message)s'))
+        metrics = instrument_handler(handler)
+        for message in ['abc', 'd\u00e9']:
+            handler.handle(makeLogRecord({'levelno': INFO, 'levelname': 'INFO', 'msg': message}))
+        assert metrics.snapshot()['bytes'] == {'INFO': 8}
+
+
+class TestHomemadeLoggerMetrics:
+    """
+        Test the HomemadeLogger.get_metrics and export_metrics functions.
+    """
+
+    def test_get_metrics(self, tmp_path):
+        """ Test the snapshot holds the handlers, rotations and queue. """
+        with pytest.raises(TypeError):
+            HomemadeLogger(metrics='yes')
+        file_handler = HomemadeTimedRotatingFileHandler(filename=str(tmp_path / 'log'),
+                                                        log_format='%(message)s', max_bytes=4)
+        homemade_logger = HomemadeLogger(name='Metrics logger', handlers=[file_handler],
+                                         asynchronous=True, metrics=True)
+        homemade_logger.get_logger().propagate = False
+        for message in ['a', 'b', 'c']:
+            homemade_logger.info(message)
+        homemade_logger.shutdown()
+        snapshot = homemade_logger.get_metrics()
+        assert snapshot['queue']['depth'] == 0
+        assert snapshot['queue']['dropped'] == 0
+        file_metrics = snapshot['handlers'][1]
+        assert file_metrics['target'] == str(tmp_path / 'log')
+        assert file_metrics['records'] == {'INFO': 3}
+        assert file_metrics['bytes'] == {'INFO': 6}
+        assert file_metrics['rotation']['rotations'] == 1
+
+    def test_export_metrics(self):
+        """ Test the exporter calls the export function until shutdown. """
+        with pytest.raises(ValueError):
+            MetricsExporter(dict, print, interval=0)
+        exported = []
+        called = Event()
+
+        def export(snapshot):
+            exported.append(snapshot)
+            called.set()
+
+        homemade_logger = HomemadeLogger(name='Exported metrics logger')
+        exporter = homemade_logger.export_metrics(export, interval=0.01)
+        assert exporter.get_interval() == 0.01
+        assert called.wait(5)
+        homemade_logger.shutdown()
+        count = len(exported)
+        assert count >= 2
+        assert exported[-1]['queue'] is None
+        homemade_logger.shutdown()
+        assert len(exported) == count
@@ -0,0 +1,158 @@
+"""
+    Test the collector process writing the records of several processes.
+"""
+
+# Imports.
+import multiprocessing
+import os
+import subprocess
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from logging import (
+    getLogger,
+    makeLogRecord,
+    INFO
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from logger import HomemadeLogger
+from multiprocess import HomemadeLogCollector
+
+
+def work(worker, records):
+    """ Worker process logging through the logger configured by its parent. """
+    logger = getLogger('collected')
+    for index in range(records):
+        logger.info('worker %d record %d', worker, index)
+
+
+class TestHomemadeLogCollector:
+    """
+        Test the class HomemadeLogCollector.
+    """
+
+    def test_init(self):
+        """ Test the HomemadeLogCollector.__init__ function. """
+        with pytest.raises(TypeError):
+            HomemadeLogCollector(queue_size='1')
+        with pytest.raises(ValueError):
+            HomemadeLogCollector(queue_size=0)
+        collector = HomemadeLogCollector(filename='collected')
+        with pytest.raises(TypeError):
+            HomemadeLogCollector(put_timeout='1')
+        with pytest.raises(ValueError):
+            HomemadeLogCollector(put_timeout=-1)
+        collector = HomemadeLogCollector(filename='collected')
+        assert collector.get_handler_config() == {'filename': 'collected'}
+        assert not collector.is_alive()
+
+    def test_lagging_collector(self):
+        """ Test the records past queue_size are dropped after put_timeout. """
+        collector = HomemadeLogCollector(queue_size=2, put_timeout=0.01, filename='collected')
+        handler = collector.get_handler()
+        for index in range(3):
+            handler.handle(makeLogRecord({'msg': f'record {index}'}))
+        assert handler.get_dropped() == 1
+
+    def test_dead_collector(self, tmp_path):
+        """ Test the records are dropped without waiting once the collector is gone. """
+        collector = HomemadeLogCollector(queue_size=1000000, filename=str(tmp_path / 'log'))
+        collector.start()
+        collector.process.kill()
+        collector.process.join()
+        handler = collector.get_handler()
+        for index in range(10000):
+            handler.handle(makeLogRecord({'msg': 'x' * 100}))
+        assert handler.get_dropped() == 10000
+
+    def test_stop_at_exit(self, tmp_path):
+        """ Test the records in flight are written when the parent exits without stop. """
+        path = str(tmp_path / 'log')
+        script = ("import sys; sys.path.append('source')\n"
+                  "from logging import getLogger\n"
+                  "from multiprocess import HomemadeLogCollector\n"
+                  f"collector = HomemadeLogCollector(filename={path!r},\n"
+                  "                                 log_format='%(message)s')\n"
+                  "collector.start()\n"
+                  "logger = getLogger('exiting')\n"
+                  "logger.addHandler(collector.get_handler())\n"
+                  "for index in range(100):\n"
+                  "    logger.warning('record %d', index)\n")
+        subprocess.run([sys.executable, '-c', script], check=True, timeout=30)
+        with open(path) as log_file:
+            assert len(log_file.read().splitlines()) == 100
+
+    def test_collect(self, tmp_path):
+        """ Test the records of forked workers all reach the file. """
+        path = str(tmp_path / 'log')
+        collector = HomemadeLogCollector(filename=path, log_format="%(message)s")
+        collector.start()
+        logger = getLogger('collected')
+        logger.setLevel(INFO)
+        logger.propagate = False
+        logger.addHandler(collector.get_handler())
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=work, args=(worker, 200)) for worker in range(3)]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        collector.stop()
+        logger.removeHandler(collector.get_handler())
+        with open(path) as log_file:
+            lines = log_file.read().splitlines()
+        assert len(lines) == 600
+        assert 'worker 2 record 199' in lines
+
+    def test_raw_fork(self, tmp_path):
+        """ Test a child made by os.fork() after the parent logged still reaches the file. """
+        path = str(tmp_path / 'log')
+        collector = HomemadeLogCollector(filename=path, log_format="%(message)s")
+        collector.start()
+        logger = getLogger('raw_forked')
+        logger.setLevel(INFO)
+        logger.propagate = False
+        logger.addHandler(collector.get_handler())
+        logger.info('from the parent')
+        pid = os.fork()
+        if pid == 0:
+            try:
+                logger.info('from the child')
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+        collector.stop()
+        logger.removeHandler(collector.get_handler())
+        with open(path) as log_file:
+            assert sorted(log_file.read().splitlines()) == ['from the child', 'from the parent']
+
+    def test_asynchronous_fork(self, tmp_path):
+        """ Test an asynchronous logger keeps writing in a forked child. """
+        path = str(tmp_path / 'log')
+        collector = HomemadeLogCollector(filename=path, log_format="%(message)s")
+        collector.start()
+        homemade_logger = HomemadeLogger(name='Forked logger', level=INFO, asynchronous=True,
+                                         log_format="%(message)s",
+                                         handlers=[collector])
+        homemade_logger.get_logger().propagate = False
+        context = multiprocessing.get_context('fork')
+        process = context.Process(target=log_and_shutdown, args=(homemade_logger,))
+        process.start()
+        process.join()
+        homemade_logger.shutdown()
+        collector.stop()
+        with open(path) as log_file:
+            assert log_file.read().splitlines() == ['from the child']
+
+
+def log_and_shutdown(homemade_logger):
+    """ Log through an asynchronous logger configured by the parent. """
+    homemade_logger.info('from the child')
+    homemade_logger.shutdown()
@@ -0,0 +1,218 @@
+"""
+    Test the handler shipping the records over the network.
+"""
+
+# Imports.
+import json
+import os
+import socket
+import socketserver
+import threading
+from os.path import (
+    join,
+    abspath,
+    exists
+)
+import pytest
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from logger import HomemadeLogstashHandler
+from network import ShippingHandler
+from conftest import (
+    build_record,
+    wait_for
+)
+
+
+class CollectorTCPHandler(socketserver.StreamRequestHandler):
+    """ Stand-in collector storing the received lines. """
+    def handle(self):
+        for line in self.rfile:
+            self.server.lines.append(json.loads(line))
+
+
+class CollectorUDPHandler(socketserver.DatagramRequestHandler):
+    """ Stand-in collector storing the received lines. """
+    def handle(self):
+        for line in self.rfile:
+            self.server.lines.append(json.loads(line))
+
+
+def start_server(server_class, handler_class, port=0):
+    """ Start a stand-in collector on localhost. """
+    server_class.allow_reuse_address = True
+    server = server_class(('127.0.0.1', port), handler_class)
+    server.lines = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestShippingHandler:
+    """
+        Test the class ShippingHandler.
+    """
+
+    def test_tcp(self):
+        """ Test the records are sent over TCP. """
+        server = start_server(socketserver.ThreadingTCPServer, CollectorTCPHandler)
+        handler = ShippingHandler(port=server.server_address[1], flush_interval=0.05)
+        for index in range(100):
+            handler.handle(build_record(f'message {index}', name='shipping'))
+        assert wait_for(lambda: len(server.lines) == 100)
+        assert server.lines[0]['message'] == 'message 0'
+        assert server.lines[99]['name'] == 'shipping'
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_udp(self):
+        """ Test the records are sent over UDP. """
+        server = start_server(socketserver.UDPServer, CollectorUDPHandler)
+        handler = ShippingHandler(port=server.server_address[1], protocol='udp',
+                                  flush_interval=0.05)
+        for index in range(10):
+            handler.handle(build_record(f'message {index}'))
+        assert wait_for(lambda: len(server.lines) == 10)
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_spill(self, tmp_path):
+        """ Test the records are spilled while the collector is down and replayed. """
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        spill_path = str(tmp_path / 'spill')
+        handler = ShippingHandler(port=port, flush_interval=0.05, spill_path=spill_path)
+        handler.backoff_max = 0.1
+        for index in range(5):
+            handler.handle(build_record(f'message {index}'))
+        assert wait_for(lambda: handler.spill_size > 0 and handler.records.empty())
+        server = start_server(socketserver.ThreadingTCPServer, CollectorTCPHandler, port)
+        assert wait_for(lambda: len(server.lines) == 5)
+        assert not exists(spill_path)
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_udp_oversized(self):
+        """ Test a line larger than a datagram is dropped without holding back the others. """
+        server = start_server(socketserver.UDPServer, CollectorUDPHandler)
+        handler = ShippingHandler(port=server.server_address[1], protocol='udp',
+                                  flush_interval=0.05)
+        handler.handle(build_record('x' * 70000))
+        handler.handle(build_record('small'))
+        assert wait_for(lambda: len(server.lines) == 1)
+        assert server.lines[0]['message'] == 'small'
+        assert handler.dropped == 1
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_full_queue(self, tmp_path):
+        """ Test a full queue drops the records, only the sender thread spills. """
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        handler = ShippingHandler(port=port, flush_interval=0.05, queue_size=1,
+                                  spill_path=str(tmp_path / 'spill'))
+        spilling_threads = set()
+        spill = handler._spill
+
+        def recording_spill(lines):
+            spilling_threads.add(threading.current_thread())
+            spill(lines)
+
+        handler._spill = recording_spill
+        for index in range(1000):
+            handler.handle(build_record(f'message {index}'))
+        assert handler.dropped > 0
+        handler.close()
+        assert spilling_threads <= {handler.sender}
+
+    def test_slow_collector(self, tmp_path):
+        """ Test the backlog past the high-water mark is spilled, then replayed, not dropped. """
+        server = start_server(socketserver.ThreadingTCPServer, CollectorTCPHandler)
+        spill_path = str(tmp_path / 'spill')
+        handler = ShippingHandler(port=server.server_address[1], flush_interval=0.05,
+                                  queue_size=8, spill_path=spill_path)
+        released = threading.Event()
+        spilled = []
+        ship, spill = handler._ship, handler._spill
+
+        def slow_ship(lines):
+            released.wait()
+            ship(lines)
+
+        def recording_spill(lines):
+            spilled.extend(lines)
+            spill(lines)
+
+        handler._ship, handler._spill = slow_ship, recording_spill
+        handler.handle(build_record('first'))
+        assert wait_for(handler.records.empty)
+        for index in range(8):
+            handler.handle(build_record(f'message {index}'))
+        released.set()
+        assert wait_for(lambda: len(server.lines) == 9)
+        assert len(spilled) == 8 and handler.dropped == 0
+        assert [line['message'] for line in server.lines[1:]] == \
+            [f'message {index}' for index in range(8)]
+        handler.close()
+        server.shutdown()
+        server.server_close()
+
+    def test_partial_send(self):
+        """ Test a send failing part way gives back the lines from the one being sent. """
+        handler = ShippingHandler(flush_interval=0.05)
+
+        class FailingSocket:
+            def send(self, data):
+                if len(data) < 9:
+                    raise ConnectionResetError()
+                return 4
+
+        handler.sock = FailingSocket()
+        unsent, error = handler._send(['a\n', 'bb\n', 'ccc\n'])
+        assert unsent == ['bb\n', 'ccc\n']
+        assert isinstance(error, ConnectionResetError)
+        handler.sock = None
+        handler.close()
+
+    def test_spill_bytes(self, tmp_path):
+        """ Test the spill size is counted in bytes, as on disk. """
+        spill_path = str(tmp_path / 'spill')
+        handler = ShippingHandler(flush_interval=0.05, spill_path=spill_path)
+        handler.stopping.set()
+        handler.sender.join()
+        handler._spill(['caf\u00e9\n', 'd\u00e9j\u00e0 vu\n'])
+        assert handler.spill_size == os.path.getsize(spill_path) == 16
+        handler.close()
+
+
+class TestHomemadeLogstashHandler:
+    """
+        Test the class HomemadeLogstashHandler.
+    """
+
+    def test_init(self):
+        """ Test the HomemadeLogstashHandler.__init__ function. """
+        with pytest.raises(TypeError):
+            HomemadeLogstashHandler(host=1)
+        with pytest.raises(TypeError):
+            HomemadeLogstashHandler(port='5959')
+        with pytest.raises(ValueError):
+            HomemadeLogstashHandler(protocol='http')
+        with pytest.raises(ValueError):
+            HomemadeLogstashHandler(port=0)
+        handler = HomemadeLogstashHandler(protocol='UDP', static_fields={'service': 'api'})
+        assert handler.get_protocol() == 'udp'
+        assert handler.get_port() == 5959
+        assert isinstance(handler.get_handler(), ShippingHandler)
+        handler.get_handler().close()
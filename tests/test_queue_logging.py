@@ -0,0 +1,68 @@
+"""
+    Test the queue used by the asynchronous mode of the logger.
+"""
+
+# Imports.
+from os.path import (
+    join,
+    abspath
+)
+import pytest
+from logging import (
+    DEBUG,
+    INFO,
+    ERROR
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from queue_logging import HomemadeLogQueue
+from conftest import build_record
+
+
+class TestHomemadeLogQueue:
+    """
+        Test the class HomemadeLogQueue.
+    """
+
+    def test_init(self):
+        """ Test the HomemadeLogQueue.__init__ function. """
+        with pytest.raises(TypeError):
+            HomemadeLogQueue(maxsize='10')
+        with pytest.raises(TypeError):
+            HomemadeLogQueue(overflow=1)
+        with pytest.raises(ValueError):
+            HomemadeLogQueue(maxsize=0)
+        with pytest.raises(ValueError):
+            HomemadeLogQueue(overflow='explode')
+        log_queue = HomemadeLogQueue()
+        assert log_queue.get_overflow() == 'block'
+        assert log_queue.get_dropped() == 0
+
+    def test_drop_newest(self):
+        """ Test the drop_newest overflow policy. """
+        log_queue = HomemadeLogQueue(maxsize=2, overflow='drop_newest')
+        for message in ['a', 'b', 'c']:
+            log_queue.put_nowait(build_record(message, level=INFO))
+        assert log_queue.get_dropped() == 1
+        assert [log_queue.get().msg for _ in range(2)] == ['a', 'b']
+
+    def test_drop_oldest(self):
+        """ Test the drop_oldest overflow policy evicts the lowest level first. """
+        log_queue = HomemadeLogQueue(maxsize=2, overflow='drop_oldest')
+        log_queue.put_nowait(build_record('a', level=ERROR))
+        log_queue.put_nowait(build_record('b', level=INFO))
+        log_queue.put_nowait(build_record('c', level=ERROR))
+        log_queue.put_nowait(build_record('d', level=DEBUG))
+        assert log_queue.get_dropped() == 2
+        assert [log_queue.get().msg for _ in range(2)] == ['a', 'c']
+
+    def test_sentinel(self):
+        """ Test the sentinel is queued even when the queue is full. """
+        log_queue = HomemadeLogQueue(maxsize=1, overflow='drop_newest')
+        log_queue.put_nowait(build_record('a', level=INFO))
+        log_queue.put_sentinel(None)
+        assert log_queue.qsize() == 2
@@ -0,0 +1,116 @@
+"""
+    Test the search over the rotated log files.
+"""
+
+# Imports.
+import gzip
+import os
+import time
+from os.path import (
+    join,
+    abspath,
+    exists
+)
+import pytest
+from logging import (
+    Formatter,
+    LogRecord,
+    INFO,
+    WARNING,
+    ERROR
+)
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from handlers import suffix_pattern
+from logger import HomemadeTimedRotatingFileHandler
+from reader import (
+    HomemadeLogReader,
+    get_log_reader,
+    index_path
+)
+
+START = time.mktime((2024, 5, 1, 14, 0, 0, 0, 0, -1))
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def write_records(path, records, opener=open):
+    """ Write (offset in seconds, name, level, message) records as text lines. """
+    formatter = Formatter(FORMAT)
+    with opener(path, 'wt') as log_file:
+        for seconds, name, level, message in records:
+            record = LogRecord(name, level, 'app.py', 1, message, None, None)
+            record.created = START + seconds
+            record.msecs = 0
+            log_file.write(formatter.format(record) + '\n')
+
+
+class TestHomemadeLogReader:
+    """
+        Test the class HomemadeLogReader.
+    """
+
+    def build_files(self, directory):
+        """ Write a compressed backup, a plain backup and the current file. """
+        base = join(directory, 'service.log')
+        write_records(base + '.2024-05-01_13.gz', [(-600, 'api', INFO, 'old')], gzip.open)
+        write_records(base + '.2024-05-01_14', [(second, 'api', INFO, f'tick {second}')
+                                                for second in range(0, 600, 10)])
+        write_records(base, [(600, 'api.db', ERROR, 'db down'), (601, 'worker', WARNING, 'slow'),
+                             (900, 'api', INFO, 'late')])
+        write_records(join(directory, 'other.log.2024-05-01_14'), [(0, 'x', INFO, 'other')])
+        os.utime(base + '.2024-05-01_13.gz', (START - 600, START - 600))
+        return base
+
+    def test_get_files(self, tmp_path):
+        """ Test the rotated files are found, oldest first. """
+        base = self.build_files(str(tmp_path))
+        reader = HomemadeLogReader(filename=base)
+        assert reader.get_files() == [base + '.2024-05-01_13.gz', base + '.2024-05-01_14', base]
+        assert suffix_pattern('%Y-%m-%d_%H') == r'\d{4}\-\d{2}\-\d{2}_\d{2}'
+        with pytest.raises(ValueError):
+            HomemadeLogReader(filename=base, log_format='%(message)s')
+
+    def test_search(self, tmp_path):
+        """ Test the time range, level and name filters. """
+        base = self.build_files(str(tmp_path))
+        reader = HomemadeLogReader(filename=base, index_step=64)
+        records = list(reader.search(START + 120, START + 150))
+        assert [record.rsplit(' - ', 1)[1] for record in records] == \
+            ['tick 120', 'tick 130', 'tick 140', 'tick 150']
+        assert len(reader.get_index(base + '.2024-05-01_14')['entries']) > 1
+        assert exists(index_path(base))
+        assert [record.rsplit(' - ', 1)[1] for record in reader.search(level=WARNING)] == \
+            ['db down', 'slow']
+        records = reader.search(name='api', start=START + 595)
+        assert [record.rsplit(' - ', 1)[1] for record in records] == ['db down', 'late']
+        assert [record.rsplit(' - ', 1)[1] for record in reader.search(end=START - 1)] == ['old']
+
+    def test_index_extension(self, tmp_path):
+        """ Test the index of the current file follows its growth and replacement. """
+        base = self.build_files(str(tmp_path))
+        reader = HomemadeLogReader(filename=base)
+        assert reader.get_index(base)['last'] == START + 900
+        with open(base, 'a') as log_file:
+            log_file.write(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(START + 960))}"
+                           ",000 - api - INFO - appended\nTraceback line\n")
+        assert reader.get_index(base)['last'] == START + 960
+        assert list(reader.search(START + 950)) == [
+            f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(START + 960))}"
+            ",000 - api - INFO - appended\nTraceback line"]
+        write_records(base, [(1000, 'api', INFO, 'new file')])
+        assert reader.get_index(base)['first'] == START + 1000
+
+    def test_get_log_reader(self, tmp_path):
+        """ Test the reader of a binary file handler. """
+        path = str(tmp_path / 'binary.log')
+        file_handler = HomemadeTimedRotatingFileHandler(filename=path, output='binary')
+        record = LogRecord('api', INFO, 'app.py', 1, 'user %s', ('bob',), None)
+        file_handler.get_handler().handle(record)
+        file_handler.get_handler().flush()
+        reader = get_log_reader(file_handler)
+        assert [line.rsplit(' - ', 1)[1] for line in reader.search(level=INFO)] == ['user bob']
+        assert list(reader.search(level=ERROR)) == []
@@ -0,0 +1,89 @@
+"""
+    Test the record construction skipping the unused introspection.
+"""
+
+# Imports.
+import io
+from os.path import (
+    join,
+    abspath
+)
+from logging import (
+    Formatter,
+    Handler,
+    StreamHandler,
+    INFO
+)
+import pytest
+
+# Environment
+import sys
+sys.path.append(join(abspath('.'), 'source'))
+
+# Project modules.
+from formatters import (
+    CompiledFormatter,
+    JsonFormatter
+)
+from handlers import ThreadBufferHandler
+from records import (
+    RecordBuilder,
+    get_format_fields,
+    get_handler_fields,
+    get_record_fields
+)
+
+
+def build_stream_handler(formatter):
+    """ Build a StreamHandler writing to memory with a formatter. """
+    handler = StreamHandler(io.StringIO())
+    handler.setFormatter(formatter)
+    return handler
+
+
+class TestRecordFields:
+    """
+        Test the attributes read by the formats, formatters and handlers.
+    """
+
+    def test_format_fields(self):
+        """ Test the introspected attributes of a format. """
+        assert get_format_fields("%(asctime)s - %(name)s - %(message)s") == frozenset()
+        assert get_format_fields("%(funcName)s:%(lineno)d %(request_id)s %(message)s") == \
+            frozenset({'funcName', 'lineno'})
+        assert get_format_fields("%(threadName)s %(process)d") == \
+            frozenset({'threadName', 'process'})
+
+    def test_handler_fields(self):
+        """ Test only the handlers reading through their formatter are described. """
+        stream = build_stream_handler(CompiledFormatter("%(lineno)d %(message)s"))
+        assert get_handler_fields(stream) == frozenset({'lineno'})
+        assert get_handler_fields(build_stream_handler(JsonFormatter())) == frozenset()
+        assert get_handler_fields(build_stream_handler(Formatter("{message}", style='{'))) \
+            is None
+        assert get_handler_fields(Handler()) is None
+        buffered = ThreadBufferHandler(stream)
+        assert get_handler_fields(buffered) == frozenset({'lineno'})
+        buffered.close()
+        assert get_record_fields([stream], [object()]) is None
+
+
+class TestRecordBuilder:
+    """
+        Test the class RecordBuilder.
+    """
+
+    def test_build(self):
+        """ Test the record gets its caller only when asked. """
+        record = RecordBuilder(frozenset({'lineno'})).build('name', INFO, '%(a)s', ({'a': 1},))
+        assert record.funcName == 'test_build'
+        assert record.filename == 'test_records.py'
+        assert record.getMessage() == '1'
+        assert record.thread is None
+        builder = RecordBuilder(frozenset({'threadName'}))
+        record = builder.build('name', INFO, 'message', (), extra={'user': 'me'})
+        assert record.lineno == 0
+        assert record.threadName is not None
+        assert record.user == 'me'
+        with pytest.raises(KeyError):
+            RecordBuilder(frozenset()).build('name', INFO, 'message', (), extra={'msg': 1})